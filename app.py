@@ -1,148 +1,206 @@
 import streamlit as st
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
-import math
 import os
+import pickle
+import time
+import uuid
 
-from math import radians, cos, sin, asin, sqrt
+from src import criticidade, dados, desempenho, empacotar_kmz, exportacao, mapa, recarga, sensibilidade, vizinhanca, zonas
+from src.relatorio import write_pdf_report, write_report_batch, write_report_html
+from src.cache import LRUCache, focus_key, round_focus
+from src.indice_espacial import SpatialIndex
+
+# Pasta servida pelo Streamlit em /app/static (ver .streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
 # =============================================================================
 # Funções de Carregamento de Dados
 # =============================================================================
 
-@st.cache_data
-def haversine_distance(lon1, lat1, lon2, lat2):
+@st.cache_resource
+def get_result_cache():
+    """Cache LRU dos resultados por foco (núcleo próximo, classificação), compartilhado entre sessões."""
+    return LRUCache(maxsize=256)
+
+@st.cache_resource
+def get_map_cache():
+    """Cache LRU dos mapas HTML por foco; menor, pois cada entrada ocupa alguns MB."""
+    return LRUCache(maxsize=16)
+
+@st.cache_resource
+def get_export_queue():
+    """Fila de exportações em segundo plano, compartilhada entre sessões (artefatos em cache/exportacoes/)."""
+    return exportacao.ExportQueue()
+
+@desempenho.cached("vizinhanca", st.cache_resource)
+def load_neighbour_snapshot(fingerprint):
+    """Vizinhança pré-calculada dos núcleos desta base, lida do disco uma única vez."""
+    snapshot = vizinhanca.load_snapshot(fingerprint)
+    if snapshot is not None:
+        print(f"[INFO] Vizinhança pré-calculada carregada: {len(snapshot)} pontos de núcleo.")
+    return snapshot
+
+def get_neighbour_snapshot(fingerprint):
     """
-    Calcula a distância em metros entre dois pontos na Terra.
+    Vizinhança pré-calculada dos núcleos (python -m src.vizinhanca), se existir para esta base.
+    A ausência não fica em cache: uma vizinhança gerada depois é usada a partir do rerun seguinte.
     """
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    r = 6371000 # Raio da Terra em metros
-    return c * r
+    if not os.path.exists(vizinhanca.snapshot_path(fingerprint)):
+        return None
+    return load_neighbour_snapshot(fingerprint)
 
-@st.cache_data
-def find_closest_nucleus(target_lat, target_lon, df):
+@desempenho.cached("ranking_criticidade", st.cache_resource(max_entries=4))
+def get_criticality_ranking(fingerprint, _df, _index):
+    """Ranking de criticidade dos núcleos, calculado uma vez por versão da base."""
+    return criticidade.rank_nuclei(_df, index=_index)
+
+def find_closest_nucleus(target_lat, target_lon, df, fingerprint, index):
     """
     Encontra o núcleo de granja mais próximo a um ponto alvo dentro de 300m.
     Retorna (lat_nucleo, lon_nucleo, nome_nucleo) se encontrado, caso contrário None.
     """
-    min_distance = 300 # meters
-    closest_nucleus_coords = None
-    closest_nucleus_name = None
+    target_lat, target_lon = round_focus(target_lat, target_lon)
 
-    for _, row in df.iterrows():
-        try:
-            coords = row['coordenadas'].split(',')
-            farm_lat = float(coords[0].strip())
-            farm_lon = float(coords[1].strip())
-            
-            distance = haversine_distance(target_lon, target_lat, farm_lon, farm_lat)
-            
-            if distance <= min_distance:
-                if closest_nucleus_coords is None or distance < min_distance: # Update if closer
-                    min_distance = distance
-                    closest_nucleus_coords = (farm_lat, farm_lon)
-                    closest_nucleus_name = f"Núcleo {row.get('nucleo', 'N/A')} - {row.get('proprietario', 'N/A')}"
-        except (ValueError, IndexError, AttributeError):
-            continue
-            
-    if closest_nucleus_coords:
-        return closest_nucleus_coords[0], closest_nucleus_coords[1], closest_nucleus_name
-    return None, None, None
+    def compute():
+        closest, _ = index.nearest(target_lat, target_lon, max_distance_m=300)
+        if closest is None:
+            return None, None, None
+        row = df.iloc[closest]
+        closest_nucleus_name = f"Núcleo {row.get('nucleo', 'N/A')} - {row.get('proprietario', 'N/A')}"
+        return float(row['lat']), float(row['lon']), closest_nucleus_name
 
-@st.cache_data
-def classify_farms_by_zone(lat_foco, lon_foco, df):
-    """Classifica as granjas nas zonas de contingência e agrega os dados por núcleo."""
-    print("[INFO] Classificando produtores e agregando por núcleo...")
-    
-    # Dicionário para armazenar dados brutos por zona
-    raw_zone_data = {
-        "Perifoco (0-3km)": [],
-        "Vigilância (3-10km)": [],
-        "Proteção (10-25km)": []
-    }
-
-    # 1. Classifica cada aviário em sua zona mais restrita
-    for _, row in df.iterrows():
-        try:
-            coords = row['coordenadas'].split(',')
-            lat_granja = float(coords[0].strip())
-            lon_granja = float(coords[1].strip())
-            
-            distance = haversine_distance(lon_foco, lat_foco, lon_granja, lat_granja)
-            
-            farm_data = row.to_dict()
-
-            if distance <= 3000:
-                raw_zone_data["Perifoco (0-3km)"].append(farm_data)
-            elif distance <= 10000:
-                raw_zone_data["Vigilância (3-10km)"].append(farm_data)
-            elif distance <= 25000:
-                raw_zone_data["Proteção (10-25km)"].append(farm_data)
-        except (ValueError, IndexError, AttributeError):
-            continue
+    key = focus_key("nucleo_proximo", fingerprint, target_lat, target_lon)
+    return desempenho.lookup(get_result_cache(), key, compute)
 
-    # 2. Agrega os dados por 'núcleo' dentro de cada zona
-    aggregated_results = {
-        "Perifoco (0-3km)": {},
-        "Vigilância (3-10km)": {},
-        "Proteção (10-25km)": {}
-    }
-
-    for zone_name, farms in raw_zone_data.items():
-        for farm in farms:
-            nucleo_id = farm.get('nucleo')
-            if pd.isna(nucleo_id):
-                continue
-            
-            nucleo_id = int(nucleo_id)
-            
-            if nucleo_id not in aggregated_results[zone_name]:
-                try:
-                    coords = farm['coordenadas'].split(',')
-                    lat_granja_for_nucleo = float(coords[0].strip())
-                    lon_granja_for_nucleo = float(coords[1].strip())
-                except (ValueError, IndexError, AttributeError):
-                    continue
-
-                aggregated_results[zone_name][nucleo_id] = {
-                    'aviarios': [],
-                    'tecnico': farm.get('tecnico', 'N/A'),
-                    'proprietario': farm.get('proprietario', 'N/A'),
-                    'bp_propriedade': set(),
-                    'total_aves': 0,
-                    'total_area': 0,
-                    'latitude': lat_granja_for_nucleo,
-                    'longitude': lon_granja_for_nucleo
-                }
-            
-            agg_nucleo = aggregated_results[zone_name][nucleo_id]
-            agg_nucleo['aviarios'].append(farm.get('fazenda'))
-            agg_nucleo['bp_propriedade'].add(farm.get('bp_propriedade'))
-            agg_nucleo['total_aves'] += pd.to_numeric(farm.get('capacidade'), errors='coerce') or 0
-            agg_nucleo['total_area'] += pd.to_numeric(farm.get('area'), errors='coerce') or 0
-
-    return aggregated_results
+def classify_farms_by_zone(lat_foco, lon_foco, df, fingerprint, index, radii=zonas.ZONE_RADII, extra_foci=()):
+    """
+    Classifica as granjas nas zonas de contingência e agrega os dados por núcleo, em um
+    DataFrame com uma linha por zona e núcleo (zonas.ZONE_FRAME_COLUMNS).
+    Com focos adicionais, cada granja fica na zona mais restrita entre todos os focos.
+    """
+    lat_foco, lon_foco = round_focus(lat_foco, lon_foco)
+    if not extra_foci:
+        key = focus_key("classificacao", fingerprint, lat_foco, lon_foco, radii)
+        return desempenho.lookup(
+            get_result_cache(), key, lambda: zonas.classify_zone_frame(lat_foco, lon_foco, df, radii=radii, index=index,
+                                                   snapshot=get_neighbour_snapshot(fingerprint))
+        )
+    foci = [(lat_foco, lon_foco), *(round_focus(lat, lon) for lat, lon, _ in extra_foci)]
+    key = focus_key("classificacao_multifoco", fingerprint, lat_foco, lon_foco, radii, tuple(foci[1:]))
+    return desempenho.lookup(
+        get_result_cache(), key, lambda: zonas.classify_multi_focus_frame(foci, df, radii=radii, index=index)
+    )
 
 
-@st.cache_data
+def get_radius_sweep(lat_foco, lon_foco, df, fingerprint, extra_foci=()):
+    """Distâncias ordenadas e somas acumuladas do foco (ou focos) para a análise de raios."""
+    lat_foco, lon_foco = round_focus(lat_foco, lon_foco)
+    foci = [(lat_foco, lon_foco), *(round_focus(lat, lon) for lat, lon, _ in extra_foci)]
+    key = focus_key("varredura_raios", fingerprint, lat_foco, lon_foco, (), tuple(foci[1:]))
+    return desempenho.lookup(get_result_cache(), key, lambda: sensibilidade.RadiusSweep(foci, df))
+
+
+# Listas de produtores: linhas por página e ordenações (coluna, crescente).
+PRODUCER_PAGE_SIZE = 100
+PRODUCER_SORTS = {
+    "Núcleo": ("nucleo", True),
+    "Total de Aves": ("total_aves", False),
+    "Área Total": ("total_area", False),
+    "Nº de Aviários": ("n_aviarios", False),
+}
+
+def producer_table(zone_frame, query="", sort_label="Núcleo"):
+    """
+    Núcleos de uma zona (linhas do DataFrame de classificação) filtrados pela busca em núcleo,
+    proprietário e técnico, com o número de aviários e na ordem escolhida.
+    """
+    view = zone_frame.assign(n_aviarios=zone_frame['aviarios'].map(len))
+    query = query.strip().lower()
+    if query:
+        text = (view['nucleo'].astype(str) + " " + view['proprietario'].astype(str) + " "
+                + view['tecnico'].astype(str)).str.lower()
+        view = view[text.str.contains(query, regex=False)]
+    column, ascending = PRODUCER_SORTS[sort_label]
+    return view.sort_values([column, 'nucleo'], ascending=[ascending, True], kind="stable").reset_index(drop=True)
+
+
+# Raio de influência (m) dos resultados em cache que dependem só das granjas próximas do foco.
+# Numa recarga da base, eles são mantidos se nenhuma granja alterada estiver nesse raio; os
+# demais (mapas, KMZ, varredura de raios, ranking) são refeitos para a nova versão.
+LOCAL_RESULT_RADII = {
+    "nucleo_proximo": 300,
+    "classificacao": max(zonas.ZONE_RADII),
+    "classificacao_multifoco": max(zonas.ZONE_RADII),
+    "relatorio_html": max(zonas.ZONE_RADII),
+    "relatorio_pdf": max(zonas.ZONE_RADII),
+    "relatorios_pdf_zip": max(zonas.ZONE_RADII),
+}
+
+@desempenho.cached("carregar_base", st.cache_resource)
+def get_farm_dataset(file_path):
+    """
+    Carrega a tabela tipada das granjas (via cache colunar) e inicia o thread que recarrega a
+    base quando o CSV muda. A versão corrente é compartilhada, somente leitura, por todas as
+    sessões: ninguém deve alterá-la.
+    """
+    print(f"[INFO] Carregando dados das granjas de {file_path}...")
+    result_cache, artifact_store, map_cache = get_result_cache(), get_export_queue().store, get_map_cache()
+
+    def on_change(previous, version, diff):
+        kept = sum(
+            recarga.migrate_focus_cache(cache, previous.fingerprint, version.fingerprint, diff, LOCAL_RESULT_RADII)
+            for cache in (result_cache, artifact_store, map_cache)
+        )
+        print(f"[INFO] {kept} resultado(s) em cache mantido(s) para a nova versão da base.")
+        if vizinhanca.latest_snapshot() is not None:
+            vizinhanca.update_snapshot(version.df, version.fingerprint, workers=1)
+
+    dataset = recarga.FarmDataset(file_path, on_change=on_change)
+    df = dataset.version.df
+    print(f"[INFO] Tabela de granjas: {len(df)} linhas, {dados.frame_memory_bytes(df) / 1e6:.2f} MB "
+          "(uma cópia compartilhada entre as sessões)")
+    return dataset.start()
+
 def load_farm_data():
-    """Carrega e limpa os dados das granjas a partir do arquivo CSV."""
-    print("[INFO] Carregando dados das granjas de data/coordenadas.csv...")
+    """
+    Retorna (df, fingerprint, índice espacial) da versão corrente da base de granjas; o
+    fingerprint identifica a versão da base nas chaves de cache.
+    """
     file_path = os.path.join("data", "coordenadas.csv")
     try:
-        df = pd.read_csv(file_path, sep=';')
-        # Limpeza básica dos dados de coordenadas
-        df.dropna(subset=['coordenadas'], inplace=True)
-        df = df[df['coordenadas'].str.contains(',', na=False)]
-        return df
+        version = get_farm_dataset(file_path).version
+        return version.df, version.fingerprint, version.index
     except FileNotFoundError:
         st.error(f"Arquivo de dados não encontrado em: {file_path}")
-        return pd.DataFrame()
+        return pd.DataFrame(columns=['lat', 'lon']), "vazio", SpatialIndex([], [])
+
+@st.cache_resource
+def get_session_registry():
+    """Último acesso de cada sessão, para estimar a memória da tabela compartilhada por sessão."""
+    return {}
+
+def active_session_count(window_s=1800):
+    """Registra a sessão atual e conta as sessões com acesso nos últimos `window_s` segundos."""
+    registry = get_session_registry()
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = uuid.uuid4().hex
+    now = time.time()
+    registry[st.session_state.session_token] = now
+    for token, last_seen in list(registry.items()):
+        if now - last_seen > window_s:
+            registry.pop(token, None)
+    return len(registry)
+
+def session_state_bytes():
+    """Tamanho aproximado (serializado) do estado desta sessão."""
+    total = 0
+    for value in st.session_state.to_dict().values():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            pass
+    return total
 
 @st.cache_data
 def load_contingency_plan():
@@ -175,97 +233,39 @@ def get_abatedouro_coords():
 # Funções de Geração de Mapa
 # =============================================================================
 
-@st.cache_data
-def generate_full_map(lat, lon, df, abatedouro_lat, abatedouro_lon, focus_name):
-    """Gera o mapa completo com zonas de contingência em formato de anel e granjas."""
-    print(f"[INFO] Gerando novo mapa para as coordenadas: Latitude={lat}, Longitude={lon}")
-    m = folium.Map(location=[lat, lon], zoom_start=9)
-
-    # Adicionar marcador para o foco
-    folium.Marker(
-        [lat, lon],
-        popup=f"<b>FOCO:</b> {focus_name}<br>Ponto central do foco de influenza aviária.",
-        icon=folium.Icon(color='red', icon='info-sign')
-    ).add_to(m)
-
-    # Adicionar marcador para o Abatedouro
-    if abatedouro_lat is not None and abatedouro_lon is not None:
-        folium.Marker(
-            [abatedouro_lat, abatedouro_lon],
-            popup="<b>Abatedouro de Aves - C.Vale</b>",
-            icon=folium.Icon(color='blue', icon='building')
-        ).add_to(m)
-
-    # Helper para gerar coordenadas de um círculo
-    def get_circle_coords(center_lat, center_lon, radius_m):
-        coords = []
-        for i in range(101):
-            angle = (i / 100) * 2 * math.pi
-            dx = radius_m * math.cos(angle)
-            dy = radius_m * math.sin(angle)
-            point_lat = center_lat + (dy / 111111)
-            point_lon = center_lon + (dx / (111111 * math.cos(math.radians(center_lat))))
-            coords.append([point_lat, point_lon])
-        return coords
-
-    # Definir zonas com raios e descrições
-    zones = [
-        {
-            "name": "Proteção (10-25km)", "outer_radius": 25000, "inner_radius": 10000, "color": "blue",
-            "description": "Zona de controle e monitoramento. Fiscalização do trânsito de veículos e produtos avícolas. Barreiras sanitárias para prevenir a entrada do vírus."
-        },
-        {
-            "name": "Vigilância (3-10km)", "outer_radius": 10000, "inner_radius": 3000, "color": "purple",
-            "description": "Zona de vigilância ativa. Restrição no trânsito de aves e produtos. Suspensão de GTAs e monitoramento epidemiológico intensivo."
-        },
-        {
-            "name": "Perifoco (0-3km)", "outer_radius": 3000, "inner_radius": 0, "color": "red",
-            "description": "Área de interdição máxima. Sacrifício de aves e controle total de acesso. Medidas rigorosas de desinfecção e vazio sanitário obrigatório."
-        }
-    ]
-
-    for zone in zones:
-        locations = [get_circle_coords(lat, lon, zone["outer_radius"])]
-        if zone["inner_radius"] > 0:
-            inner_coords = get_circle_coords(lat, lon, zone["inner_radius"])
-            inner_coords.reverse()
-            locations.append(inner_coords)
-
-        folium.Polygon(
-            locations=locations,
-            color=zone["color"],
-            fill=True,
-            fill_color=zone["color"],
-            fill_opacity=0.2,
-            popup=f"<b>{zone['name']}</b><br>{zone['description']}"
-        ).add_to(m)
-
-    # Adicionar marcadores para as granjas
-    if not df.empty:
-        for _, row in df.iterrows():
-            try:
-                coords = row['coordenadas'].split(',')
-                lat_granja = float(coords[0].strip())
-                lon_granja = float(coords[1].strip())
-                
-                popup_html = f"""
-                <b>Proprietário:</b> {row.get('proprietario', 'N/A')}<br>
-                <b>Cidade:</b> {row.get('cidade', 'N/A')}<br>
-                <b>Capacidade:</b> {row.get('capacidade', 'N/A')} aves<br>
-                """
-                
-                folium.CircleMarker(
-                    location=[lat_granja, lon_granja],
-                    radius=2,
-                    color='darkgreen',
-                    fill=True,
-                    fill_color='darkgreen',
-                    fill_opacity=0.7,
-                    popup=folium.Popup(popup_html, max_width=300)
-                ).add_to(m)
-            except (ValueError, IndexError):
-                continue
-    return m._repr_html_()
+@desempenho.cached("camada_estatica", st.cache_resource(max_entries=4))
+def get_static_map_layer(fingerprint, _df, abatedouro_lat, abatedouro_lon, farm_mode):
+    """
+    Camada estática do mapa (granjas + abatedouro), construída uma vez por versão da base.
+    farm_mode é obrigatório: o cache distingue argumentos omitidos dos passados, e o mapa e as
+    exportações devem compartilhar a mesma entrada.
+    """
+    return mapa.build_static_layer(_df, abatedouro_lat, abatedouro_lon, farm_mode)
+
+@desempenho.cached("publicar_granjas", st.cache_resource(max_entries=4))
+def get_farms_layer_url(fingerprint, _static_layer):
+    """Publica o GeoJSON das granjas em static/ e retorna a URL servida pelo Streamlit."""
+    file_name = mapa.publish_farms_geojson(_static_layer, STATIC_DIR, fingerprint)
+    base_path = st.get_option("server.baseUrlPath").strip("/")
+    return "/" + "/".join(part for part in (base_path, "app", "static", file_name) if part)
+
+def generate_full_map(lat, lon, df, fingerprint, abatedouro_lat, abatedouro_lon, focus_name,
+                      farm_mode=mapa.FARM_LAYER_GEOJSON, extra_foci=()):
+    """
+    Retorna o HTML do mapa completo do foco, usando o cache LRU de mapas. Um foco novo
+    só gera o marcador e os anéis; as granjas vêm da camada estática em cache.
+    """
+    key = focus_key("mapa", fingerprint, lat, lon, zonas.ZONE_RADII, abatedouro_lat, abatedouro_lon, focus_name,
+                    farm_mode, tuple(extra_foci))
+
+    def compute():
+        static = get_static_map_layer(fingerprint, df, abatedouro_lat, abatedouro_lon, farm_mode)
+        with desempenho.span("mapa.composicao"):
+            full_map = mapa.compose_map(lat, lon, static, focus_name, extra_foci)
+        with desempenho.span("mapa.serializacao"):
+            return desempenho.payload("mapa_html", full_map._repr_html_())
+
+    return desempenho.lookup(get_map_cache(), key, compute)
 
 # =============================================================================
 # Configuração da Página e UI
@@ -275,8 +275,13 @@ st.set_page_config(layout="wide", page_title="Zonas de Contingência de Influenz
 
 st.title("Visualizador de Zonas de Contingência de Influenza Aviária")
 
+# Instrumentação do rerun (painel "Desempenho" e logs/desempenho.jsonl)
+rerun_recorder = desempenho.start_rerun(session=st.session_state.get("session_token"))
+# Tamanhos dos artefatos gerados nesta sessão, inclusive pelas exportações (threads da fila)
+session_payloads = st.session_state.setdefault("desempenho_artefatos", {})
+
 # Carregar dados
-df_farms = load_farm_data()
+df_farms, dataset_fingerprint, spatial_index = load_farm_data()
 contingency_plan_text = load_contingency_plan()
 
 # --- Barra Lateral ---
@@ -285,77 +290,153 @@ st.sidebar.header("Configurações do Foco")
 # Get abatedouro coordinates
 abatedouro_lat, abatedouro_lon = get_abatedouro_coords()
 
+def set_focus(lat, lon, focus_type, focus_name):
+    """Define o foco atual e sincroniza os campos de coordenadas da barra lateral."""
+    st.session_state.current_focus_lat = lat
+    st.session_state.current_focus_lon = lon
+    st.session_state.focus_type = focus_type
+    st.session_state.focus_name = focus_name
+    st.session_state.lat_foco_input = lat
+    st.session_state.lon_foco_input = lon
+
+def on_map_click():
+    """Callback do mapa: o ponto clicado vira o foco (e é aproximado ao núcleo a até 300m)."""
+    clicked = (st.session_state.get("mapa_contingencia") or {}).get("last_clicked")
+    if clicked:
+        lat, lon = clicked["lat"], clicked["lng"]
+        set_focus(lat, lon, "Manual", f"Clique no mapa ({lat:.4f}, {lon:.4f})")
+
 # Initialize session state for focus if not already set
 if 'current_focus_lat' not in st.session_state:
-    st.session_state.current_focus_lat = abatedouro_lat
-    st.session_state.current_focus_lon = abatedouro_lon
-    st.session_state.focus_type = "Abatedouro"
-    st.session_state.focus_name = "Abatedouro de Aves - C.Vale"
+    set_focus(abatedouro_lat, abatedouro_lon, "Abatedouro", "Abatedouro de Aves - C.Vale")
+
+# Update session state if user changes input
+# (os campos já guardam o valor digitado antes de serem desenhados: o foco é resolvido antes
+# deles para que a aproximação a um núcleo também possa atualizá-los)
+if st.session_state.lat_foco_input != st.session_state.current_focus_lat or \
+   st.session_state.lon_foco_input != st.session_state.current_focus_lon:
+    st.session_state.current_focus_lat = st.session_state.lat_foco_input
+    st.session_state.current_focus_lon = st.session_state.lon_foco_input
+    st.session_state.focus_type = "Manual"
+    st.session_state.focus_name = (f"Manual ({st.session_state.lat_foco_input:.4f}, "
+                                   f"{st.session_state.lon_foco_input:.4f})")
+
+# --- Proximity Logic ---
+# Only apply proximity logic if the focus is not explicitly set to Abatedouro or already a Nucleus
+# This prevents re-snapping if the user manually selected a nucleus or the abatedouro
+if st.session_state.focus_type not in ["Abatedouro", "Núcleo Próximo"]:
+    closest_lat, closest_lon, closest_name = find_closest_nucleus(
+        st.session_state.current_focus_lat, 
+        st.session_state.current_focus_lon, 
+        df_farms,
+        dataset_fingerprint,
+        spatial_index
+    )
+    if closest_lat is not None:
+        # Também nos campos de coordenadas, senão o próximo rerun veria uma alteração manual.
+        set_focus(closest_lat, closest_lon, "Núcleo Próximo", closest_name)
 
 lat_foco_input = st.sidebar.number_input(
     'Latitude do Foco',
-    value=st.session_state.current_focus_lat,
     format="%.15f",
     key="lat_foco_input"
 )
 
 lon_foco_input = st.sidebar.number_input(
     'Longitude do Foco',
-    value=st.session_state.current_focus_lon,
     format="%.15f",
     key="lon_foco_input"
 )
 
-# Update session state if user changes input
-if lat_foco_input != st.session_state.current_focus_lat or \
-   lon_foco_input != st.session_state.current_focus_lon:
-    st.session_state.current_focus_lat = lat_foco_input
-    st.session_state.current_focus_lon = lon_foco_input
-    st.session_state.focus_type = "Manual"
-    st.session_state.focus_name = f"Manual ({lat_foco_input:.4f}, {lon_foco_input:.4f})"
-
 # Button to reset to abatedouro
-if st.sidebar.button("Definir Foco no Abatedouro"):
-    st.session_state.current_focus_lat = abatedouro_lat
-    st.session_state.current_focus_lon = abatedouro_lon
-    st.session_state.focus_type = "Abatedouro"
-    st.session_state.focus_name = "Abatedouro de Aves - C.Vale"
-
-# --- Proximity Logic ---
-# Only apply proximity logic if the focus is not explicitly set to Abatedouro or already a Nucleus
-# This prevents re-snapping if the user manually selected a nucleus or the abatedouro
-if st.session_state.focus_type not in ["Abatedouro", "Núcleo Próximo"]:
-    closest_lat, closest_lon, closest_name = find_closest_nucleus(
-        st.session_state.current_focus_lat, 
-        st.session_state.current_focus_lon, 
-        df_farms
-    )
-    if closest_lat is not None:
-        st.session_state.current_focus_lat = closest_lat
-        st.session_state.current_focus_lon = closest_lon
-        st.session_state.focus_type = "Núcleo Próximo"
-        st.session_state.focus_name = closest_name
+st.sidebar.button(
+    "Definir Foco no Abatedouro",
+    on_click=set_focus,
+    args=(abatedouro_lat, abatedouro_lon, "Abatedouro", "Abatedouro de Aves - C.Vale")
+)
 
 st.sidebar.info(f"Foco Atual: **{st.session_state.focus_name}**")
-st.sidebar.info("O mapa é atualizado automaticamente ao alterar as coordenadas.")
+st.sidebar.info("O mapa é atualizado automaticamente ao alterar as coordenadas ou clicar no mapa.")
 
 # Assign the current focus from session state to lat_foco and lon_foco for downstream functions
 lat_foco = st.session_state.current_focus_lat
 lon_foco = st.session_state.current_focus_lon
 
-
-
+# --- Múltiplos Focos ---
+# Focos confirmados ficam em uma lista; o foco atual é sempre considerado junto com eles.
+if 'extra_foci' not in st.session_state:
+    st.session_state.extra_foci = []
+
+def add_current_focus():
+    """Adiciona o foco atual à lista de focos do evento, sem duplicar."""
+    focus = (st.session_state.current_focus_lat, st.session_state.current_focus_lon, st.session_state.focus_name)
+    if all(round_focus(*f[:2]) != round_focus(*focus[:2]) for f in st.session_state.extra_foci):
+        st.session_state.extra_foci = [*st.session_state.extra_foci, focus]
+
+def clear_extra_foci():
+    st.session_state.extra_foci = []
+
+st.sidebar.subheader("Múltiplos Focos")
+col_add, col_clear = st.sidebar.columns(2)
+col_add.button("Adicionar foco atual", on_click=add_current_focus)
+col_clear.button("Limpar focos", on_click=clear_extra_foci, disabled=not st.session_state.extra_foci)
+
+# Focos adicionais ao foco atual (o foco atual não é repetido se já estiver na lista)
+extra_foci = tuple(
+    (f_lat, f_lon, f_name) for f_lat, f_lon, f_name in st.session_state.extra_foci
+    if round_focus(f_lat, f_lon) != round_focus(lat_foco, lon_foco)
+)
+if st.session_state.extra_foci:
+    st.sidebar.caption("\n".join(f"- {f_name}" for _, _, f_name in st.session_state.extra_foci))
+if extra_foci:
+    st.sidebar.info(f"Zonas combinadas de **{len(extra_foci) + 1} focos**: cada granja fica na zona mais restrita.")
+
+# --- Memória ---
+# A tabela de granjas é uma única cópia compartilhada; cada sessão guarda só o próprio estado.
+with st.sidebar.expander("💾 Memória"):
+    table_mb = dados.frame_memory_bytes(df_farms) / 1e6
+    sessions = active_session_count()
+    st.caption(f"Tabela de granjas (compartilhada): {table_mb:.2f} MB para {sessions} sessão(ões) ativa(s)")
+    st.caption(f"Por sessão: {table_mb / sessions:.2f} MB da tabela + {session_state_bytes() / 1e3:.1f} kB de estado")
+
+# --- Pipeline de Renderização ---
+# A classificação é calculada uma única vez por rerun e reutilizada por todas as abas e
+# exportações; os artefatos de download são gerados sob demanda (ver abaixo).
+classified_frame = classify_farms_by_zone(
+    lat_foco, lon_foco, df_farms, dataset_fingerprint, spatial_index, extra_foci=extra_foci
+)
+# Formato {zona: {núcleo: {...}}} usado pelas listas e pelos relatórios.
+classified_nucleos = zonas.zone_frame_to_dict(classified_frame)
 
 # --- Painel Principal ---
-tab1, tab2, tab3 = st.tabs(["🗺️ Mapa de Contingência", "📄 Plano de Contingência", "📋 Listas de Produtores"])
-
-# Gerar ou obter o mapa do cache
-map_to_display = generate_full_map(lat_foco, lon_foco, df_farms, abatedouro_lat, abatedouro_lon, st.session_state.focus_name)
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🗺️ Mapa de Contingência", "📄 Plano de Contingência", "📋 Listas de Produtores",
+                                        "📊 Criticidade Regional", "📈 Sensibilidade dos Raios"])
 
 with tab1:
     st.header("Mapa Interativo")
-    map_html = generate_full_map(lat_foco, lon_foco, df_farms, abatedouro_lat, abatedouro_lon, st.session_state.focus_name)
-    st.components.v1.html(map_html, height=750)
+    st.caption("Clique no mapa para definir um novo foco; cliques a até 300m de um núcleo usam o núcleo.")
+    # O mapa base (granjas e abatedouro) não muda entre focos; só as camadas de zonas e do
+    # foco são enviadas a cada rerun, e as granjas são carregadas uma vez pelo navegador.
+    static_layer = get_static_map_layer(dataset_fingerprint, df_farms, abatedouro_lat, abatedouro_lon,
+                                        mapa.FARM_LAYER_GEOJSON)
+    map_center = (abatedouro_lat, abatedouro_lon) if abatedouro_lat is not None else (lat_foco, lon_foco)
+    base_map = mapa.build_base_map(
+        static_layer, *map_center, farms_url=get_farms_layer_url(dataset_fingerprint, static_layer)
+    )
+    zones_group, focus_group = mapa.build_layers_for_foci(
+        [(lat_foco, lon_foco, st.session_state.focus_name), *extra_foci]
+    )
+    with desempenho.span("st_folium"):
+        st_folium(
+            base_map,
+            key="mapa_contingencia",
+            height=750,
+            width=None,  # largura do contêiner
+            center=(lat_foco, lon_foco),
+            feature_group_to_add=[zones_group, focus_group],
+            returned_objects=["last_clicked"],
+            on_change=on_map_click,
+        )
 
 with tab2:
     st.header("Plano de Contingência para Influenza Aviária")
@@ -363,293 +444,136 @@ with tab2:
 
 with tab3:
     st.header("Lista de Produtores por Zona de Contingência")
-    classified_nucleos = classify_farms_by_zone(lat_foco, lon_foco, df_farms)
-    
+
     st.info("As listas mostram os núcleos de produção agrupados pela zona de contingência mais restrita em que se encontram.")
 
     # A ordem de exibição é da maior para a menor zona
     zone_order = ["Proteção (10-25km)", "Vigilância (3-10km)", "Perifoco (0-3km)"]
 
-    for zone_name in zone_order:
-        nucleos = classified_nucleos[zone_name]
-        sorted_nucleos = sorted(nucleos.items())
-
-        with st.expander(f"**{zone_name}** - {len(sorted_nucleos)} núcleos"):
-            if not sorted_nucleos:
+    # Cada zona é uma tabela paginada; o conteúdo só é gerado com o expansor aberto.
+    for zone_number, zone_name in enumerate(zone_order):
+        zone_frame = classified_frame[classified_frame['zona'] == zone_name]
+        zone_box = st.expander(f"**{zone_name}** - {len(zone_frame)} núcleos",
+                               key=f"lista_zona_{zone_number}", on_change="rerun")
+        if not zone_box.open:
+            continue
+        with zone_box:
+            if zone_frame.empty:
                 st.write("Nenhum núcleo encontrado nesta zona.")
                 continue
-            
-            for nucleo_id, data in sorted_nucleos:
-                st.subheader(f"Núcleo: {nucleo_id} - {data['proprietario']}")
+
+            col1, col2 = st.columns([2, 1])
+            query = col1.text_input("Buscar núcleo, proprietário ou técnico", key=f"busca_zona_{zone_number}")
+            sort_label = col2.selectbox("Ordenar por", list(PRODUCER_SORTS), key=f"ordem_zona_{zone_number}")
+            view = producer_table(zone_frame, query, sort_label)
+            if view.empty:
+                st.write("Nenhum núcleo corresponde à busca.")
+                continue
+
+            n_pages = -(-len(view) // PRODUCER_PAGE_SIZE)
+            page = 1
+            if n_pages > 1:
+                page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1,
+                                       key=f"pagina_zona_{zone_number}")
+            page_view = view.iloc[(page - 1) * PRODUCER_PAGE_SIZE:page * PRODUCER_PAGE_SIZE]
+
+            event = st.dataframe(
+                page_view,
+                hide_index=True,
+                width="stretch",
+                column_order=["nucleo", "proprietario", "tecnico", "total_aves", "total_area", "n_aviarios"],
+                column_config={
+                    "nucleo": st.column_config.NumberColumn("Núcleo", format="%d"),
+                    "proprietario": "Proprietário",
+                    "tecnico": "Técnico",
+                    "total_aves": st.column_config.NumberColumn("Total de Aves", format="localized"),
+                    "total_area": st.column_config.NumberColumn("Área Total (m²)", format="localized"),
+                    "n_aviarios": "Nº de Aviários",
+                },
+                key=f"tabela_zona_{zone_number}",
+                on_select="rerun",
+                selection_mode="single-row",
+            )
+            st.caption(f"{len(view)} núcleo(s). Selecione uma linha para ver os detalhes do núcleo.")
+
+            # Detalhes do núcleo selecionado
+            if event.selection.rows and event.selection.rows[0] < len(page_view):
+                data = page_view.iloc[event.selection.rows[0]]
+                st.subheader(f"Núcleo: {data['nucleo']} - {data['proprietario']}")
                 col1, col2, col3 = st.columns(3)
                 col1.metric("Total de Aves", f"{int(data['total_aves']):,}".replace(",", "."))
                 col2.metric("Área Total (m²)", f"{int(data['total_area']):,}".replace(",", "."))
                 col3.metric("Nº de Aviários", len(data['aviarios']))
-                
+
                 st.markdown(f"**Técnico:** {data['tecnico']}")
                 st.markdown(f"**Aviários no núcleo:** {str(sorted(data['aviarios']))[1:-1]}")
                 st.markdown(f"**BP da Propriedade:** {str([str(bp) for bp in data['bp_propriedade']])[1:-1]}")
-                st.divider()
-
-# =============================================================================
-# Funções de Exportação para KML
-# =============================================================================
 
-def generate_zones_kml_parts(lat, lon):
-    """Gera as partes KML (estilos e polígonos) para as zonas de contingência."""
-    zones = [
-        {
-            "name": "PROTEÇÃO", 
-            "radius": 25000, 
-            "poly_color": "80FF0000", 
-            "line_color": "ffff0000",
-            "description": "Zona de controle e monitoramento. Fiscalização do trânsito de veículos e produtos avícolas. Barreiras sanitárias para prevenir a entrada do vírus."
-        },
-        {
-            "name": "VIGILANCIA", 
-            "radius": 10000, 
-            "poly_color": "80C800C8", 
-            "line_color": "ffC800C8",
-            "description": "Zona de vigilância ativa. Restrição no trânsito de aves e produtos. Suspensão de GTAs e monitoramento epidemiológico intensivo em todas as propriedades."
-        },
-        {
-            "name": "PERIFOCO", 
-            "radius": 3000, 
-            "poly_color": "800000FF", 
-            "line_color": "ff0000FF",
-            "description": "Área de interdição máxima. Sacrifício de aves e controle total de acesso. Medidas rigorosas de desinfecção e vazio sanitário obrigatório."
+def request_ranking():
+    st.session_state.show_ranking = True
+
+with tab4:
+    st.header("Ranking de Criticidade Regional")
+    st.info("Cada núcleo é tratado como um foco hipotético: o ranking mostra quantos aviários, aves e "
+            "área seriam atingidos em cada zona caso ele fosse positivo.")
+
+    # Todas as abas rodam a cada rerun: o ranking (que avalia cada núcleo como foco) só é
+    # calculado quando pedido, e depois fica em cache por versão da base.
+    if not st.session_state.get("show_ranking"):
+        st.button("Calcular Ranking", key="calcular_ranking", on_click=request_ranking)
+    else:
+        ranking = get_criticality_ranking(dataset_fingerprint, df_farms, spatial_index)
+        sort_options = {
+            "Aves no Perifoco": criticidade.DEFAULT_SORT,
+            "Aves até 10 km (Perifoco + Vigilância)": ["aves_ate_10km"],
+            "Aves até 25 km": ["aves_total"],
+            "Aviários no Perifoco": ["aviarios_perifoco", "aviarios_vigilancia"],
+            "Aviários até 25 km": ["aviarios_total"],
         }
-    ]
-    
-    styles_kml = ""
-    polygons_kml = ""
-
-    for zone in zones:
-        style_id = f"style_{zone['name'].lower().replace('ç', 'c').replace('ã', 'a')}"
-        styles_kml += f'''
-        <Style id="{style_id}">
-          <LineStyle><color>{zone["line_color"]}</color><width>2</width></LineStyle>
-          <PolyStyle><color>{zone["poly_color"]}</color></PolyStyle>
-        </Style>'''
-        
-        coords = []
-        for i in range(65):
-            angle = (i / 64) * 2 * math.pi
-            dx = zone["radius"] * math.cos(angle)
-            dy = zone["radius"] * math.sin(angle)
-            point_lat = lat + (dy / 111111)
-            point_lon = lon + (dx / (111111 * math.cos(math.radians(lat))))
-            coords.append(f"{point_lon},{point_lat},0")
-        polygon_coords = " ".join(coords)
-
-        polygons_kml += f'''
-        <Placemark>
-          <name>{zone["name"]}</name>
-          <description><![CDATA[{zone["description"]}]]></description>
-          <styleUrl>#{style_id}</styleUrl>
-          <Polygon>
-            <outerBoundaryIs><LinearRing><coordinates>{polygon_coords}</coordinates></LinearRing></outerBoundaryIs>
-          </Polygon>
-        </Placemark>'''
-    return styles_kml, polygons_kml
-
-def generate_foco_kml_parts(lat, lon, focus_name):
-    """Gera as partes KML (estilo e placemark) para o ponto de foco."""
-    foco_placemark = f'''
-    <Placemark>
-      <name>{focus_name}</name>
-      <description><![CDATA[Ponto central do foco de influenza aviária.]]></description>
-      <styleUrl>#style_foco</styleUrl>
-      <Point><coordinates>{lon},{lat},0</coordinates></Point>
-    </Placemark>'''
-    
-    foco_style = '''
-    <Style id="style_foco">
-        <IconStyle>
-            <Icon><href>http://maps.google.com/mapfiles/kml/shapes/caution.png</href></Icon>
-            <scale>1.5</scale>
-        </IconStyle>
-    </Style>'''
-    return foco_style, foco_placemark
-
-def generate_farms_kml_parts(df):
-    """Gera as partes KML (estilo e placemarks) para os pontos das granjas."""
-    kml_placemarks = []
-    if not df.empty:
-        for _, row in df.iterrows():
-            try:
-                coords = row['coordenadas'].split(',')
-                lat, lon = float(coords[0].strip()), float(coords[1].strip())
-                
-                description_html = "<table border='1' style='width:100%; border-collapse: collapse;'>"
-                for key, value in row.items():
-                    description_html += f"<tr><td style='padding: 5px;'><b>{key.replace('_', ' ').title()}</b></td><td style='padding: 5px;'>{value}</td></tr>"
-                description_html += "</table>"
-
-                kml_placemarks.append(f'''
-                <Placemark>
-                  <name>{row.get("proprietario", "N/A")}</name>
-                  <description><![CDATA[{description_html}]]></description>
-                  <styleUrl>#chickenIcon</styleUrl>
-                  <Point><coordinates>{lon},{lat},0</coordinates></Point>
-                </Placemark>''')
-            except (ValueError, IndexError):
-                continue
-    
-    icon_style = '''
-    <Style id="chickenIcon">
-        <IconStyle>
-            <scale>0.8</scale>
-            <Icon><href>https://maps.google.com/mapfiles/kml/paddle/grn-circle.png</href></Icon>
-        </IconStyle>
-        <LabelStyle><scale>0</scale></LabelStyle>
-    </Style>'''
-    
-    return icon_style, "\n".join(kml_placemarks)
-
-def merge_kml_contents(zone_styles, zone_polygons, foco_style, foco_placemark, farm_style, farm_placemarks):
-    """Combina múltiplos conteúdos KML em um único documento com pastas."""
-    
-    final_kml = f'''<?xml version="1.0" encoding="UTF-8"?>
-<kml xmlns="http://www.opengis.net/kml/2.2">
-  <Document>
-    <name>Zonas de Contingência e Granjas</name>
-    
-    <!-- Estilos -->
-    {zone_styles}
-    {foco_style}
-    {farm_style}
-
-    <!-- Pastas com os dados -->
-    <Folder>
-        <name>Zonas de Contenção</name>
-        {zone_polygons}
-    </Folder>
-    <Folder>
-        <name>Foco</name>
-        {foco_placemark}
-    </Folder>
-    <Folder>
-        <name>Produtores</name>
-        {farm_placemarks}
-    </Folder>
-  </Document>
-</kml>'''
-    return final_kml
-
-from fpdf import FPDF
-import datetime
-
-# =============================================================================
-# Funções de Relatório
-# =============================================================================
-
-def generate_report_html(classified_data, lat, lon):
-    """Gera uma string HTML formatada para impressão."""
-    now = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    
-    html = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: sans-serif; }}
-            h1, h2, h3 {{ color: #333; }}
-            table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
-            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            th {{ background-color: #f2f2f2; }}
-            .header {{ margin-bottom: 30px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Relatório de Zonas de Contingência</h1>
-            <p>Gerado em: {now}</p>
-            <p>Coordenadas do Foco: Latitude={lat}, Longitude={lon}</p>
-        </div>
-    """
-
-    zone_order = ["Perifoco (0-3km)", "Vigilância (3-10km)", "Proteção (10-25km)"]
-    for zone_name in zone_order:
-        nucleos = classified_data[zone_name]
-        sorted_nucleos = sorted(nucleos.items())
-        
-        html += f"<h2>{zone_name} ({len(sorted_nucleos)} núcleos)</h2>"
-        
-        if not sorted_nucleos:
-            html += "<p>Nenhum núcleo encontrado nesta zona.</p>"
-            continue
-
-        html += "<table><tr><th>Núcleo</th><th>Proprietário</th><th>Técnico</th><th>Aviários</th><th>Total Aves</th><th>Área Total (m²)</th><th>BP Propriedade</th></tr>"
-        for nucleo_id, data in sorted_nucleos:
-            html += f"""<tr>
-                <td>{nucleo_id}</td>
-                <td>{data['proprietario']}</td>
-                <td>{data['tecnico']}</td>
-                <td>{str(sorted(data['aviarios']))[1:-1]}</td>
-                <td>{int(data['total_aves'])}</td>
-                <td>{int(data['total_area'])}</td>
-                <td>{str([str(bp) for bp in data['bp_propriedade']])[1:-1]}</td>
-            </tr>"""
-        html += "</table>"
-
-    html += """</body></html>"""
-    return html
-
-def generate_pdf_report(classified_data, lat, lon, focus_name):
-    """Gera um relatório em PDF a partir dos dados classificados."""
-    print("[INFO] Gerando relatório PDF...")
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-    
-    pdf.cell(0, 10, "Relatório de Zonas de Contingência", 0, 1, "C")
-    pdf.ln(10)
-    
-    now = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 8, f"Gerado em: {now}", 0, 1)
-    pdf.cell(0, 8, f"Foco: {focus_name} (Latitude={lat}, Longitude={lon})", 0, 1)
-    pdf.ln(10)
-
-    zone_order = ["Perifoco (0-3km)", "Vigilância (3-10km)", "Proteção (10-25km)"]
-    for zone_name in zone_order:
-        nucleos = classified_data[zone_name]
-        sorted_nucleos = sorted(nucleos.items())
-        
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, f"{zone_name} ({len(sorted_nucleos)} núcleos)", 0, 1)
-        
-        if not sorted_nucleos:
-            pdf.set_font("Arial", "I", 10)
-            pdf.cell(0, 10, " Nenhum núcleo encontrado nesta zona.", 0, 1)
-            pdf.ln(5)
-            continue
-
-        for nucleo_id, data in sorted_nucleos:
-            pdf.ln(5)
-            pdf.set_font("Arial", "B", 11)
-            pdf.cell(0, 7, f"Núcleo: {nucleo_id} - {data['proprietario']}", 0, 1)
-            pdf.set_font("Arial", "", 10)
-            pdf.multi_cell(0, 6, f"  Técnico: {data['tecnico']}", ln=1)
-            pdf.multi_cell(0, 6, f"  Total de Aves: {int(data['total_aves']):,}".replace(",", "."), ln=1)
-            pdf.multi_cell(0, 6, f"  Área Total (m²): {int(data['total_area']):,}".replace(",", "."), ln=1)
-            pdf.multi_cell(0, 6, f"  Nº de Aviários: {len(data['aviarios'])}", ln=1)
-            pdf.multi_cell(0, 6, f"  Aviários no núcleo: {str(sorted(data['aviarios']))[1:-1]}", ln=1)
-            pdf.multi_cell(0, 6, f"  BP da Propriedade: {str([str(bp) for bp in data['bp_propriedade']])[1:-1]}", ln=1)
-
-            # Adicionar coordenadas e link do Google Maps
-            lat, lon = data['latitude'], data['longitude']
-            maps_link = f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
-            pdf.multi_cell(0, 6, f"  Coordenadas: {lat}, {lon}", ln=1)
-            pdf.set_text_color(0, 0, 255)
-            pdf.set_font("Arial", "U", 10)
-            pdf.multi_cell(0, 6, f"  Abrir no Google Maps", ln=1, link=maps_link)
-            pdf.set_font("Arial", "", 10)
-            pdf.set_text_color(0, 0, 0)
-        pdf.ln(10)
-        
-    return bytes(pdf.output())
-
+        sort_label = st.selectbox("Ordenar por", list(sort_options))
+        view = ranking.assign(aves_ate_10km=ranking["aves_perifoco"] + ranking["aves_vigilancia"])
+        view = view.sort_values(sort_options[sort_label], ascending=False, kind="stable")
+        st.dataframe(view.drop(columns="aves_ate_10km"), hide_index=True, width="stretch")
+
+        st.download_button(
+            label="📥 Baixar Ranking (CSV)",
+            data=lambda: ranking.to_csv(sep=";", index=False).encode("utf-8"),
+            file_name="criticidade_nucleos.csv",
+            mime="text/csv"
+        )
+
+with tab5:
+    st.header("Sensibilidade dos Raios")
+    st.info("Veja como os totais atingidos mudam com os raios das zonas. As distâncias do foco atual são "
+            "calculadas uma única vez; cada conjunto de raios é avaliado instantaneamente.")
+    sweep = get_radius_sweep(lat_foco, lon_foco, df_farms, dataset_fingerprint, extra_foci)
+
+    col1, col2, col3 = st.columns(3)
+    perifoco_km = col1.slider("Perifoco (km)", 0.5, 10.0, 3.0, 0.5)
+    vigilancia_km = col2.slider("Vigilância (km)", 1.0, 30.0, 10.0, 0.5)
+    protecao_km = col3.slider("Proteção (km)", 5.0, 50.0, 25.0, 0.5)
+
+    radius_sets = dict(sensibilidade.RADIUS_PRESETS)
+    if perifoco_km < vigilancia_km < protecao_km:
+        radius_sets["Selecionado"] = (perifoco_km * 1000, vigilancia_km * 1000, protecao_km * 1000)
+    else:
+        st.warning("Os raios devem ser crescentes: Perifoco < Vigilância < Proteção.")
+
+    rows = []
+    for label, radii in radius_sets.items():
+        totals = sweep.zone_totals(radii)
+        row = {"Raios": label}
+        for z, zone_label in enumerate(["Perifoco", "Vigilância", "Proteção"]):
+            row[f"Aves - {zone_label}"] = int(totals["aves"][z])
+            row[f"Aviários - {zone_label}"] = int(totals["aviarios"][z])
+        rows.append(row)
+    st.dataframe(pd.DataFrame(rows), hide_index=True, width="stretch")
+
+    metric_labels = {"Aves": "aves", "Aviários": "aviarios", "Área (m²)": "area"}
+    metric_label = st.selectbox("Métrica da curva", list(metric_labels))
+    curve = sweep.curve(max_radius_m=50000, step_m=250)
+    st.caption(f"{metric_label} acumulados até cada raio a partir do foco atual.")
+    st.line_chart(curve, x="raio_km", y=metric_labels[metric_label], x_label="Raio (km)", y_label=metric_label)
 
 # =============================================================================
 # Lógica de Exportação na Barra Lateral
@@ -657,59 +581,130 @@ def generate_pdf_report(classified_data, lat, lon, focus_name):
 
 st.sidebar.header("Relatório e Exportação")
 
-# Botão para baixar o mapa HTML
-map_html_for_download = generate_full_map(lat_foco, lon_foco, df_farms, abatedouro_lat, abatedouro_lon, st.session_state.focus_name)
-st.sidebar.download_button(
-    label="📥 Baixar Mapa (HTML)",
-    data=map_html_for_download,
-    file_name="mapa_contingencia.html",
-    mime="text/html"
-)
-
-# Botão para gerar o relatório de impressão
-if st.sidebar.button("Gerar Relatório para Impressão"):
-    classified_data = classify_farms_by_zone(lat_foco, lon_foco, df_farms)
-    report_html = generate_report_html(classified_data, lat_foco, lon_foco)
-    st.session_state.report_html = report_html
-
-# Botão para baixar o relatório em PDF
-classified_data_for_pdf = classify_farms_by_zone(lat_foco, lon_foco, df_farms)
-_pdf_data = generate_pdf_report(classified_data_for_pdf, lat_foco, lon_foco, st.session_state.focus_name)
-st.sidebar.download_button(
-    label="📄 Baixar Relatório (PDF)",
-    data=_pdf_data,
-    file_name="relatorio_contingencia.pdf",
-    mime="application/pdf"
-)
-
-# Lógica para o botão de download KML
-if st.sidebar.button("Preparar KML para Download"):
-    print("\n[INFO] Iniciando geração de KML para download...")
-    
-    # Gerar partes KML separadamente
-    zone_styles, zone_polygons = generate_zones_kml_parts(lat_foco, lon_foco)
-    foco_style, foco_placemark = generate_foco_kml_parts(lat_foco, lon_foco, st.session_state.focus_name)
-    farm_style, farm_placemarks = generate_farms_kml_parts(df_farms)
-    
-    # Combinar em um único KML com pastas
-    final_kml_data = merge_kml_contents(
-        zone_styles, zone_polygons, 
-        foco_style, foco_placemark, 
-        farm_style, farm_placemarks
-    )
-    
-    st.session_state.kml_data = final_kml_data
-    print("[INFO] Dados KML prontos para download.")
-
-if 'kml_data' in st.session_state and st.session_state.kml_data:
-    st.sidebar.download_button(
-        label="📥 Baixar Arquivo KML",
-        data=st.session_state.kml_data,
-        file_name="zonas_contingencia_completo.kml",
-        mime="application/vnd.google-earth.kml+xml"
-    )
-
-if 'report_html' in st.session_state and st.session_state.report_html:
-    with st.expander("Visualizar Relatório para Impressão", expanded=True):
-        st.info("Use a função 'Imprimir' do seu navegador (Ctrl+P) e 'Salvar como PDF' para gerar o documento.")
-        st.components.v1.html(st.session_state.report_html, height=800, scrolling=True)
+def export_key(kind):
+    """Chave do artefato para o foco e a versão da base atuais (a mesma para todas as sessões)."""
+    return focus_key(kind, dataset_fingerprint, lat_foco, lon_foco, zonas.ZONE_RADII, st.session_state.focus_name,
+                     extra_foci)
+
+def export_builder(kind, write):
+    """Builder da fila de exportações: grava o artefato medindo o tempo e o tamanho (painel Desempenho)."""
+    def build(fileobj, progress):
+        with desempenho.span(f"exportacao.{kind}"):
+            write(fileobj, progress)
+        desempenho.record_size(kind, fileobj.tell(), into=session_payloads)
+    return build
+
+# Valores lidos pelas exportações, que rodam em threads da fila, fora do script.
+export_focus_name = st.session_state.focus_name
+focus_name = export_focus_name
+if extra_foci:
+    focus_name += f" + {len(extra_foci)} focos adicionais"
+
+def write_map(fileobj, progress):
+    fileobj.write(generate_full_map(lat_foco, lon_foco, df_farms, dataset_fingerprint, abatedouro_lat,
+                                    abatedouro_lon, export_focus_name, extra_foci=extra_foci).encode("utf-8"))
+
+def write_print_report(fileobj, progress):
+    write_report_html(fileobj, classified_nucleos, lat_foco, lon_foco)
+
+def write_pdf(fileobj, progress):
+    write_pdf_report(fileobj, classified_nucleos, lat_foco, lon_foco, focus_name)
+
+def write_kmz(fileobj, progress):
+    """KMZ completo (zonas, foco e granjas, com o ícone embutido), gravado em fluxo no arquivo."""
+    empacotar_kmz.write_contingency_kmz(fileobj, lat_foco, lon_foco, df_farms, export_focus_name,
+                                        extra_foci=extra_foci)
+
+# Artefatos exportáveis: (tipo, rótulo, nome do arquivo, tipo MIME, função que grava o artefato)
+exports = [
+    ("mapa_html", "Mapa (HTML)", "mapa_contingencia.html", "text/html", write_map),
+    ("relatorio_html", "Relatório (HTML)", "relatorio_contingencia.html", "text/html", write_print_report),
+    ("relatorio_pdf", "Relatório (PDF)", "relatorio_contingencia.pdf", "application/pdf", write_pdf),
+]
+if extra_foci:
+    # Com vários focos: um relatório PDF por foco, gerados em paralelo e reunidos em um ZIP
+    focus_reports = [(f"foco_{i}.pdf", f_lat, f_lon, f_name) for i, (f_lat, f_lon, f_name) in
+                     enumerate([(lat_foco, lon_foco, export_focus_name), *extra_foci], start=1)]
+
+    def write_focus_reports(fileobj, progress):
+        write_report_batch(fileobj, focus_reports, df_farms, index=spatial_index, progress=progress)
+
+    exports.append(("relatorios_pdf_zip", "Relatórios por Foco (ZIP)", "relatorios_focos.zip", "application/zip",
+                    write_focus_reports))
+exports.append(("kmz", "Arquivo KMZ", "zonas_contingencia_completo.kmz", "application/vnd.google-earth.kmz", write_kmz))
+
+def export_running(kind):
+    job = get_export_queue().job(export_key(kind))
+    return job is not None and job.status in ("na fila", "gerando")
+
+def export_panel(polling):
+    """
+    Botões de exportação: "Preparar" agenda o artefato na fila, o progresso é mostrado
+    enquanto ele é gerado e, quando pronto, o download lê o arquivo do cache em disco.
+    Com exportações em andamento o painel se atualiza sozinho, sem refazer o resto da página.
+    """
+    queue = get_export_queue()
+    for kind, label, file_name, mime, write in exports:
+        key = export_key(kind)
+        job = queue.job(key)
+        if queue.ready(key):
+            st.download_button(f"📥 Baixar {label}", data=lambda key=key: queue.read(key) or b"",
+                               file_name=file_name, mime=mime, key=f"baixar_{kind}")
+        elif job is not None and job.status == "erro":
+            st.error(f"{label}: falha na geração ({job.error})")
+            st.button(f"Tentar novamente: {label}", key=f"refazer_{kind}", on_click=queue.submit,
+                      args=(key, label, export_builder(kind, write)))
+        elif job is not None:
+            detail = job.detail or f"{job.written_bytes() / 1e6:.1f} MB"
+            st.progress(job.fraction or 0.0, text=f"{label}: {job.status} ({job.elapsed_s():.0f} s, {detail})")
+        else:
+            st.button(f"Preparar {label}", key=f"preparar_{kind}", on_click=queue.submit,
+                      args=(key, label, export_builder(kind, write)))
+    if any(export_running(kind) for kind, *_ in exports) != polling:
+        # Liga ou desliga a atualização periódica do painel e mostra os resultados na página.
+        st.rerun()
+
+def request_print_report():
+    get_export_queue().submit(export_key("relatorio_html"), "Relatório (HTML)",
+                              export_builder("relatorio_html", write_print_report))
+    st.session_state.show_print_report = True
+
+# --- Exportações (geradas em segundo plano; ver src/exportacao.py) ---
+st.sidebar.subheader("Exportações")
+st.sidebar.button("Gerar Relatório para Impressão", on_click=request_print_report)
+export_polling = any(export_running(kind) for kind, *_ in exports)
+with st.sidebar:
+    st.fragment(export_panel, run_every=1.0 if export_polling else None)(export_polling)
+
+if st.session_state.get("show_print_report"):
+    print_report = get_export_queue().read(export_key("relatorio_html"))
+    if print_report is not None:
+        with st.expander("Visualizar Relatório para Impressão", expanded=True):
+            st.info("Use a função 'Imprimir' do seu navegador (Ctrl+P) e 'Salvar como PDF' para gerar o documento.")
+            st.components.v1.html(print_report.decode("utf-8"), height=800, scrolling=True)
+    elif export_running("relatorio_html"):
+        st.info("Relatório para impressão em preparação...")
+
+# Painel de desempenho do rerun corrente (também gravado em logs/desempenho.jsonl)
+with st.sidebar.expander("⏱️ Desempenho"):
+    st.caption(f"Rerun {rerun_recorder.id}: {rerun_recorder.elapsed_ms():.0f} ms")
+    if rerun_recorder.spans:
+        st.markdown("**Etapas**")
+        st.dataframe(pd.DataFrame({
+            "etapa": ["  " * depth + name for name, _, depth in rerun_recorder.spans],
+            "ms": [round(ms, 1) for _, ms, _ in rerun_recorder.spans],
+        }), hide_index=True, width="stretch")
+    if rerun_recorder.cache:
+        st.markdown("**Caches**")
+        st.dataframe(pd.DataFrame(
+            [(name, hits, misses) for name, (hits, misses) in rerun_recorder.cache.items()],
+            columns=["cache", "acertos", "faltas"],
+        ), hide_index=True, width="stretch")
+    session_payloads.update(rerun_recorder.payloads)
+    if session_payloads:
+        st.markdown("**Artefatos**")
+        st.dataframe(pd.DataFrame(
+            [(name, nbytes / 1024) for name, nbytes in session_payloads.items()], columns=["artefato", "KB"]
+        ).round(1), hide_index=True, width="stretch")
+
+desempenho.finish_rerun(rerun_recorder)
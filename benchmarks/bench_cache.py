@@ -0,0 +1,81 @@
+"""
+Compara o custo de cache por chamada antes e depois da camada LRU com chaves explícitas.
+
+Antes: @st.cache_data em haversine_distance (hash + pickle por distância escalar) e em
+funções que recebem o DataFrame inteiro (hash do DataFrame a cada rerun).
+Depois: LRUCache com chave (fingerprint, foco arredondado, raios) e funções matemáticas sem cache.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_cache.py [--repeat 20] [--calls 50]
+"""
+import argparse
+import math
+import os
+import sys
+import timeit
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import streamlit as st
+
+from src import dados, zonas
+from src.cache import LRUCache, focus_key
+from benchmarks.sintetico import replicate_dataset
+
+
+def _haversine_scalar(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * 6371000
+
+
+def per_call_ms(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20, help="cópias da base real (1117 aviários cada)")
+    parser.add_argument("--calls", type=int, default=50, help="chamadas por medição")
+    args = parser.parse_args()
+
+    df = dados.load_farm_table(os.path.join(PROJECT_ROOT, "data", "coordenadas.csv"))
+    df = replicate_dataset(df, len(df) * args.repeat)
+    fingerprint = "bench"
+    lat, lon = -24.33160375868075, -53.85489414802796
+    result = zonas.classify_farms_by_zone(lat, lon, df)
+    print(f"Base sintética: {len(df)} aviários\n")
+
+    # --- Antes -------------------------------------------------------------
+    cached_haversine = st.cache_data(_haversine_scalar)
+
+    @st.cache_data
+    def classify_old(lat_foco, lon_foco, df):
+        return result
+
+    cached_haversine(lon, lat, -53.8, -24.3)
+    classify_old(lat, lon, df)
+    haversine_cached_ms = per_call_ms(lambda: cached_haversine(lon, lat, -53.8, -24.3), args.calls * 10)
+    haversine_plain_ms = per_call_ms(lambda: _haversine_scalar(lon, lat, -53.8, -24.3), args.calls * 10)
+    classify_hit_old_ms = per_call_ms(lambda: classify_old(lat, lon, df), args.calls)
+
+    # --- Depois ------------------------------------------------------------
+    cache = LRUCache(maxsize=256)
+    key = focus_key("classificacao", fingerprint, lat, lon, zonas.ZONE_RADII)
+    cache.put(key, result)
+    classify_hit_new_ms = per_call_ms(
+        lambda: cache.get_or_compute(focus_key("classificacao", fingerprint, lat, lon, zonas.ZONE_RADII), lambda: result),
+        args.calls,
+    )
+
+    print(f"{'Medição':<58}{'ms/chamada':>12}")
+    print(f"{'haversine escalar com @st.cache_data (antes)':<58}{haversine_cached_ms:>12.4f}")
+    print(f"{'haversine escalar sem cache (depois)':<58}{haversine_plain_ms:>12.4f}")
+    print(f"{'  x aviários, por foco (antes)':<58}{haversine_cached_ms * len(df):>12.1f}")
+    print(f"{'acerto de cache da classificação, hash do df (antes)':<58}{classify_hit_old_ms:>12.4f}")
+    print(f"{'acerto de cache da classificação, LRU por chave (depois)':<58}{classify_hit_new_ms:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compara o tamanho do HTML e o tempo de geração do mapa nos dois modos da camada de granjas:
+um CircleMarker por aviário ("marcadores") e uma FeatureCollection deduplicada ("geojson").
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_mapa.py [--sizes 1000 10000 100000] [--skip-markers-above 10000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import dados, mapa
+from benchmarks.sintetico import replicate_dataset
+
+FOCUS = (-24.33160375868075, -53.85489414802796)
+
+
+def measure(df, mode):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        html = mapa.render_full_map(FOCUS[0], FOCUS[1], df, None, None, "Benchmark", farm_mode=mode)
+    return time.perf_counter() - start, len(html.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--skip-markers-above", type=int, default=100000,
+                        help="não mede o modo 'marcadores' acima deste número de aviários")
+    args = parser.parse_args()
+
+    base = dados.load_farm_table(os.path.join(PROJECT_ROOT, "data", "coordenadas.csv"))
+    print(f"{'aviários':>10} {'pontos':>8} {'modo':>11} {'tempo (s)':>10} {'HTML (MB)':>10}")
+    for size in args.sizes:
+        df = replicate_dataset(base, size)
+        points = len(mapa.farm_points(df))
+        for mode in (mapa.FARM_LAYER_MARKERS, mapa.FARM_LAYER_GEOJSON):
+            if mode == mapa.FARM_LAYER_MARKERS and size > args.skip_markers_above:
+                print(f"{size:>10} {points:>8} {mode:>11} {'-':>10} {'-':>10}")
+                continue
+            seconds, nbytes = measure(df, mode)
+            print(f"{size:>10} {points:>8} {mode:>11} {seconds:>10.2f} {nbytes / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Suíte de benchmarks das etapas do aplicativo, fora do Streamlit, sobre bases sintéticas
+agrupadas como os núcleos reais (benchmarks/sintetico.replicate_dataset).
+
+Para cada tamanho de base mede o tempo (melhor de até --repeticoes execuções) e o pico de
+memória alocada (tracemalloc, em uma execução à parte) de cada etapa, e grava tudo em JSON
+para comparar versões.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_suite.py [--tamanhos 1000 10000 100000 1000000] [--saida output/bench.json]
+    python benchmarks/bench_suite.py --tamanhos 1000 10000 --comparar output/bench_anterior.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Windows: sem getrusage, o pico de memória do processo não é registrado.
+    resource = None
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import base_colunar, dados, empacotar_kmz, mapa, zonas
+from src.indice_espacial import SpatialIndex
+from src.relatorio import generate_pdf_report, generate_report_html
+from benchmarks.sintetico import replicate_dataset
+
+ABATEDOURO = empacotar_kmz.read_default_focus()
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "output", "bench_suite.json")
+
+# Etapas que geram arquivos proporcionais à base (mapa, KMZ e relatórios do foco).
+EXPORT_STEPS = {"generate_full_map", "write_contingency_kmz", "generate_report_html", "generate_pdf_report"}
+
+
+def measure(function, repeat):
+    """Melhor tempo (s) entre até `repeat` execuções; etapas acima de 1 s rodam uma vez só."""
+    times = []
+    while len(times) < repeat:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        times.append(time.perf_counter() - start)
+        if times[0] > 1.0:
+            break
+    return min(times), times
+
+
+def peak_memory_mb(function):
+    """Pico de memória alocada (MB) durante uma execução, medido com tracemalloc."""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo (MB), ou None onde getrusage não existe."""
+    if resource is None:
+        return None
+    # ru_maxrss é em KB no Linux e em bytes no macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def write_synthetic_csv(csv_path, n_rows, seed=0):
+    """Grava em csv_path uma base de n_rows aviários replicada da real, no esquema do CSV (sem lat/lon)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = dados.load_farm_table(CSV_PATH)
+    base = base.loc[base['nucleo'].notna()].reset_index(drop=True)
+    replicate_dataset(base, n_rows, seed=seed).drop(columns=['lat', 'lon']).to_csv(csv_path, sep=';', index=False)
+
+
+def nearby_foci(df, count, seed=0):
+    """Focos de teste: posições de aviários sorteados, deslocadas até ~200 m."""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(df), count)
+    jitter = rng.uniform(-0.002, 0.002, (count, 2))
+    return df['lat'].to_numpy()[rows] + jitter[:, 0], df['lon'].to_numpy()[rows] + jitter[:, 1]
+
+
+def dataset_steps(csv_path, cache_dir, n_foci):
+    """Etapas medidas para uma base; cada uma é (nome, função). A ordem respeita as dependências."""
+    state = {}
+
+    def load_csv():
+        state['df'] = dados.load_farm_table(csv_path)
+
+    def load_cache():
+        state['df'], _ = base_colunar.load(csv_path, cache_dir)
+
+    def build_index():
+        df = state['df']
+        state['index'] = SpatialIndex(df['lat'].to_numpy(), df['lon'].to_numpy())
+        state['foci'] = nearby_foci(df, n_foci)
+
+    def closest_nucleus():
+        # Como find_closest_nucleus no aplicativo: aproximação a até 300 m e nome do núcleo.
+        df, index, names = state['df'], state['index'], []
+        for lat, lon in zip(*state['foci']):
+            closest, _ = index.nearest(lat, lon, max_distance_m=300)
+            if closest is not None:
+                row = df.iloc[closest]
+                names.append(f"Núcleo {row.get('nucleo', 'N/A')} - {row.get('proprietario', 'N/A')}")
+        state['closest'] = names
+
+    def classify():
+        frame = zonas.classify_zone_frame(*ABATEDOURO, state['df'], index=state['index'])
+        state['classified'] = zonas.zone_frame_to_dict(frame)
+
+    def full_map():
+        mapa.render_full_map(*ABATEDOURO, state['df'], *ABATEDOURO, "Benchmark")
+
+    def kmz():
+        with tempfile.TemporaryFile() as f:
+            empacotar_kmz.write_contingency_kmz(f, *ABATEDOURO, state['df'], "Benchmark")
+
+    def report_html():
+        generate_report_html(state['classified'], *ABATEDOURO)
+
+    def report_pdf():
+        generate_pdf_report(state['classified'], *ABATEDOURO, "Benchmark")
+
+    # load_farm_data: leitura do CSV (primeira carga de uma versão) e do cache colunar (demais).
+    base_colunar.load(csv_path, cache_dir)
+    return [
+        ("load_farm_data (csv)", load_csv),
+        ("load_farm_data (cache colunar)", load_cache),
+        ("spatial_index", build_index),
+        (f"find_closest_nucleus (x{n_foci})", closest_nucleus),
+        ("classify_farms_by_zone", classify),
+        ("generate_full_map", full_map),
+        ("write_contingency_kmz", kmz),
+        ("generate_report_html", report_html),
+        ("generate_pdf_report", report_pdf),
+    ]
+
+
+def run_size(n_rows, args):
+    """Mede todas as etapas em uma base sintética de n_rows aviários; retorna os registros."""
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "coordenadas.csv")
+        write_synthetic_csv(csv_path, n_rows, args.semente)
+        for name, function in dataset_steps(csv_path, os.path.join(tmp, "cache"), args.focos):
+            if name in EXPORT_STEPS and n_rows > args.limite_exportacoes:
+                records.append({"aviarios": n_rows, "etapa": name, "segundos": None, "execucoes": [],
+                                "pico_memoria_mb": None, "observacao": "pulada (--limite-exportacoes)"})
+                print(f"{n_rows:>10} {name:<36} {'-':>10} {'-':>10}")
+                continue
+            seconds, times = measure(function, args.repeticoes)
+            peak = peak_memory_mb(function) if not args.sem_memoria else None
+            records.append({"aviarios": n_rows, "etapa": name, "segundos": seconds, "execucoes": times,
+                            "pico_memoria_mb": peak})
+            peak_text = f"{peak:>10.1f}" if peak is not None else f"{'-':>10}"
+            print(f"{n_rows:>10} {name:<36} {seconds:>10.3f} {peak_text}")
+    return records
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(records, previous_path, tolerance):
+    """Imprime a razão de tempo entre esta execução e um JSON anterior, marcando as regressões."""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r["aviarios"], r["etapa"]): r for r in json.load(f)["resultados"]}
+    print(f"\nComparação com {previous_path}:")
+    print(f"{'aviários':>10} {'etapa':<36} {'antes (s)':>10} {'agora (s)':>10} {'razão':>7}")
+    for record in records:
+        old = previous.get((record["aviarios"], record["etapa"]))
+        if old is None or not old["segundos"] or record["segundos"] is None:
+            continue
+        ratio = record["segundos"] / old["segundos"]
+        # Diferenças de poucos milissegundos são ruído de medição.
+        slower = ratio > 1 + tolerance and record["segundos"] - old["segundos"] > 0.005
+        flag = "  REGRESSÃO" if slower else ""
+        print(f"{record['aviarios']:>10} {record['etapa']:<36} {old['segundos']:>10.3f} "
+              f"{record['segundos']:>10.3f} {ratio:>7.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede as etapas do aplicativo em bases sintéticas.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="número de aviários de cada base sintética")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções por etapa (etapas > 1 s rodam uma vez)")
+    parser.add_argument("--focos", type=int, default=200, help="focos consultados em find_closest_nucleus")
+    parser.add_argument("--limite-exportacoes", type=int, default=100000,
+                        help="não mede mapa, KMZ e relatórios acima deste número de aviários")
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (mais rápido)")
+    parser.add_argument("--semente", type=int, default=0, help="semente das bases sintéticas")
+    parser.add_argument("--saida", default=OUTPUT_PATH, help="JSON com os resultados (padrão: output/bench_suite.json)")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="aumento relativo de tempo tratado como regressão")
+    args = parser.parse_args(argv)
+
+    print(f"{'aviários':>10} {'etapa':<36} {'tempo (s)':>10} {'pico (MB)':>10}")
+    records = []
+    for n_rows in args.tamanhos:
+        records.extend(run_size(n_rows, args))
+
+    result = {"metadados": metadata(), "pico_rss_mb": peak_rss_mb(), "resultados": records}
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em: {args.saida}")
+    if args.comparar:
+        compare(records, args.comparar, args.tolerancia)
+
+
+if __name__ == "__main__":
+    main()
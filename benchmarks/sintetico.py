@@ -0,0 +1,34 @@
+"""Bases sintéticas de granjas, no mesmo esquema de data/coordenadas.csv, para benchmarks."""
+import os
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def replicate_dataset(df, n_rows, seed=0, spread_deg=0.05):
+    """
+    Replica a base (já lida por dados.load_farm_table) até n_rows aviários. Cada cópia de um
+    núcleo é deslocada em bloco (normal, spread_deg graus, ~5 km), preservando os aviários que
+    compartilham a mesma coordenada: a base continua concentrada na região dos núcleos reais,
+    com densidade crescente com n_rows. Fazendas, núcleos e BPs ganham códigos novos a cada cópia.
+    """
+    rng = np.random.default_rng(seed)
+    copies = -(-n_rows // len(df))
+    frames = []
+    for i in range(copies):
+        copy = df.copy()
+        if i:
+            codes, uniques = pd.factorize(copy['nucleo'])
+            shift = rng.normal(0, spread_deg, (len(uniques), 2))
+            copy['lat'] = copy['lat'] + shift[codes, 0]
+            copy['lon'] = copy['lon'] + shift[codes, 1]
+            copy['coordenadas'] = copy['lat'].map('{:.6f}'.format) + ',' + copy['lon'].map('{:.6f}'.format)
+            copy['fazenda'] = copy['fazenda'] + i * 100000
+            copy['nucleo'] = copy['nucleo'] + i * 10000
+            for column in ('bp_associado', 'bp_propriedade'):
+                if column in copy.columns:
+                    copy[column] = copy[column] + i * 1000000
+        frames.append(copy)
+    return pd.concat(frames, ignore_index=True).iloc[:n_rows]
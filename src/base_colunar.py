@@ -0,0 +1,146 @@
+"""
+Cache colunar da base de granjas: o CSV é lido e limpo uma única vez por versão e gravado em
+cache/base_<fingerprint>/, com as colunas numéricas em arquivos .npy (abertos com mmap, sem
+cópia e compartilháveis entre processos) e as demais em Parquet, com os tipos do esquema.
+
+A versão do CSV é conferida pelo mtime e tamanho do arquivo; só quando eles mudam o conteúdo
+é lido para o hash, e o cache só é refeito se o hash também mudou.
+
+Uso (na raiz do projeto):
+    python -m src.base_colunar [--csv data/coordenadas.csv] [--refazer]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import dados
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+
+MANIFEST_NAME = "manifesto.json"
+TABLE_NAME = "tabela.parquet"
+
+
+def cache_path(fingerprint, directory=CACHE_DIR):
+    return os.path.join(directory, f"base_{fingerprint}")
+
+
+def _pointer_path(csv_path, directory):
+    """Arquivo com a última versão (mtime, tamanho, fingerprint) vista de um CSV."""
+    key = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+    return os.path.join(directory, f"base_{key}.json")
+
+
+def _read_json(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(file_path, data):
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, file_path)
+
+
+def _is_array_column(series):
+    """Colunas gravadas em .npy: numéricas com dtype NumPy (sem extensões do pandas)."""
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf'
+
+
+def save_table(df, fingerprint, directory=CACHE_DIR):
+    """Grava a tabela tipada em cache/base_<fingerprint>/ de forma atômica (pasta temporária + rename)."""
+    target = cache_path(fingerprint, directory)
+    tmp_dir = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    arrays = [c for c in df.columns if _is_array_column(df[c])]
+    for column in arrays:
+        np.save(os.path.join(tmp_dir, f"{column}.npy"), df[column].to_numpy())
+    df.drop(columns=arrays).to_parquet(os.path.join(tmp_dir, TABLE_NAME), index=False)
+    _write_json(os.path.join(tmp_dir, MANIFEST_NAME),
+                {"fingerprint": fingerprint, "columns": list(df.columns), "arrays": arrays})
+    try:
+        os.replace(tmp_dir, target)
+    except OSError:
+        # Outro processo gravou a mesma versão antes.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target
+
+
+def load_table(fingerprint, directory=CACHE_DIR, mmap=True):
+    """Lê a tabela da versão `fingerprint` do cache, ou None se ela não existir."""
+    target = cache_path(fingerprint, directory)
+    manifest = _read_json(os.path.join(target, MANIFEST_NAME))
+    if manifest is None or manifest["fingerprint"] != fingerprint:
+        return None
+    table = pd.read_parquet(os.path.join(target, TABLE_NAME))
+    columns = {column: table[column] for column in table.columns}
+    for column in manifest["arrays"]:
+        values = np.load(os.path.join(target, f"{column}.npy"), mmap_mode='r' if mmap else None)
+        # np.asarray: ndarray comum, ainda apoiado no arquivo mapeado.
+        columns[column] = np.asarray(values)
+    # copy=False mantém os arrays mapeados em memória, sem trazê-los para o heap do processo.
+    return pd.DataFrame({column: columns[column] for column in manifest["columns"]}, copy=False)
+
+
+def load(csv_path=CSV_PATH, directory=CACHE_DIR, rebuild=False):
+    """
+    Retorna (df, fingerprint) da base, lendo do cache colunar sempre que ele corresponde ao
+    CSV atual. Se o CSV mudou, ele é lido, limpo e gravado no cache, e a versão anterior
+    deste CSV é removida.
+    """
+    os.makedirs(directory, exist_ok=True)
+    pointer_path = _pointer_path(csv_path, directory)
+    pointer = _read_json(pointer_path) or {}
+    mtime_ns, size = dados.file_signature(csv_path)
+
+    if not rebuild and pointer.get("mtime_ns") == mtime_ns and pointer.get("size") == size:
+        df = load_table(pointer["fingerprint"], directory)
+        if df is not None:
+            return df, pointer["fingerprint"]
+
+    fingerprint = dados.file_fingerprint(csv_path)
+    df = None if rebuild else load_table(fingerprint, directory)
+    if df is None:
+        print(f"[INFO] Convertendo {csv_path} para o cache colunar...")
+        if rebuild:
+            shutil.rmtree(cache_path(fingerprint, directory), ignore_errors=True)
+        save_table(dados.load_farm_table(csv_path), fingerprint, directory)
+        df = load_table(fingerprint, directory)
+
+    previous = pointer.get("fingerprint")
+    _write_json(pointer_path, {"csv": os.path.abspath(csv_path), "mtime_ns": mtime_ns, "size": size,
+                               "fingerprint": fingerprint})
+    if previous and previous != fingerprint:
+        shutil.rmtree(cache_path(previous, directory), ignore_errors=True)
+    return df, fingerprint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte o CSV das granjas para o cache colunar.")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV das granjas (padrão: data/coordenadas.csv)")
+    parser.add_argument("--diretorio", default=CACHE_DIR, help="onde gravar o cache (padrão: cache/)")
+    parser.add_argument("--refazer", action="store_true", help="refaz o cache mesmo que o CSV não tenha mudado")
+    args = parser.parse_args(argv)
+
+    df, fingerprint = load(args.csv, args.diretorio, rebuild=args.refazer)
+    print(f"Base com {len(df)} aviários em: {cache_path(fingerprint, args.diretorio)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cache LRU de resultados por foco, com chaves explícitas (base de dados, foco, raios)."""
+import threading
+from collections import OrderedDict
+
+# Casas decimais usadas para arredondar o foco na chave (~0,1 m no terreno).
+FOCUS_PRECISION = 6
+
+
+def round_focus(lat, lon, precision=FOCUS_PRECISION):
+    """Arredonda as coordenadas do foco para uso em chaves de cache e nos cálculos."""
+    return round(float(lat), precision), round(float(lon), precision)
+
+
+def focus_key(kind, fingerprint, lat, lon, radii=(), *extra):
+    """Monta a chave de cache de um resultado dependente do foco."""
+    lat, lon = round_focus(lat, lon)
+    return (kind, fingerprint, lat, lon, tuple(radii)) + extra
+
+
+def key_foci(key):
+    """Focos (lat, lon) de uma chave de focus_key: o principal e os das tuplas de focos adicionais."""
+    foci = [(key[2], key[3])]
+    for extra in key[5:]:
+        if isinstance(extra, tuple):
+            foci.extend((float(focus[0]), float(focus[1])) for focus in extra if isinstance(focus, tuple))
+    return foci
+
+
+class LRUCache:
+    """
+    Cache LRU limitado e seguro para threads. Uma única instância é compartilhada
+    entre as sessões do Streamlit; as chaves são tuplas pequenas, então nenhuma
+    consulta precisa serializar ou gerar hash de DataFrames.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Retorna o valor em cache ou calcula-o com compute() e armazena."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def migrate(self, rekey):
+        """
+        Aplica rekey(chave) a cada entrada, mantendo a ordem LRU: a entrada passa para a chave
+        retornada ou é descartada se o retorno for None. Retorna o número de entradas mantidas.
+        """
+        with self._lock:
+            migrated = OrderedDict()
+            for key, value in self._data.items():
+                new_key = rekey(key)
+                if new_key is not None:
+                    migrated[new_key] = value
+            self._data = migrated
+            return len(migrated)
+
+    def stats(self):
+        return {"entries": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,149 @@
+"""
+Ranking de criticidade regional: cada núcleo é tratado como um foco hipotético e são somados
+os aviários, as aves (capacidade) e a área que cairiam em cada zona de contingência.
+
+Em vez de classificar núcleo a núcleo, os pares (foco, granja) a até 25 km são obtidos pela
+KD-tree e as somas por zona saem de np.bincount ponderados. Os focos são divididos em blocos
+com um número limitado de pares, distribuídos entre os núcleos da CPU por um pool de processos.
+
+Uso (na raiz do projeto):
+    python -m src.criticidade [--saida output/criticidade_nucleos.csv] [--top 20]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import base_colunar
+from src.indice_espacial import SpatialIndex
+from src.zonas import ZONE_RADII, zone_indices
+
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "output", "criticidade_nucleos.csv")
+
+# Sufixos das colunas por zona, na ordem de ZONE_RADII.
+ZONE_SUFFIXES = ("perifoco", "vigilancia", "protecao")
+# Métricas somadas por zona: coluna de saída -> coluna de peso da tabela (None conta aviários).
+METRICS = {"aviarios": None, "aves": "capacidade", "area": "area"}
+# Ordem padrão do ranking: aves no Perifoco, depois na Vigilância e na Proteção.
+DEFAULT_SORT = ["aves_perifoco", "aves_vigilancia", "aves_protecao"]
+
+# Máximo aproximado de pares (foco, granja) materializados por bloco, para limitar a memória.
+_PAIRS_PER_BLOCK = 2_000_000
+
+
+def nucleus_foci(df):
+    """Um foco por núcleo, nas coordenadas do primeiro aviário do núcleo no arquivo."""
+    first = df.loc[df['nucleo'].notna()].drop_duplicates('nucleo')
+    return first.reset_index(drop=True)
+
+
+def _blocks(counts, max_pairs):
+    """Divide os focos em intervalos contíguos com até ~max_pairs vizinhos cada (ao menos um foco)."""
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        base = ends[start - 1] if start else 0
+        stop = max(int(np.searchsorted(ends, base + max_pairs, side='right')), start + 1)
+        yield start, stop
+        start = stop
+
+
+_worker_state = None
+
+
+def _init_worker(farm_lat, farm_lon, weights, radii):
+    global _worker_state
+    _worker_state = (SpatialIndex(farm_lat, farm_lon), weights, radii)
+
+
+def _zone_sums(task, state=None):
+    """
+    Somas ponderadas por (foco, zona, métrica) de um bloco de focos, no processo do pool
+    (ou com o `state` dado, quando calculado no próprio processo).
+    """
+    lat, lon = task
+    index, weights, radii = state or _worker_state
+    sources, rows, distances = index.query_radius_many(lat, lon, max(radii))
+    bins = sources * len(radii) + zone_indices(distances, radii)
+    size = lat.size * len(radii)
+    return np.stack([np.bincount(bins, weights=w[rows], minlength=size) for w in weights], axis=-1)
+
+
+def rank_nuclei(df, index=None, radii=ZONE_RADII, workers=None):
+    """
+    Retorna um DataFrame com uma linha por núcleo: identificação, coordenadas do foco e,
+    para cada zona, aviários, aves e área atingidos, ordenado do mais crítico ao menos.
+    Como na classificação do aplicativo, só entram granjas com núcleo definido e cada uma
+    é contada apenas na zona mais restrita. Os blocos de focos são distribuídos entre
+    `workers` processos (padrão: núcleos da CPU).
+    """
+    print("[INFO] Calculando ranking de criticidade dos núcleos...")
+    foci = nucleus_foci(df)
+    has_nucleo = df['nucleo'].notna().to_numpy()
+    farms = df.loc[has_nucleo]
+    farm_lat = farms['lat'].to_numpy(dtype=np.float64)
+    farm_lon = farms['lon'].to_numpy(dtype=np.float64)
+    weights = np.stack([np.ones(len(farms)) if column is None else
+                        np.nan_to_num(farms[column].to_numpy(dtype=np.float64))
+                        for column in METRICS.values()])
+    if index is None or not has_nucleo.all():
+        index = SpatialIndex(farm_lat, farm_lon)
+
+    lat, lon = foci['lat'].to_numpy(dtype=np.float64), foci['lon'].to_numpy(dtype=np.float64)
+    counts = index.count_radius_many(lat, lon, max(radii))
+    tasks = [(lat[start:stop], lon[start:stop]) for start, stop in _blocks(counts, _PAIRS_PER_BLOCK)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        # Sem o estado global: o aplicativo pode calcular rankings em várias threads.
+        blocks = [_zone_sums(task, (index, weights, radii)) for task in tasks]
+    else:
+        # spawn: chamado também pelo aplicativo, que tem várias threads; um fork herdaria locks
+        # presos por outras threads e poderia travar os processos filhos.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(farm_lat, farm_lon, weights, radii)) as pool:
+            blocks = list(pool.map(_zone_sums, tasks))
+    n_zones = len(radii)
+    sums = np.concatenate(blocks) if blocks else np.zeros((0, len(METRICS)))
+    sums = sums.reshape(len(foci), n_zones, len(METRICS))
+
+    ranking = foci[['nucleo', 'proprietario', 'tecnico', 'cidade', 'lat', 'lon']].copy()
+    ranking['nucleo'] = ranking['nucleo'].astype(np.int64)
+    for m, name in enumerate(METRICS):
+        for z, suffix in enumerate(ZONE_SUFFIXES[:n_zones]):
+            ranking[f"{name}_{suffix}"] = sums[:, z, m].astype(np.int64)
+        ranking[f"{name}_total"] = sums[:, :, m].sum(axis=1).astype(np.int64)
+
+    ranking = ranking.sort_values(DEFAULT_SORT[:n_zones] + ['nucleo'],
+                                  ascending=[False] * n_zones + [True], kind='stable')
+    ranking.insert(0, 'posicao', np.arange(1, len(ranking) + 1))
+    return ranking.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o ranking de criticidade regional dos núcleos.")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV das granjas (padrão: data/coordenadas.csv)")
+    parser.add_argument("--saida", default=OUTPUT_PATH, help="CSV do ranking (padrão: output/criticidade_nucleos.csv)")
+    parser.add_argument("--top", type=int, default=20, help="núcleos exibidos no terminal")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: núcleos da CPU)")
+    args = parser.parse_args(argv)
+
+    df, _ = base_colunar.load(args.csv)
+    ranking = rank_nuclei(df, workers=args.processos)
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    ranking.to_csv(args.saida, sep=';', index=False)
+    columns = ['posicao', 'nucleo', 'proprietario'] + [f"aves_{suffix}" for suffix in ZONE_SUFFIXES]
+    print(ranking[columns].head(args.top).to_string(index=False))
+    print(f"Ranking de {len(ranking)} núcleos gravado em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Carregamento e limpeza da base de granjas (data/coordenadas.csv)."""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# Colunas numéricas derivadas de 'coordenadas' durante o carregamento.
+COORD_COLUMNS = ['lat', 'lon']
+# Colunas convertidas para número uma única vez no carregamento (valores inválidos viram NaN).
+NUMERIC_COLUMNS = ['nucleo', 'capacidade', 'area']
+
+# Esquema tipado da base. lat/lon continuam float64, pois as zonas dependem das distâncias exatas.
+# Textos repetitivos viram category (sem o preenchimento à direita do CSV).
+CATEGORY_COLUMNS = ['cidade', 'classificacao', 'microrregiao', 'nome_tecnico', 'tecnico']
+# Textos livres, apenas sem espaços nas pontas.
+STRING_COLUMNS = ['proprietario', 'nome_estab', 'endereco']
+# "VERDADEIRO"/"Falso" viram booleanos (nullable, para valores ausentes ou desconhecidos).
+BOOLEAN_COLUMNS = ['ativo', 'isotermico', 'global_gap']
+BOOLEAN_VALUES = {'VERDADEIRO': True, 'FALSO': False, 'TRUE': True, 'FALSE': False, 'SIM': True, 'NÃO': False}
+# Identificadores e contagens: int32 quando não há ausentes e os valores cabem; senão float64.
+INTEGER_COLUMNS = ['fazenda', 'nucleo', 'capacidade', 'area', 'bp_associado', 'bp_propriedade']
+# Distâncias às fábricas, em km com vírgula decimal; a precisão de float32 sobra.
+FLOAT32_COLUMNS = ['dist_fab_1', 'dist_fab_2']
+
+
+def parse_coordinates(coordenadas):
+    """Converte uma série de strings 'lat,lon' em dois arrays float64 (NaN quando inválido)."""
+    parts = coordenadas.astype(str).str.split(',', n=1, expand=True).reindex(columns=[0, 1])
+    lat = pd.to_numeric(parts[0].str.strip(), errors='coerce').to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(parts[1].str.strip(), errors='coerce').to_numpy(dtype=np.float64)
+    return lat, lon
+
+
+def load_farm_table(file_path):
+    """
+    Lê o CSV das granjas e converte 'coordenadas' nas colunas float64 'lat' e 'lon', e as
+    colunas de NUMERIC_COLUMNS para número. Linhas com coordenadas ausentes ou inválidas
+    são informadas uma única vez e descartadas.
+    """
+    df = pd.read_csv(file_path, sep=';')
+    lat, lon = parse_coordinates(df['coordenadas'])
+    valid = (np.isfinite(lat) & np.isfinite(lon)
+             & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+             & df['coordenadas'].notna().to_numpy())
+
+    invalid = df.loc[~valid]
+    if not invalid.empty:
+        print(f"[AVISO] {len(invalid)} linha(s) com coordenadas inválidas descartadas de {file_path}:")
+        for _, row in invalid.iterrows():
+            print(f"  fazenda={row.get('fazenda', 'N/A')} coordenadas={row.get('coordenadas')!r}")
+
+    df = df.loc[valid].copy()
+    df['lat'] = lat[valid]
+    df['lon'] = lon[valid]
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    return apply_schema(df).reset_index(drop=True)
+
+
+def _narrow_integer(series):
+    """int32 se a coluna é inteira, sem ausentes e cabe em 32 bits; senão float64."""
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    info = np.iinfo(np.int32)
+    if np.isfinite(values).all() and (values == np.round(values)).all() \
+            and (values.size == 0 or (values.min() >= info.min and values.max() <= info.max)):
+        return values.astype(np.int32)
+    return values
+
+
+def _strip(series):
+    """Remove os espaços nas pontas dos textos, mantendo os valores ausentes."""
+    return series.where(series.isna(), series.astype(str).str.strip())
+
+
+def apply_schema(df):
+    """
+    Converte as colunas conhecidas da base para os tipos compactos do esquema (category,
+    boolean, int32, float32); colunas ausentes ou desconhecidas ficam como estão.
+    """
+    columns = {}
+    for column in df.columns.intersection(CATEGORY_COLUMNS):
+        columns[column] = _strip(df[column]).astype('category')
+    for column in df.columns.intersection(STRING_COLUMNS):
+        columns[column] = _strip(df[column])
+    for column in df.columns.intersection(BOOLEAN_COLUMNS):
+        columns[column] = _strip(df[column]).str.upper().map(BOOLEAN_VALUES).astype('boolean')
+    for column in df.columns.intersection(INTEGER_COLUMNS):
+        columns[column] = _narrow_integer(df[column])
+    for column in df.columns.intersection(FLOAT32_COLUMNS):
+        text = df[column].astype('string').str.replace(',', '.', regex=False)
+        columns[column] = pd.to_numeric(text, errors='coerce').astype(np.float32)
+    return df.assign(**columns)
+
+
+def frame_memory_bytes(df):
+    """Memória ocupada pela tabela, incluindo o conteúdo dos textos."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def file_signature(file_path):
+    """(mtime em ns, tamanho) do arquivo: verificação barata de que a base mudou, sem ler o conteúdo."""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_fingerprint(file_path, chunk_size=1 << 20):
+    """Retorna um identificador curto (SHA-256) do conteúdo do arquivo, usado como versão da base."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
@@ -0,0 +1,195 @@
+"""
+Instrumentação leve do aplicativo: intervalos de tempo (span/timed), acertos e faltas de cada
+cache e tamanhos dos artefatos gerados. Cada evento é gravado como uma linha JSON em
+logs/desempenho.jsonl e, durante um rerun do Streamlit, também fica no RerunRecorder corrente,
+exibido no painel "Desempenho" da barra lateral.
+"""
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LOG_PATH = os.path.join(PROJECT_ROOT, "logs", "desempenho.jsonl")
+# Rotação do log: tamanho máximo de cada arquivo e quantos arquivos anteriores são mantidos.
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+
+_logger = logging.getLogger("zonas_contingencia.desempenho")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+_configure_lock = threading.Lock()
+_configured = False
+
+_current = contextvars.ContextVar("desempenho_rerun", default=None)
+# Pilha de marcadores das funções com cache em execução (ver cached).
+_local = threading.local()
+
+
+def configure_log(path=LOG_PATH, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """
+    Grava os eventos como linhas JSON em `path` (None desativa o arquivo), que é rotacionado
+    ao passar de `max_bytes`, mantendo `backups` arquivos anteriores (desempenho.jsonl.1, ...).
+    """
+    global _configured
+    with _configure_lock:
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                           encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(handler)
+        _configured = True
+
+
+def _emit(event, **fields):
+    if not _configured:
+        configure_log()
+    recorder = _current.get()
+    record = {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "evento": event,
+              "rerun": recorder.id if recorder is not None else None, **fields}
+    _logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+class RerunRecorder:
+    """Eventos de um rerun: intervalos (nome, ms, nível), contadores de cache e tamanhos."""
+
+    def __init__(self, session=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.session = session
+        self.started = time.perf_counter()
+        self.spans = []
+        self.cache = {}
+        self.payloads = {}
+        self._depth = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_rerun(session=None):
+    """Inicia a coleta dos eventos do rerun corrente (no thread do script) e retorna o coletor."""
+    recorder = RerunRecorder(session)
+    _current.set(recorder)
+    return recorder
+
+
+def finish_rerun(recorder):
+    """Registra a duração total do rerun e encerra a coleta."""
+    _emit("rerun", sessao=recorder.session, ms=round(recorder.elapsed_ms(), 3),
+          cache={name: {"acertos": hits, "faltas": misses} for name, (hits, misses) in recorder.cache.items()})
+    _current.set(None)
+
+
+@contextlib.contextmanager
+def span(name, **fields):
+    """Mede o bloco como um intervalo `name`; intervalos aninhados ficam com nível maior."""
+    recorder = _current.get()
+    depth = 0
+    if recorder is not None:
+        depth = recorder._depth
+        recorder._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        if recorder is not None:
+            recorder._depth = depth
+            recorder.spans.append((name, ms, depth))
+        _emit("span", nome=name, ms=round(ms, 3), nivel=depth, **fields)
+
+
+def timed(name):
+    """Decorador: cada chamada da função é um intervalo `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_cache(name, hit):
+    """Conta um acerto (hit=True) ou uma falta do cache `name`."""
+    recorder = _current.get()
+    if recorder is not None:
+        counts = recorder.cache.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+    _emit("cache", nome=name, acerto=bool(hit))
+
+
+def lookup(cache, key, compute, name=None):
+    """
+    cache.get_or_compute (LRUCache) com contagem de acertos e faltas por tipo de resultado
+    (key[0], ou `name`); numa falta, o cálculo é medido como um intervalo.
+    """
+    name = name or key[0]
+    missed = []
+
+    def measured():
+        missed.append(True)
+        with span(name):
+            return compute()
+
+    value = cache.get_or_compute(key, measured)
+    count_cache(name, hit=not missed)
+    return value
+
+
+def cached(name, cache_decorator):
+    """
+    Aplica `cache_decorator` (ex.: st.cache_resource) à função contando acertos e faltas:
+    o corpo só roda numa falta, e então é medido como um intervalo `name`.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def body(*args, **kwargs):
+            _local.stack[-1] = True
+            with span(name):
+                return function(*args, **kwargs)
+
+        cached_function = cache_decorator(body)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = _local.__dict__.setdefault("stack", [])
+            stack.append(False)
+            try:
+                return cached_function(*args, **kwargs)
+            finally:
+                count_cache(name, hit=not stack.pop())
+
+        wrapper.clear = cached_function.clear
+        return wrapper
+    return decorate
+
+
+def record_size(name, nbytes, into=None):
+    """
+    Registra o tamanho (bytes) de um artefato gerado. Fora de um rerun (ex.: nas threads da
+    fila de exportações), `into` é o dicionário da sessão onde o tamanho também é guardado.
+    """
+    if into is not None:
+        into[name] = nbytes
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.payloads[name] = nbytes
+    _emit("tamanho", nome=name, bytes=nbytes)
+
+
+def payload(name, data):
+    """Registra o tamanho (bytes) de um artefato gerado e o retorna sem alteração."""
+    record_size(name, len(data.encode('utf-8')) if isinstance(data, str) else len(data))
+    return data
@@ -0,0 +1,139 @@
+"""
+Empacotador de KMZ em processo: lê o CSV uma única vez, gera as zonas, o foco e as granjas
+e monta o KMZ (com o ícone embutido) em memória ou direto no arquivo de saída.
+
+Substitui o fluxo scripts/package_kmz.sh -> gerar_kml.py + gerar_granja_kmz.py -> zip.
+
+Uso (na raiz do projeto):
+    python -m src.empacotar_kmz                        # foco no abatedouro
+    python -m src.empacotar_kmz -24.3310,-53.8568      # "lat,lon"
+    python -m src.empacotar_kmz -24.3310 -53.8568      # lat lon
+    python -m src.empacotar_kmz -24.33,-53.85 -24.40,-53.70   # vários focos (zonas dissolvidas)
+    python -m src.empacotar_kmz --por-nucleo           # um KMZ por núcleo, em lote
+"""
+import argparse
+import io
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import base_colunar, kml
+
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+ABATEDOURO_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas_abatedouro.txt")
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
+
+
+def zones_with_radii(radii_m):
+    """Retorna as zonas do KML com os raios (Perifoco, Vigilância, Proteção) informados, em metros."""
+    if radii_m is None:
+        return kml.KML_ZONES
+    by_radius = dict(zip(("PERIFOCO", "VIGILANCIA", "PROTEÇÃO"), radii_m))
+    return [{**zone, "radius": by_radius[zone["name"]]} for zone in kml.KML_ZONES]
+
+
+def write_contingency_kmz(fileobj, lat, lon, df, focus_name="FOCO", radii_m=None, icon_path=kml.ICON_PATH,
+                          extra_foci=()):
+    """
+    Grava em `fileobj` o KMZ do foco (zonas, foco e granjas em um único doc.kml).
+    `extra_foci` são focos adicionais (lat, lon, nome), com as zonas dissolvidas.
+    """
+    chunks = kml.iter_contingency_kml(
+        lat, lon, focus_name, df, farm_icon_href=kml.KMZ_ICON_HREF, zones=zones_with_radii(radii_m),
+        extra_foci=extra_foci
+    )
+    kml.write_kmz(fileobj, [("doc.kml", chunks)], icon_path=icon_path)
+
+
+def build_contingency_kmz(lat, lon, df, focus_name="FOCO", radii_m=None, icon_path=kml.ICON_PATH,
+                          extra_foci=()):
+    """Gera o KMZ do foco em memória e retorna os bytes."""
+    buffer = io.BytesIO()
+    write_contingency_kmz(buffer, lat, lon, df, focus_name, radii_m, icon_path, extra_foci)
+    return buffer.getvalue()
+
+
+def read_default_focus(file_path=ABATEDOURO_PATH):
+    """Coordenadas padrão do foco (abatedouro)."""
+    with open(file_path, 'r') as f:
+        lat_str, lon_str = f.read().strip().split(',')
+    return float(lat_str), float(lon_str)
+
+
+def parse_focus_args(values):
+    """
+    Aceita [], ["lat lon"], ["lat,lon"] ou vários "lat,lon"; retorna a lista de focos
+    (lat, lon) ou None para o padrão.
+    """
+    if not values:
+        return None
+    if not any(',' in value for value in values):
+        values = [",".join(values)]
+    foci = []
+    for value in values:
+        parts = value.split(',')
+        if len(parts) != 2:
+            raise ValueError("informe 'latitude,longitude', 'latitude longitude' ou vários 'latitude,longitude'")
+        foci.append((float(parts[0].strip()), float(parts[1].strip())))
+    return foci
+
+
+def nucleus_foci(df):
+    """Um foco por núcleo: as coordenadas e o proprietário do primeiro aviário do núcleo."""
+    first = df.dropna(subset=['nucleo']).drop_duplicates('nucleo')
+    for nucleo, lat, lon, proprietario in zip(first['nucleo'], first['lat'], first['lon'], first['proprietario']):
+        yield int(nucleo), float(lat), float(lon), f"Núcleo {int(nucleo)} - {proprietario}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o KMZ das zonas de contingência e granjas.")
+    parser.add_argument("coordenadas", nargs="*",
+                        help="foco como 'lat,lon' ou 'lat lon', ou vários 'lat,lon' (padrão: abatedouro)")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV das granjas (padrão: data/coordenadas.csv)")
+    parser.add_argument("--saida", default=None, help="arquivo KMZ, ou diretório com --por-nucleo (padrão: output/)")
+    parser.add_argument("--nome-foco", default="FOCO", help="nome do placemark do foco")
+    parser.add_argument("--raios", type=float, nargs=3, metavar=("PERIFOCO", "VIGILANCIA", "PROTECAO"),
+                        help="raios das zonas em km (padrão: 3 10 25)")
+    parser.add_argument("--por-nucleo", action="store_true",
+                        help="gera um KMZ por núcleo, com o foco no núcleo, reutilizando a mesma leitura do CSV")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # "lat,lon" com latitude negativa não deve ser lido como uma opção pelo argparse.
+    argv = [f" {arg}" if arg.startswith('-') and ',' in arg else arg for arg in argv]
+    args = parser.parse_args(argv)
+
+    try:
+        foci = parse_focus_args(args.coordenadas)
+    except ValueError as e:
+        parser.error(f"Coordenadas inválidas: {e}")
+    radii_m = [r * 1000 for r in args.raios] if args.raios else None
+
+    print(f"Lendo granjas de {args.csv}...")
+    df, _ = base_colunar.load(args.csv)
+
+    if args.por_nucleo:
+        output_dir = args.saida or os.path.join(OUTPUT_DIR, "nucleos")
+        os.makedirs(output_dir, exist_ok=True)
+        count = 0
+        for nucleo, lat, lon, name in nucleus_foci(df):
+            with open(os.path.join(output_dir, f"nucleo_{nucleo}.kmz"), 'wb') as f:
+                write_contingency_kmz(f, lat, lon, df, name, radii_m)
+            count += 1
+        print(f"{count} arquivos KMZ gerados em: {output_dir}")
+        return
+
+    (lat, lon), *others = foci or [read_default_focus()]
+    extra_foci = [(o_lat, o_lon, f"{args.nome_foco} {i}") for i, (o_lat, o_lon) in enumerate(others, start=2)]
+    output_path = args.saida or os.path.join(OUTPUT_DIR, "zonas_contingencia_completo.kmz")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    for f_lat, f_lon in [(lat, lon), *others]:
+        print(f"Usando foco: {f_lat}, {f_lon}")
+    with open(output_path, 'wb') as f:
+        write_contingency_kmz(f, lat, lon, df, args.nome_foco, radii_m, extra_foci=extra_foci)
+    print(f"Arquivo KMZ final criado em: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Exportações em segundo plano: os artefatos (mapa HTML, relatórios, KMZ) são gerados por um
+pool de threads fora do script do Streamlit e gravados em cache/exportacoes/, um cache em
+disco com limite de tamanho e descarte do menos usado (LRU).
+
+Cada artefato é identificado pela chave de focus_key (tipo, versão da base, foco, ...): pedidos
+da mesma chave, de qualquer sessão, compartilham o mesmo trabalho e o mesmo arquivo.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+EXPORT_DIR = os.path.join(PROJECT_ROOT, "cache", "exportacoes")
+
+# Tamanho máximo (bytes) dos artefatos guardados em disco.
+MAX_STORE_BYTES = 512 * 1024 * 1024
+# Exportações geradas ao mesmo tempo.
+EXPORT_WORKERS = 2
+# Falhas recentes guardadas para exibição (as mais antigas são esquecidas).
+MAX_FAILED_JOBS = 32
+
+TEMP_SUFFIX = ".tmp"
+
+
+def artifact_name(key):
+    """Nome do arquivo do artefato da chave (hash da representação da chave)."""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:24]
+
+
+class ArtifactStore:
+    """
+    Artefatos prontos em disco, um arquivo por chave. Quando o total passa de max_bytes, os
+    menos usados são removidos; a ordem de uso sobrevive a reinícios pela data de modificação
+    dos arquivos.
+    """
+
+    def __init__(self, directory=EXPORT_DIR, max_bytes=MAX_STORE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # nome -> tamanho, do menos para o mais usado.
+        self._entries = OrderedDict()
+        # nome -> chave, para os artefatos gravados por este processo (ver migrate).
+        self._keys = {}
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(TEMP_SUFFIX):
+                # Sobra de uma exportação interrompida.
+                os.remove(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+        with self._lock:
+            self._evict()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __contains__(self, key):
+        return artifact_name(key) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def total_bytes(self):
+        return sum(self._entries.values())
+
+    def temp_path(self, key):
+        """Arquivo temporário onde o artefato é gravado antes de entrar no cache."""
+        return self._path(f"{artifact_name(key)}.{threading.get_ident()}{TEMP_SUFFIX}")
+
+    def commit(self, key, temp_path):
+        """Move o arquivo temporário para o cache como o artefato da chave."""
+        name = artifact_name(key)
+        size = os.path.getsize(temp_path)
+        with self._lock:
+            os.replace(temp_path, self._path(name))
+            self._entries[name] = size
+            self._entries.move_to_end(name)
+            self._keys[name] = key
+            self._evict()
+
+    def read(self, key):
+        """Bytes do artefato da chave, marcado como o mais usado; None se ele não existir."""
+        name = artifact_name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            try:
+                os.utime(self._path(name))
+                with open(self._path(name), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                self._entries.pop(name, None)
+                self._keys.pop(name, None)
+                return None
+
+    def _evict(self):
+        """Remove os artefatos menos usados até o total caber em max_bytes (o mais recente fica)."""
+        total = sum(self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._keys.pop(name, None)
+            total -= size
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    def migrate(self, rekey):
+        """
+        Como LRUCache.migrate, para os artefatos gravados por este processo: rekey(chave)
+        retorna a nova chave do artefato, ou None para removê-lo. Retorna quantos ficaram.
+        """
+        kept = 0
+        with self._lock:
+            for name, key in list(self._keys.items()):
+                new_key = rekey(key)
+                size = self._entries.pop(name)
+                del self._keys[name]
+                if new_key is None:
+                    try:
+                        os.remove(self._path(name))
+                    except FileNotFoundError:
+                        pass
+                    continue
+                new_name = artifact_name(new_key)
+                os.replace(self._path(name), self._path(new_name))
+                self._entries[new_name] = size
+                self._keys[new_name] = new_key
+                kept += 1
+        return kept
+
+
+@dataclass
+class ExportJob:
+    """Uma exportação pedida: estado ('na fila', 'gerando', 'pronto' ou 'erro') e progresso."""
+    key: tuple
+    label: str
+    status: str = "na fila"
+    fraction: Optional[float] = None
+    detail: str = ""
+    error: Optional[str] = None
+    temp_path: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+
+    def progress(self, fraction=None, detail=""):
+        """Atualiza o progresso (fração de 0 a 1, se conhecida, e uma descrição)."""
+        self.fraction = fraction
+        self.detail = detail
+
+    def elapsed_s(self):
+        return time.time() - (self.started or self.submitted)
+
+    def written_bytes(self):
+        """Bytes já gravados no arquivo temporário."""
+        try:
+            return os.path.getsize(self.temp_path) if self.temp_path else 0
+        except FileNotFoundError:
+            return 0
+
+
+class ExportQueue:
+    """
+    Fila de exportações compartilhada entre as sessões. submit(chave, rótulo, builder) agenda
+    builder(arquivo, progresso), que grava o artefato num arquivo binário; enquanto a chave
+    estiver na fila, sendo gerada ou pronta no cache, novos pedidos não geram outro trabalho.
+    """
+
+    def __init__(self, store=None, workers=EXPORT_WORKERS):
+        self.store = store if store is not None else ArtifactStore()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exportacao")
+        self._lock = threading.Lock()
+        # Trabalhos na fila ou em andamento, por chave.
+        self._jobs = {}
+        # Últimos trabalhos com erro, por chave, do mais antigo ao mais recente.
+        self._failed = OrderedDict()
+
+    def job(self, key):
+        """Trabalho não concluído (ou com erro recente) da chave, ou None."""
+        return self._jobs.get(key) or self._failed.get(key)
+
+    def ready(self, key):
+        return key in self.store
+
+    def read(self, key):
+        return self.store.read(key)
+
+    def active_jobs(self):
+        return [job for job in list(self._jobs.values()) if job.status in ("na fila", "gerando")]
+
+    def submit(self, key, label, builder):
+        """
+        Agenda a exportação da chave, se ela ainda não estiver pronta ou em andamento (uma
+        falha anterior é descartada e a exportação, refeita); retorna o trabalho.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+            if key in self.store:
+                return ExportJob(key, label, status="pronto", fraction=1.0)
+            self._failed.pop(key, None)
+            job = self._jobs[key] = ExportJob(key, label)
+        self._pool.submit(self._run, job, builder)
+        return job
+
+    def _run(self, job, builder):
+        job.status = "gerando"
+        job.started = time.time()
+        job.temp_path = self.store.temp_path(job.key)
+        try:
+            with open(job.temp_path, 'wb') as f:
+                builder(f, job.progress)
+            self.store.commit(job.key, job.temp_path)
+        except Exception as e:
+            job.status = "erro"
+            job.error = str(e)
+            try:
+                os.remove(job.temp_path)
+            except FileNotFoundError:
+                pass
+            print(f"[AVISO] Falha na exportação '{job.label}': {e}")
+            with self._lock:
+                self._jobs.pop(job.key, None)
+                self._failed[job.key] = job
+                while len(self._failed) > MAX_FAILED_JOBS:
+                    self._failed.popitem(last=False)
+            return
+        print(f"[INFO] Exportação '{job.label}' pronta em {job.elapsed_s():.1f} s.")
+        job.status = "pronto"
+        job.fraction = 1.0
+        with self._lock:
+            self._jobs.pop(job.key, None)
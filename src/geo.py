@@ -0,0 +1,17 @@
+"""Funções geográficas compartilhadas pelo aplicativo e pelos scripts de exportação."""
+import numpy as np
+
+EARTH_RADIUS_M = 6371000  # Raio da Terra em metros
+
+
+def haversine_array(lon1, lat1, lon2, lat2):
+    """
+    Calcula, de forma vetorizada, a distância em metros entre pontos na Terra.
+    Aceita escalares ou arrays NumPy (com broadcasting).
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return c * EARTH_RADIUS_M
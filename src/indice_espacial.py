@@ -0,0 +1,122 @@
+"""Índice espacial para consultas de vizinho mais próximo e de raio sobre as granjas."""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.geo import EARTH_RADIUS_M, haversine_array
+
+# Folga relativa aplicada ao raio da corda antes do filtro exato por haversine,
+# para que arredondamentos na conversão nunca excluam um ponto do limite.
+_CHORD_SLACK = 1e-9
+
+
+def to_unit_vectors(lat, lon):
+    """Converte latitude/longitude (graus) em vetores unitários 3D, shape (n, 3)."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_length(distance_m):
+    """Converte uma distância sobre a esfera (metros) na corda equivalente da esfera unitária."""
+    angle = np.minimum(np.asarray(distance_m, dtype=np.float64) / EARTH_RADIUS_M, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+class SpatialIndex:
+    """
+    KD-tree sobre vetores unitários 3D. A distância em corda é monotônica com a distância
+    sobre a esfera, então a árvore seleciona os candidatos e a haversine decide o resultado,
+    garantindo as mesmas respostas da varredura linear.
+    """
+
+    def __init__(self, lat, lon, vectors=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self._tree = cKDTree(to_unit_vectors(self.lat, self.lon) if vectors is None else vectors)
+
+    def updated(self, lat, lon, previous_rows):
+        """
+        Índice para novas coordenadas, reaproveitando os vetores unitários deste índice:
+        previous_rows[i] é a linha deste índice na mesma posição da nova linha i, ou -1.
+        A árvore é construída de novo sobre todos os pontos; só a conversão é poupada.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        previous_rows = np.asarray(previous_rows, dtype=np.intp)
+        reuse = previous_rows >= 0
+        vectors = np.empty((lat.size, 3), dtype=np.float64)
+        vectors[reuse] = self._tree.data[previous_rows[reuse]]
+        vectors[~reuse] = to_unit_vectors(lat[~reuse], lon[~reuse])
+        return SpatialIndex(lat, lon, vectors=vectors)
+
+    def __len__(self):
+        return self.lat.size
+
+    def query_radius(self, lat, lon, radius_m):
+        """
+        Retorna (índices, distâncias em metros) dos pontos a até radius_m do alvo,
+        em ordem crescente de índice.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        target = to_unit_vectors(lat, lon)[0]
+        candidates = self._tree.query_ball_point(target, chord_length(radius_m) * (1 + _CHORD_SLACK) + _CHORD_SLACK)
+        candidates = np.sort(np.asarray(candidates, dtype=np.intp))
+        distances = haversine_array(lon, lat, self.lon[candidates], self.lat[candidates])
+        inside = distances <= radius_m
+        return candidates[inside], distances[inside]
+
+    def query_radius_many(self, lat, lon, radius_m, workers=-1):
+        """
+        Consulta de raio para vários alvos de uma vez (a árvore distribui as buscas entre
+        `workers` threads; -1 usa todos os núcleos). Retorna os pares
+        (índice do alvo, índice do ponto, distância em metros) dentro do raio.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if len(self) == 0 or lat.size == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        candidates = self._tree.query_ball_point(
+            to_unit_vectors(lat, lon), chord_length(radius_m) * (1 + _CHORD_SLACK) + _CHORD_SLACK, workers=workers
+        )
+        counts = np.fromiter((len(c) for c in candidates), dtype=np.intp, count=lat.size)
+        sources = np.repeat(np.arange(lat.size), counts)
+        points = np.fromiter((i for c in candidates for i in c), dtype=np.intp, count=counts.sum())
+        distances = haversine_array(lon[sources], lat[sources], self.lon[points], self.lat[points])
+        inside = distances <= radius_m
+        return sources[inside], points[inside], distances[inside]
+
+    def count_radius_many(self, lat, lon, radius_m, workers=-1):
+        """
+        Número de candidatos da árvore por alvo (um limite superior da contagem exata), sem
+        materializar os pares; usado para dividir consultas grandes em blocos.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if len(self) == 0 or lat.size == 0:
+            return np.zeros(lat.size, dtype=np.intp)
+        return self._tree.query_ball_point(
+            to_unit_vectors(lat, lon), chord_length(radius_m) * (1 + _CHORD_SLACK) + _CHORD_SLACK,
+            workers=workers, return_length=True
+        )
+
+    def nearest(self, lat, lon, max_distance_m=np.inf):
+        """
+        Retorna (índice, distância em metros) do ponto mais próximo a até max_distance_m,
+        ou (None, None). Em empates vence o menor índice, como na varredura linear.
+        """
+        if len(self) == 0:
+            return None, None
+        target = to_unit_vectors(lat, lon)[0]
+        chord, _ = self._tree.query(target)
+        # Todos os candidatos empatados (dentro da folga) são reavaliados com a haversine.
+        candidates, distances = self.query_radius(
+            lat, lon, 2 * EARTH_RADIUS_M * np.arcsin(min(chord / 2, 1.0)) * (1 + 1e-6) + 1e-6
+        )
+        if candidates.size == 0:
+            return None, None
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance_m:
+            return None, None
+        return int(candidates[best]), float(distances[best])
@@ -0,0 +1,271 @@
+"""
+Escrita de KML/KMZ em fluxo: o documento é produzido em pedaços por geradores e gravado
+diretamente no destino (arquivo ou entrada de um zip), sem montar a string inteira.
+"""
+import math
+import os
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from src.dados import COORD_COLUMNS
+from src.multifoco import dissolved_zone_rings, polygon_parts
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ICON_PATH = os.path.join(PROJECT_ROOT, "assets", "icone_frango.png")
+# Caminho do ícone dentro do KMZ, referenciado pelo estilo das granjas.
+KMZ_ICON_HREF = "files/icone_frango.png"
+REMOTE_ICON_HREF = "https://maps.google.com/mapfiles/kml/paddle/grn-circle.png"
+
+# Tamanho aproximado dos blocos entregues ao destino.
+CHUNK_SIZE = 64 * 1024
+
+# Cores no formato aabbggrr (alfa, azul, verde, vermelho).
+KML_ZONES = [
+    {
+        "name": "PROTEÇÃO",
+        "radius": 25000,
+        "poly_color": "80FF0000",
+        "line_color": "ffff0000",
+        "description": "Zona de controle e monitoramento. Fiscalização do trânsito de veículos e produtos avícolas. Barreiras sanitárias para prevenir a entrada do vírus."
+    },
+    {
+        "name": "VIGILANCIA",
+        "radius": 10000,
+        "poly_color": "80C800C8",
+        "line_color": "ffC800C8",
+        "description": "Zona de vigilância ativa. Restrição no trânsito de aves e produtos. Suspensão de GTAs e monitoramento epidemiológico intensivo em todas as propriedades."
+    },
+    {
+        "name": "PERIFOCO",
+        "radius": 3000,
+        "poly_color": "800000FF",
+        "line_color": "ff0000FF",
+        "description": "Área de interdição máxima. Sacrifício de aves e controle total de acesso. Medidas rigorosas de desinfecção e vazio sanitário obrigatório."
+    }
+]
+
+
+def _cdata(text):
+    """Envolve o texto em CDATA, dividindo qualquer ']]>' presente no conteúdo."""
+    return "<![CDATA[" + str(text).replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+
+def zone_style_id(zone_name):
+    return f"style_{zone_name.lower().replace('ç', 'c').replace('ã', 'a')}"
+
+
+def circle_coordinates(lat, lon, radius_m, segments=64):
+    """Coordenadas 'lon,lat,0' de um círculo aproximado por `segments` segmentos."""
+    coords = []
+    for i in range(segments + 1):
+        angle = (i / segments) * 2 * math.pi
+        dx = radius_m * math.cos(angle)
+        dy = radius_m * math.sin(angle)
+        point_lat = lat + (dy / 111111)
+        point_lon = lon + (dx / (111111 * math.cos(math.radians(lat))))
+        coords.append(f"{point_lon},{point_lat},0")
+    return " ".join(coords)
+
+
+def iter_zone_styles(zones=KML_ZONES):
+    for zone in zones:
+        yield f'''
+    <Style id="{zone_style_id(zone['name'])}">
+      <LineStyle><color>{zone["line_color"]}</color><width>2</width></LineStyle>
+      <PolyStyle><color>{zone["poly_color"]}</color></PolyStyle>
+    </Style>'''
+
+
+def iter_zone_placemarks(lat, lon, zones=KML_ZONES):
+    for zone in zones:
+        yield f'''
+    <Placemark>
+      <name>{escape(zone["name"])}</name>
+      <description>{_cdata(zone["description"])}</description>
+      <styleUrl>#{zone_style_id(zone['name'])}</styleUrl>
+      <Polygon>
+        <outerBoundaryIs><LinearRing><coordinates>{circle_coordinates(lat, lon, zone["radius"])}</coordinates></LinearRing></outerBoundaryIs>
+      </Polygon>
+    </Placemark>'''
+
+
+def _ring_coordinates(ring):
+    return " ".join(f"{lon},{lat},0" for lon, lat in ring.coords)
+
+
+def polygon_geometry(polygon):
+    """Elemento <Polygon> de um polígono shapely em (lon, lat), com os buracos como innerBoundaryIs."""
+    inner = "".join(
+        f"<innerBoundaryIs><LinearRing><coordinates>{_ring_coordinates(ring)}</coordinates></LinearRing></innerBoundaryIs>"
+        for ring in polygon.interiors
+    )
+    return (f"<Polygon><outerBoundaryIs><LinearRing><coordinates>{_ring_coordinates(polygon.exterior)}"
+            f"</coordinates></LinearRing></outerBoundaryIs>{inner}</Polygon>")
+
+
+def iter_dissolved_zone_placemarks(foci, zones=KML_ZONES, segments=64):
+    """
+    Placemarks das zonas de vários focos (lat, lon): um por zona, com o anel dissolvido
+    entre todos os focos, em um MultiGeometry quando o anel tem mais de uma parte.
+    """
+    rings = dissolved_zone_rings(foci, [zone["radius"] for zone in zones], segments)
+    for zone in zones:
+        parts = polygon_parts(rings[zone["radius"]])
+        if not parts:
+            continue
+        geometry = "".join(polygon_geometry(polygon) for polygon in parts)
+        if len(parts) > 1:
+            geometry = f"<MultiGeometry>{geometry}</MultiGeometry>"
+        yield f'''
+    <Placemark>
+      <name>{escape(zone["name"])}</name>
+      <description>{_cdata(zone["description"])}</description>
+      <styleUrl>#{zone_style_id(zone['name'])}</styleUrl>
+      {geometry}
+    </Placemark>'''
+
+
+FOCUS_STYLE = '''
+    <Style id="style_foco">
+      <IconStyle>
+        <Icon><href>http://maps.google.com/mapfiles/kml/shapes/caution.png</href></Icon>
+        <scale>1.5</scale>
+      </IconStyle>
+    </Style>'''
+
+
+def focus_placemark(lat, lon, focus_name, description="Ponto central do foco de influenza aviária."):
+    return f'''
+    <Placemark>
+      <name>{escape(str(focus_name))}</name>
+      <description>{_cdata(description)}</description>
+      <styleUrl>#style_foco</styleUrl>
+      <Point><coordinates>{lon},{lat},0</coordinates></Point>
+    </Placemark>'''
+
+
+def farm_style(icon_href=REMOTE_ICON_HREF):
+    return f'''
+    <Style id="chickenIcon">
+      <IconStyle>
+        <scale>0.8</scale>
+        <Icon><href>{icon_href}</href></Icon>
+      </IconStyle>
+      <LabelStyle><scale>0</scale></LabelStyle>
+    </Style>'''
+
+
+def _field_text(value):
+    """Texto de um valor da tabela tipada no balão: booleanos como Sim/Não, ausentes em branco."""
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return "Sim" if value else "Não"
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return value
+
+
+def farm_placemark(lat, lon, name, fields):
+    """Placemark de uma granja; `fields` são pares (coluna, valor) exibidos na tabela do balão."""
+    rows = "".join(
+        f"<tr><td style='padding: 5px;'><b>{key.replace('_', ' ').title()}</b></td>"
+        f"<td style='padding: 5px;'>{_field_text(value)}</td></tr>"
+        for key, value in fields
+    )
+    description = f"<table border='1' style='width:100%; border-collapse: collapse;'>{rows}</table>"
+    return f'''
+    <Placemark>
+      <name>{escape(str(name))}</name>
+      <description>{_cdata(description)}</description>
+      <styleUrl>#chickenIcon</styleUrl>
+      <Point><coordinates>{lon},{lat},0</coordinates></Point>
+    </Placemark>'''
+
+
+def iter_farm_placemarks(df, rows_per_batch=5000):
+    """
+    Gera um placemark por linha da tabela de granjas, sem criar uma Series por linha.
+    As linhas são convertidas em lotes para que a memória não cresça com a tabela.
+    """
+    columns = [c for c in df.columns if c not in COORD_COLUMNS]
+    name_pos = columns.index('proprietario') if 'proprietario' in columns else None
+    for start in range(0, len(df), rows_per_batch):
+        batch = df.iloc[start:start + rows_per_batch]
+        for lat, lon, values in zip(batch['lat'].tolist(), batch['lon'].tolist(),
+                                    batch[columns].itertuples(index=False, name=None)):
+            name = values[name_pos] if name_pos is not None else "N/A"
+            yield farm_placemark(lat, lon, name, zip(columns, values))
+
+
+def iter_kml_document(name, styles, folders):
+    """
+    Gera o documento KML em pedaços. `styles` é um iterável de trechos de estilo e
+    `folders` uma sequência de (nome da pasta, iterável de placemarks).
+    """
+    yield f'''<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>{escape(name)}</name>
+'''
+    yield from styles
+    for folder_name, placemarks in folders:
+        yield f"\n    <Folder>\n      <name>{escape(folder_name)}</name>"
+        yield from placemarks
+        yield "\n    </Folder>"
+    yield "\n  </Document>\n</kml>\n"
+
+
+def iter_contingency_kml(lat, lon, focus_name, df, farm_icon_href=REMOTE_ICON_HREF, zones=KML_ZONES, extra_foci=()):
+    """
+    Documento completo do foco: zonas, ponto de foco e granjas, em pedaços. Com `extra_foci`
+    (sequência de (lat, lon, nome)), as zonas de todos os focos são dissolvidas em anéis.
+    """
+    foci = [(lat, lon, focus_name), *extra_foci]
+    if extra_foci:
+        zone_placemarks = iter_dissolved_zone_placemarks([(f_lat, f_lon) for f_lat, f_lon, _ in foci], zones)
+    else:
+        zone_placemarks = iter_zone_placemarks(lat, lon, zones)
+    styles = [*iter_zone_styles(zones), FOCUS_STYLE, farm_style(farm_icon_href)]
+    folders = [
+        ("Zonas de Contenção", zone_placemarks),
+        ("Foco", [focus_placemark(f_lat, f_lon, f_name) for f_lat, f_lon, f_name in foci]),
+        ("Produtores", iter_farm_placemarks(df) if not df.empty else []),
+    ]
+    return iter_kml_document("Zonas de Contingência e Granjas", styles, folders)
+
+
+def buffered(chunks, size=CHUNK_SIZE):
+    """Agrupa pedaços pequenos de texto em blocos de bytes UTF-8 de ~`size`."""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def write_kml(fileobj, chunks):
+    """Grava os pedaços de KML em um arquivo binário aberto."""
+    for block in buffered(chunks):
+        fileobj.write(block)
+
+
+def write_kmz(fileobj, documents, icon_path=ICON_PATH):
+    """
+    Grava um KMZ em `fileobj` (arquivo ou buffer binário). `documents` é uma sequência de
+    (nome do KML no zip, iterável de pedaços); o primeiro deve ser 'doc.kml', que o Google
+    Earth abre por padrão. O ícone das granjas é embutido em files/.
+    """
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as kmz:
+        for arcname, chunks in documents:
+            with kmz.open(arcname, 'w', force_zip64=True) as entry:
+                write_kml(entry, chunks)
+        if icon_path and os.path.exists(icon_path):
+            kmz.write(icon_path, KMZ_ICON_HREF)
@@ -0,0 +1,327 @@
+"""Geração do mapa Folium com as zonas de contingência, o foco e as granjas."""
+import glob
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import Element, MacroElement
+from jinja2 import Template
+
+from src.multifoco import dissolved_zone_rings, polygon_parts
+
+# Modos de renderização da camada de granjas.
+FARM_LAYER_GEOJSON = "geojson"   # Uma FeatureCollection, pontos deduplicados e popups no navegador
+FARM_LAYER_MARKERS = "marcadores"  # Um CircleMarker com popup HTML por aviário (modo original)
+
+# Zonas da maior para a menor, para que o anel mais restrito fique por cima.
+MAP_ZONES = [
+    {
+        "name": "Proteção (10-25km)", "outer_radius": 25000, "inner_radius": 10000, "color": "blue",
+        "description": "Zona de controle e monitoramento. Fiscalização do trânsito de veículos e produtos avícolas. Barreiras sanitárias para prevenir a entrada do vírus."
+    },
+    {
+        "name": "Vigilância (3-10km)", "outer_radius": 10000, "inner_radius": 3000, "color": "purple",
+        "description": "Zona de vigilância ativa. Restrição no trânsito de aves e produtos. Suspensão de GTAs e monitoramento epidemiológico intensivo."
+    },
+    {
+        "name": "Perifoco (0-3km)", "outer_radius": 3000, "inner_radius": 0, "color": "red",
+        "description": "Área de interdição máxima. Sacrifício de aves e controle total de acesso. Medidas rigorosas de desinfecção e vazio sanitário obrigatório."
+    }
+]
+
+_FARM_STYLE = dict(radius=2, color='darkgreen', fill=True, fill_color='darkgreen', fill_opacity=0.7)
+
+
+def get_circle_coords(center_lat, center_lon, radius_m, segments=100):
+    """Gera as coordenadas [lat, lon] de um círculo aproximado por `segments` segmentos."""
+    coords = []
+    for i in range(segments + 1):
+        angle = (i / segments) * 2 * math.pi
+        dx = radius_m * math.cos(angle)
+        dy = radius_m * math.sin(angle)
+        point_lat = center_lat + (dy / 111111)
+        point_lon = center_lon + (dx / (111111 * math.cos(math.radians(center_lat))))
+        coords.append([point_lat, point_lon])
+    return coords
+
+
+def farm_points(df):
+    """
+    Agrupa os aviários que compartilham a mesma coordenada (comum dentro de um núcleo).
+    Retorna um DataFrame com lat, lon, proprietario, cidade, capacidade (soma) e aviarios.
+    """
+    grouped = df.groupby(['lat', 'lon'], sort=False)
+    points = grouped.agg(cidade=('cidade', 'first'), capacidade=('capacidade', 'sum'), aviarios=('fazenda', 'size'))
+    points['proprietario'] = grouped['proprietario'].unique().map(lambda names: ", ".join(map(str, names)))
+    return points.reset_index()
+
+
+def farms_feature_collection(df):
+    """Monta a FeatureCollection GeoJSON das granjas, com um ponto por coordenada distinta."""
+    points = farm_points(df)
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+            "properties": {"proprietario": proprietario, "cidade": cidade,
+                           "capacidade": int(capacidade), "aviarios": int(aviarios)},
+        }
+        for lat, lon, proprietario, cidade, capacidade, aviarios in zip(
+            points['lat'].tolist(), points['lon'].tolist(), points['proprietario'].tolist(),
+            points['cidade'].astype(str).tolist(), np.nan_to_num(points['capacidade'].to_numpy()).tolist(),
+            points['aviarios'].tolist()
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def farms_geojson_script(df):
+    """Serializa a FeatureCollection das granjas para embutir diretamente em um <script>."""
+    payload = json.dumps(farms_feature_collection(df), ensure_ascii=False, separators=(',', ':'))
+    # Mesmo escape do filtro |tojson do Jinja, para que nenhum valor feche a tag <script>.
+    return (payload.replace('&', '\\u0026').replace('<', '\\u003c')
+            .replace('>', '\\u003e').replace("'", '\\u0027'))
+
+
+class FarmLayer(MacroElement):
+    """
+    Camada de granjas a partir de um GeoJSON já serializado (embutido no HTML) ou de uma
+    URL (carregado pelo navegador). Os popups são montados no navegador a partir das
+    propriedades de cada ponto, apenas quando abertos.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.geoJson(null, {
+            pointToLayer: function (feature, latlng) {
+                return L.circleMarker(latlng, {{ this.marker_options|tojson }});
+            },
+            onEachFeature: function (feature, layer) {
+                layer.bindPopup(function () {
+                    var p = feature.properties;
+                    var esc = function (v) {
+                        var div = document.createElement('div');
+                        div.textContent = String(v);
+                        return div.innerHTML;
+                    };
+                    return '<b>Proprietário:</b> ' + esc(p.proprietario) + '<br>'
+                        + '<b>Cidade:</b> ' + esc(p.cidade) + '<br>'
+                        + '<b>Capacidade:</b> ' + esc(p.capacidade) + ' aves<br>'
+                        + '<b>Aviários no ponto:</b> ' + esc(p.aviarios);
+                }, {maxWidth: 300});
+            }
+        }).addTo({{ this._parent.get_name() }});
+        {%- if this.url %}
+        fetch({{ this.url|tojson }})
+            .then(function (response) { return response.json(); })
+            .then(function (data) { {{ this.get_name() }}.addData(data); });
+        {%- else %}
+        {{ this.get_name() }}.addData({{ this.geojson_script }});
+        {%- endif %}
+        {% endmacro %}
+    """)
+
+    def __init__(self, geojson_script=None, url=None):
+        super().__init__()
+        self._name = "FarmLayer"
+        self.geojson_script = geojson_script
+        self.url = url
+        self.marker_options = {
+            "radius": _FARM_STYLE["radius"], "color": _FARM_STYLE["color"], "fill": True,
+            "fillColor": _FARM_STYLE["fill_color"], "fillOpacity": _FARM_STYLE["fill_opacity"],
+        }
+
+    def render(self, **kwargs):
+        # O MacroElement padrão compila o script renderizado como um novo template Jinja,
+        # o que custa segundos com todas as granjas embutidas; aqui ele é apenas concatenado.
+        script = self._template.module.__dict__["script"]
+        self.get_root().script.add_child(_RawScript(script(self, kwargs)), name=self.get_name())
+
+
+class _RawScript(Element):
+    """Trecho de script inserido como está, sem passar pelo Jinja."""
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+
+    def render(self, **kwargs):
+        return self.text
+
+
+@dataclass
+class StaticLayer:
+    """
+    Parte do mapa que não depende do foco: granjas e abatedouro. É construída uma vez por
+    versão da base; no modo GeoJSON as granjas já ficam serializadas.
+    """
+    farm_mode: str
+    farms_script: Optional[str] = None
+    farms_df: Optional[pd.DataFrame] = None
+    abatedouro_lat: Optional[float] = None
+    abatedouro_lon: Optional[float] = None
+
+
+def build_static_layer(df, abatedouro_lat, abatedouro_lon, farm_mode=FARM_LAYER_GEOJSON):
+    """Prepara a camada estática (granjas + abatedouro) para ser reutilizada entre focos."""
+    print("[INFO] Construindo camada estática de granjas do mapa...")
+    if farm_mode == FARM_LAYER_GEOJSON:
+        farms_script = farms_geojson_script(df) if not df.empty else None
+        return StaticLayer(farm_mode, farms_script=farms_script,
+                           abatedouro_lat=abatedouro_lat, abatedouro_lon=abatedouro_lon)
+    return StaticLayer(farm_mode, farms_df=df, abatedouro_lat=abatedouro_lat, abatedouro_lon=abatedouro_lon)
+
+
+def publish_farms_geojson(static, directory, fingerprint):
+    """
+    Grava o GeoJSON das granjas em `directory` (uma vez por versão da base) para que o
+    navegador o carregue por URL, removendo os arquivos de versões anteriores. Retorna o
+    nome do arquivo.
+    """
+    file_name = f"granjas_{fingerprint}.json"
+    file_path = os.path.join(directory, file_name)
+    if not os.path.exists(file_path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(static.farms_script or '{"type":"FeatureCollection","features":[]}')
+        os.replace(tmp_path, file_path)
+    for old_path in glob.glob(os.path.join(directory, "granjas_*.json")):
+        if os.path.basename(old_path) != file_name:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                # Já removido por outro processo.
+                pass
+    return file_name
+
+
+def add_static_layer(m, static, farms_url=None):
+    """
+    Adiciona ao mapa o abatedouro e a camada de granjas pré-construída. Com `farms_url`,
+    as granjas são carregadas pelo navegador em vez de embutidas no HTML.
+    """
+    if static.abatedouro_lat is not None and static.abatedouro_lon is not None:
+        folium.Marker(
+            [static.abatedouro_lat, static.abatedouro_lon],
+            popup="<b>Abatedouro de Aves - C.Vale</b>",
+            icon=folium.Icon(color='blue', icon='building')
+        ).add_to(m)
+
+    if static.farm_mode == FARM_LAYER_GEOJSON:
+        if farms_url is not None:
+            FarmLayer(url=farms_url).add_to(m)
+        elif static.farms_script is not None:
+            FarmLayer(geojson_script=static.farms_script).add_to(m)
+        return
+
+    # Modo original: um CircleMarker com popup HTML por aviário.
+    for _, row in static.farms_df.iterrows():
+        popup_html = f"""
+        <b>Proprietário:</b> {row.get('proprietario', 'N/A')}<br>
+        <b>Cidade:</b> {row.get('cidade', 'N/A')}<br>
+        <b>Capacidade:</b> {row.get('capacidade', 'N/A')} aves<br>
+        """
+        folium.CircleMarker(
+            location=[row['lat'], row['lon']],
+            popup=folium.Popup(popup_html, max_width=300),
+            **_FARM_STYLE
+        ).add_to(m)
+
+
+def build_focus_layers(lat, lon, focus_name):
+    """Monta as camadas dinâmicas do foco: o marcador e os três anéis de zona."""
+    focus_group = folium.FeatureGroup(name="Foco")
+    folium.Marker(
+        [lat, lon],
+        popup=f"<b>FOCO:</b> {focus_name}<br>Ponto central do foco de influenza aviária.",
+        icon=folium.Icon(color='red', icon='info-sign')
+    ).add_to(focus_group)
+
+    zones_group = folium.FeatureGroup(name="Zonas de Contingência")
+    for zone in MAP_ZONES:
+        locations = [get_circle_coords(lat, lon, zone["outer_radius"])]
+        if zone["inner_radius"] > 0:
+            inner_coords = get_circle_coords(lat, lon, zone["inner_radius"])
+            inner_coords.reverse()
+            locations.append(inner_coords)
+
+        folium.Polygon(
+            locations=locations,
+            color=zone["color"],
+            fill=True,
+            fill_color=zone["color"],
+            fill_opacity=0.2,
+            popup=f"<b>{zone['name']}</b><br>{zone['description']}"
+        ).add_to(zones_group)
+    return zones_group, focus_group
+
+
+def build_multi_focus_layers(foci):
+    """
+    Camadas do modo de múltiplos focos: um marcador por foco e os anéis de cada zona
+    dissolvidos entre todos os focos. `foci` é uma sequência de (lat, lon, nome).
+    """
+    focus_group = folium.FeatureGroup(name="Foco")
+    for lat, lon, focus_name in foci:
+        folium.Marker(
+            [lat, lon],
+            popup=f"<b>FOCO:</b> {focus_name}<br>Ponto central do foco de influenza aviária.",
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(focus_group)
+
+    zones_group = folium.FeatureGroup(name="Zonas de Contingência")
+    rings = dissolved_zone_rings([(lat, lon) for lat, lon, _ in foci], [zone["outer_radius"] for zone in MAP_ZONES])
+    for zone in MAP_ZONES:
+        for polygon in polygon_parts(rings[zone["outer_radius"]]):
+            locations = [[[y, x] for x, y in ring.coords] for ring in (polygon.exterior, *polygon.interiors)]
+            folium.Polygon(
+                locations=locations,
+                color=zone["color"],
+                fill=True,
+                fill_color=zone["color"],
+                fill_opacity=0.2,
+                popup=f"<b>{zone['name']}</b><br>{zone['description']}"
+            ).add_to(zones_group)
+    return zones_group, focus_group
+
+
+def build_layers_for_foci(foci):
+    """Camadas de zonas e de foco para um ou mais focos (lat, lon, nome)."""
+    if len(foci) == 1:
+        return build_focus_layers(*foci[0])
+    return build_multi_focus_layers(foci)
+
+
+def compose_map(lat, lon, static, focus_name, extra_foci=()):
+    """
+    Compõe o mapa do foco a partir da camada estática em cache e das camadas do foco.
+    Com `extra_foci` (sequência de (lat, lon, nome)), as zonas de todos os focos são dissolvidas.
+    """
+    print(f"[INFO] Gerando novo mapa para as coordenadas: Latitude={lat}, Longitude={lon}")
+    m = folium.Map(location=[lat, lon], zoom_start=9)
+    zones_group, focus_group = build_layers_for_foci([(lat, lon, focus_name), *extra_foci])
+    zones_group.add_to(m)
+    add_static_layer(m, static)
+    focus_group.add_to(m)
+    return m
+
+
+def build_base_map(static, center_lat, center_lon, farms_url=None):
+    """
+    Mapa base do modo interativo, só com a camada estática. Não depende do foco, então o
+    navegador o mantém entre os reruns e apenas as camadas do foco são trocadas.
+    """
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=9)
+    add_static_layer(m, static, farms_url)
+    return m
+
+
+def render_full_map(lat, lon, df, abatedouro_lat, abatedouro_lon, focus_name, farm_mode=FARM_LAYER_GEOJSON):
+    """Gera o HTML do mapa completo com zonas de contingência em formato de anel e granjas."""
+    static = build_static_layer(df, abatedouro_lat, abatedouro_lon, farm_mode)
+    return compose_map(lat, lon, static, focus_name)._repr_html_()
@@ -0,0 +1,42 @@
+"""
+Geometria do modo de múltiplos focos: os círculos de cada zona são dissolvidos entre todos
+os focos, e cada anel é a união da sua zona menos a união da zona imediatamente mais restrita.
+"""
+import math
+
+from shapely.geometry import Polygon
+from shapely.ops import unary_union
+
+
+def circle_polygon(lat, lon, radius_m, segments=100):
+    """Círculo aproximado por `segments` segmentos, em coordenadas (lon, lat)."""
+    points = []
+    for i in range(segments):
+        angle = (i / segments) * 2 * math.pi
+        point_lat = lat + (radius_m * math.sin(angle) / 111111)
+        point_lon = lon + (radius_m * math.cos(angle) / (111111 * math.cos(math.radians(lat))))
+        points.append((point_lon, point_lat))
+    return Polygon(points)
+
+
+def dissolved_zone_rings(foci, radii, segments=100):
+    """
+    Retorna {raio: geometria} com o anel dissolvido de cada zona. `foci` é uma sequência de
+    (lat, lon); os anéis não se sobrepõem, então cada ponto fica só na zona mais restrita.
+    """
+    rings = {}
+    inner = None
+    for radius in sorted(radii):
+        disc = unary_union([circle_polygon(lat, lon, radius, segments) for lat, lon in foci])
+        rings[radius] = disc if inner is None else disc.difference(inner)
+        inner = disc
+    return rings
+
+
+def polygon_parts(geometry):
+    """Polígonos que compõem a geometria (Polygon, MultiPolygon ou GeometryCollection)."""
+    if geometry.is_empty:
+        return []
+    if geometry.geom_type == "Polygon":
+        return [geometry]
+    return [part for member in geometry.geoms for part in polygon_parts(member)]
@@ -0,0 +1,230 @@
+"""
+Recarga da base de granjas: um thread observa data/coordenadas.csv e, quando o arquivo muda,
+carrega a nova versão e a compara com a versão em memória pela chave 'fazenda'.
+
+O incremental é a migração dos caches: os resultados por foco só são descartados se alguma
+granja alterada estiver dentro do seu raio de influência; os demais passam para a nova versão
+sem recálculo. A tabela em si é lida inteira de novo (base_colunar.load) e a KD-tree do índice
+espacial é reconstruída (cKDTree não admite inserções nem remoções); da versão anterior só são
+reaproveitados os vetores unitários das granjas que não mudaram de posição.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src import base_colunar, dados
+from src.cache import key_foci
+from src.indice_espacial import SpatialIndex
+
+# Intervalo (s) entre as verificações do CSV.
+POLL_INTERVAL_S = 5.0
+
+
+@dataclass
+class DatasetVersion:
+    """Uma versão carregada da base: tabela, fingerprint, índice espacial e assinatura do arquivo."""
+    df: pd.DataFrame
+    fingerprint: str
+    index: SpatialIndex
+    signature: Optional[tuple] = None
+
+
+@dataclass
+class TableDiff:
+    """
+    Diferenças entre duas versões da base pela chave 'fazenda'. lat/lon são as posições
+    afetadas (antigas e novas) das granjas incluídas, removidas ou alteradas; previous_rows[i]
+    é a linha da versão antiga com a mesma fazenda e posição da nova linha i, ou -1.
+    """
+    inserted: np.ndarray
+    deleted: np.ndarray
+    updated: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    previous_rows: np.ndarray
+
+    def __post_init__(self):
+        self._index = None
+
+    def __len__(self):
+        return self.inserted.size + self.deleted.size + self.updated.size
+
+    def summary(self):
+        return f"{self.inserted.size} incluída(s), {self.updated.size} alterada(s), {self.deleted.size} removida(s)"
+
+    def touches(self, foci, radius_m):
+        """Indica se alguma granja alterada está a até radius_m de algum dos focos (lat, lon)."""
+        if self.lat.size == 0:
+            return False
+        if self._index is None:
+            self._index = SpatialIndex(self.lat, self.lon)
+        return any(self._index.query_radius(lat, lon, radius_m)[0].size for lat, lon in foci)
+
+
+def _changed_rows(old, new):
+    """Máscara das linhas (já alinhadas) com alguma coluna diferente; ausentes dos dois lados são iguais."""
+    changed = np.zeros(len(new), dtype=bool)
+    for column in new.columns:
+        a, b = old[column], new[column]
+        if isinstance(a.dtype, np.dtype) and isinstance(b.dtype, np.dtype) and a.dtype.kind in 'iuf' \
+                and b.dtype.kind in 'iuf':
+            x, y = a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64)
+            changed |= (x != y) & ~(np.isnan(x) & np.isnan(y))
+            continue
+        x, y = a.astype(object).to_numpy(), b.astype(object).to_numpy()
+        missing_x, missing_y = pd.isna(x), pd.isna(y)
+        both = ~missing_x & ~missing_y
+        changed |= missing_x != missing_y
+        changed[both] |= x[both] != y[both]
+    return changed
+
+
+def _integer_keys(series):
+    """Valores da coluna-chave como int64, ou None se houver ausentes, não inteiros ou repetidos."""
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    if not np.isfinite(values).all() or (values != np.round(values)).any():
+        return None
+    keys = values.astype(np.int64)
+    return keys if np.unique(keys).size == keys.size else None
+
+
+def diff_farm_tables(old, new, key='fazenda'):
+    """
+    Compara duas versões da base pela coluna `key`. Retorna um TableDiff, ou None se a
+    comparação não for possível (chave ausente, vazia, não inteira ou repetida, ou colunas
+    diferentes).
+    """
+    if key not in old.columns or key not in new.columns or set(old.columns) != set(new.columns):
+        return None
+    old_keys, new_keys = _integer_keys(old[key]), _integer_keys(new[key])
+    if old_keys is None or new_keys is None:
+        return None
+    common, old_pos, new_pos = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+    inserted_pos = np.flatnonzero(~np.isin(new_keys, common, assume_unique=True))
+    deleted_pos = np.flatnonzero(~np.isin(old_keys, common, assume_unique=True))
+
+    columns = list(new.columns)
+    changed = _changed_rows(old[columns].iloc[old_pos].reset_index(drop=True),
+                            new[columns].iloc[new_pos].reset_index(drop=True))
+    old_lat, old_lon = old['lat'].to_numpy(dtype=np.float64), old['lon'].to_numpy(dtype=np.float64)
+    new_lat, new_lon = new['lat'].to_numpy(dtype=np.float64), new['lon'].to_numpy(dtype=np.float64)
+
+    previous_rows = np.full(len(new), -1, dtype=np.intp)
+    same_position = (old_lat[old_pos] == new_lat[new_pos]) & (old_lon[old_pos] == new_lon[new_pos])
+    previous_rows[new_pos[same_position]] = old_pos[same_position]
+
+    updated_old, updated_new = old_pos[changed], new_pos[changed]
+    lat = np.concatenate([new_lat[inserted_pos], old_lat[deleted_pos], old_lat[updated_old], new_lat[updated_new]])
+    lon = np.concatenate([new_lon[inserted_pos], old_lon[deleted_pos], old_lon[updated_old], new_lon[updated_new]])
+    return TableDiff(new_keys[inserted_pos], old_keys[deleted_pos], new_keys[updated_new], lat, lon, previous_rows)
+
+
+def migrate_focus_cache(cache, old_fingerprint, new_fingerprint, diff, influence_m):
+    """
+    Passa para a nova versão as entradas de `cache` (chaves de focus_key) da versão antiga que
+    não são afetadas pelas alterações. `influence_m` indica, por tipo de resultado, o raio de
+    influência padrão (os raios da chave têm precedência); tipos fora dele, entradas de outras
+    versões e todas as entradas quando diff é None são descartados. Retorna quantas ficaram.
+    """
+    def rekey(key):
+        if key[1] != old_fingerprint or diff is None or key[0] not in influence_m:
+            return None
+        radius_m = max(key[4]) if key[4] else influence_m[key[0]]
+        if diff.touches(key_foci(key), radius_m):
+            return None
+        return (key[0], new_fingerprint) + key[2:]
+
+    return cache.migrate(rekey)
+
+
+class FarmDataset:
+    """
+    Versão corrente da base, compartilhada entre as sessões e trocada de uma só vez a cada
+    recarga. on_change(anterior, nova, diff) é chamado antes da troca, para migrar caches; se
+    ele falhar, é chamado de novo com diff=None (descartando os caches da versão anterior) e a
+    nova versão é usada mesmo assim: uma falha nos caches não impede a recarga dos dados.
+    """
+
+    def __init__(self, csv_path, on_change=None, interval_s=POLL_INTERVAL_S, cache_dir=base_colunar.CACHE_DIR):
+        self.csv_path = csv_path
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self.cache_dir = cache_dir
+        signature = dados.file_signature(csv_path)
+        df, fingerprint = base_colunar.load(csv_path, cache_dir)
+        self.version = DatasetVersion(df, fingerprint, SpatialIndex(df['lat'].to_numpy(), df['lon'].to_numpy()),
+                                      signature)
+        self._pending = None
+        self._failed = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def check(self):
+        """
+        Uma verificação do CSV. A recarga só acontece quando a nova assinatura se repete em
+        duas verificações seguidas, para não ler um arquivo ainda em gravação. Retorna True
+        se uma nova versão foi carregada.
+        """
+        with self._lock:
+            try:
+                signature = dados.file_signature(self.csv_path)
+            except FileNotFoundError:
+                return False
+            if signature in (self.version.signature, self._failed):
+                self._pending = None
+                return False
+            if signature != self._pending:
+                self._pending = signature
+                return False
+            self._pending = None
+            try:
+                return self._reload(signature)
+            except Exception as e:
+                self._failed = signature
+                print(f"[AVISO] Falha ao recarregar {self.csv_path}; mantendo a versão atual: {e}")
+                return False
+
+    def _reload(self, signature):
+        start = time.perf_counter()
+        previous = self.version
+        df, fingerprint = base_colunar.load(self.csv_path, self.cache_dir)
+        if fingerprint == previous.fingerprint:
+            self.version = DatasetVersion(previous.df, previous.fingerprint, previous.index, signature)
+            return False
+        diff = diff_farm_tables(previous.df, df)
+        lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+        index = SpatialIndex(lat, lon) if diff is None else previous.index.updated(lat, lon, diff.previous_rows)
+        version = DatasetVersion(df, fingerprint, index, signature)
+        if self.on_change is not None:
+            self._migrate_caches(previous, version, diff)
+        self.version = version
+        detail = diff.summary() if diff is not None else "comparação por fazenda indisponível"
+        print(f"[INFO] Base recarregada ({detail}) em {time.perf_counter() - start:.2f} s.")
+        return True
+
+    def _migrate_caches(self, previous, version, diff):
+        try:
+            self.on_change(previous, version, diff)
+        except Exception as e:
+            print(f"[AVISO] Falha ao migrar os caches para a nova versão da base; descartando-os: {e}")
+            try:
+                self.on_change(previous, version, None)
+            except Exception as e:
+                # As entradas antigas têm o fingerprint anterior na chave: nunca serão servidas.
+                print(f"[AVISO] Falha ao descartar os caches da versão anterior: {e}")
+
+    def start(self):
+        """Inicia o thread (daemon) que verifica o CSV a cada interval_s segundos."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="recarga-granjas", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval_s)
+            self.check()
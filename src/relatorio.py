@@ -0,0 +1,403 @@
+"""
+Relatórios de impressão (HTML) e PDF a partir da classificação por zona, no formato
+{zona: {nucleo_id: {...}}} de zonas.zone_frame_to_dict.
+
+O HTML é gerado pelo modelo Jinja2 templates/relatorio_impressao.html (compilado uma vez por
+processo, com escape dos valores), linha a linha, direto no arquivo de saída. O PDF lista os
+núcleos em tabelas compactas (uma linha por núcleo), com uma fonte TrueType Unicode embutida
+uma única vez. Em lote, os relatórios de vários focos são gerados em um pool de processos e
+gravados em um ZIP.
+
+Uso (na raiz do projeto):
+    python -m src.relatorio                              # foco no abatedouro -> PDF
+    python -m src.relatorio -24.33,-53.85 -24.40,-53.70  # um PDF por foco, em um ZIP
+    python -m src.relatorio --por-nucleo [--processos 4] # um PDF por núcleo, em um ZIP
+    python -m src.relatorio --formato html               # relatório HTML para impressão
+"""
+import argparse
+import datetime
+import functools
+import io
+import multiprocessing
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import jinja2
+from fpdf import FPDF
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import base_colunar, empacotar_kmz, zonas
+from src.indice_espacial import SpatialIndex
+
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "templates")
+HTML_TEMPLATE = "relatorio_impressao.html"
+# Trechos do modelo acumulados antes de cada gravação no arquivo.
+HTML_BUFFER_CHUNKS = 500
+
+# Fonte TrueType do PDF: a primeira existente (ZONAS_FONTE_PDF tem precedência; a DejaVu Sans
+# acompanha o projeto em assets/fonts/). Sem nenhuma, usa Helvetica, limitada ao Latin-1.
+PDF_FONT_PATHS = [
+    os.environ.get("ZONAS_FONTE_PDF", ""),
+    os.path.join(PROJECT_ROOT, "assets", "fonts", "DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+ZONE_ORDER = ["Perifoco (0-3km)", "Vigilância (3-10km)", "Proteção (10-25km)"]
+# Colunas da tabela de núcleos (página A4 paisagem): título, largura (mm), alinhamento.
+PDF_COLUMNS = [
+    ("Núcleo", 15, "R"),
+    ("Proprietário", 55, "L"),
+    ("Técnico", 40, "L"),
+    ("Total Aves", 22, "R"),
+    ("Área (m²)", 22, "R"),
+    ("Aviários", 48, "L"),
+    ("BP Propriedade", 36, "L"),
+    ("Coordenadas", 39, "L"),
+]
+PDF_FONT_SIZE = 8
+PDF_LINE_HEIGHT = 4.2
+
+
+@functools.lru_cache(maxsize=None)
+def get_report_template(name=HTML_TEMPLATE):
+    """Modelo Jinja2 compilado, carregado uma única vez por processo (e reaproveitado entre os reruns)."""
+    environment = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR), autoescape=True, trim_blocks=True, lstrip_blocks=True
+    )
+    return environment.get_template(name)
+
+
+def _report_rows(nucleos):
+    """Linhas da tabela de uma zona, geradas sob demanda na ordem dos núcleos."""
+    for nucleo_id, data in sorted(nucleos.items()):
+        yield {
+            'nucleo': nucleo_id,
+            'proprietario': data['proprietario'],
+            'tecnico': data['tecnico'],
+            'aviarios': str(sorted(data['aviarios']))[1:-1],
+            'total_aves': int(data['total_aves']),
+            'total_area': int(data['total_area']),
+            'bp_propriedade': str([str(bp) for bp in data['bp_propriedade']])[1:-1],
+        }
+
+
+def _report_context(classified_data, lat, lon):
+    zones = [{'name': zone_name, 'count': len(classified_data[zone_name]),
+              'rows': _report_rows(classified_data[zone_name])} for zone_name in ZONE_ORDER]
+    return {'now': datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S"), 'lat': lat, 'lon': lon, 'zones': zones}
+
+
+def write_report_html(fileobj, classified_data, lat, lon):
+    """
+    Grava em `fileobj` (binário) o relatório HTML para impressão, em UTF-8. As linhas passam
+    pelo modelo uma a uma e são gravadas em blocos, sem montar o documento inteiro em memória.
+    """
+    stream = get_report_template().stream(_report_context(classified_data, lat, lon))
+    stream.enable_buffering(HTML_BUFFER_CHUNKS)
+    stream.dump(fileobj, encoding='utf-8')
+
+
+def generate_report_html(classified_data, lat, lon):
+    """Gera uma string HTML formatada para impressão."""
+    return get_report_template().render(_report_context(classified_data, lat, lon))
+
+
+def find_pdf_font(paths=PDF_FONT_PATHS):
+    """Caminho da primeira fonte TrueType disponível, ou None."""
+    return next((path for path in paths if path and os.path.isfile(path)), None)
+
+
+_fallback_warned = False
+
+
+def _warn_latin1_fallback():
+    """Avisa (uma vez por processo) que nenhuma fonte TrueType foi encontrada."""
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        print("[AVISO] Nenhuma fonte TrueType encontrada (assets/fonts/DejaVuSans.ttf ou ZONAS_FONTE_PDF): "
+              "o PDF usará Helvetica e caracteres fora do Latin-1 serão substituídos por '?'.")
+
+
+def _thousands(value):
+    return f"{int(value):,}".replace(",", ".")
+
+
+class _ReportPDF(FPDF):
+    """FPDF com a fonte do relatório, o número das páginas e as linhas de tabela compactas."""
+
+    def __init__(self, font_path):
+        super().__init__(orientation="L", format="A4")
+        self.set_margins(10, 10, 10)
+        self.set_auto_page_break(True, margin=12)
+        if font_path:
+            self.add_font("Relatorio", "", font_path)
+            self.report_font = "Relatorio"
+            self.encode_text = str
+        else:
+            _warn_latin1_fallback()
+            self.report_font = "helvetica"
+            self.encode_text = lambda text: text.encode("latin-1", "replace").decode("latin-1")
+        self.table_header = None
+        # Larguras das palavras na fonte da tabela (ver wrap).
+        self.word_widths = {}
+
+    def use_font(self, size):
+        self.set_font(self.report_font, "", size)
+
+    def footer(self):
+        self.set_y(-10)
+        self.use_font(7)
+        self.set_text_color(110, 110, 110)
+        self.cell(0, 5, f"Página {self.page_no()}", align="R")
+        self.set_text_color(0, 0, 0)
+
+    def header(self):
+        # Repete o cabeçalho da tabela em curso nas páginas seguintes.
+        if self.page_no() > 1 and self.table_header is not None:
+            self.table_row(self.table_header, fill=(220, 220, 220))
+
+    def word_width(self, word):
+        width = self.word_widths.get(word)
+        if width is None:
+            width = self.word_widths[word] = self.get_string_width(word)
+        return width
+
+    def wrap(self, text, max_width):
+        """
+        Quebra o texto em linhas de até max_width (mm) nos espaços, com a largura de cada
+        palavra medida uma única vez por documento; retorna [(linha, largura)]. Palavras
+        maiores que a coluna ficam sozinhas na linha.
+        """
+        space = self.word_width(" ")
+        lines, words, line_width = [], [], 0.0
+        for word in text.split(" "):
+            width = self.word_width(word)
+            if words and line_width + space + width > max_width:
+                lines.append((" ".join(words), line_width))
+                words, line_width = [], 0.0
+            line_width += space + width if words else width
+            words.append(word)
+        lines.append((" ".join(words), line_width))
+        return lines
+
+    def table_row(self, cells, fill=None, link=None):
+        """
+        Uma linha da tabela, escrita com text() (bem mais leve que cell()), com quebra de
+        linha nas células que não cabem na coluna e altura igual à da célula mais alta.
+        `link` vale para a última coluna.
+        """
+        padding = self.c_margin
+        columns = [self.wrap(text, width - 2 * padding) for text, (_, width, _) in zip(cells, PDF_COLUMNS)]
+        height = max(len(lines) for lines in columns) * PDF_LINE_HEIGHT
+        if self.will_page_break(height):
+            self.add_page()
+        x, y = self.l_margin, self.get_y()
+        if fill is not None:
+            self.set_fill_color(*fill)
+            self.rect(x, y, self.epw, height, style="F")
+        # Linha de base do texto centralizado verticalmente na linha, como em cell().
+        baseline = 0.5 * PDF_LINE_HEIGHT + 0.3 * self.font_size
+        for n, (lines, (_, width, align)) in enumerate(zip(columns, PDF_COLUMNS)):
+            is_link = link is not None and n == len(PDF_COLUMNS) - 1
+            if is_link:
+                self.set_text_color(0, 0, 255)
+                self.link(x, y, width, height, link)
+            for k, (line, line_width) in enumerate(lines):
+                line_x = x + width - padding - line_width if align == "R" else x + padding
+                self.text(line_x, y + k * PDF_LINE_HEIGHT + baseline, line)
+            if is_link:
+                self.set_text_color(0, 0, 0)
+            x += width
+        self.set_xy(self.l_margin, y + height)
+
+
+def write_pdf_report(fileobj, classified_data, lat, lon, focus_name, font_path=None):
+    """
+    Grava em `fileobj` o relatório PDF do foco: um cabeçalho e, por zona, uma tabela com
+    uma linha por núcleo (a coordenada leva ao Google Maps). `font_path` substitui a busca
+    em PDF_FONT_PATHS.
+    """
+    pdf = _ReportPDF(font_path or find_pdf_font())
+    text = pdf.encode_text
+    pdf.add_page()
+
+    pdf.use_font(16)
+    pdf.cell(0, 10, text("Relatório de Zonas de Contingência"), align="C", new_x="LMARGIN", new_y="NEXT")
+    now = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    pdf.use_font(10)
+    pdf.cell(0, 6, text(f"Gerado em: {now}"), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 6, text(f"Foco: {focus_name} (Latitude={lat}, Longitude={lon})"), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(4)
+
+    titles = [text(title) for title, _, _ in PDF_COLUMNS]
+    for zone_name in ZONE_ORDER:
+        sorted_nucleos = sorted(classified_data[zone_name].items())
+        pdf.table_header = None
+        pdf.use_font(12)
+        if pdf.will_page_break(8 + 2 * PDF_LINE_HEIGHT):
+            pdf.add_page()
+        pdf.cell(0, 8, text(f"{zone_name} ({len(sorted_nucleos)} núcleos)"), new_x="LMARGIN", new_y="NEXT")
+        pdf.use_font(PDF_FONT_SIZE)
+        if not sorted_nucleos:
+            pdf.cell(0, 6, text("Nenhum núcleo encontrado nesta zona."), new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(3)
+            continue
+
+        pdf.table_row(titles, fill=(220, 220, 220))
+        pdf.table_header = titles
+        for row, (nucleo_id, data) in enumerate(sorted_nucleos):
+            n_lat, n_lon = data['latitude'], data['longitude']
+            cells = [
+                str(nucleo_id),
+                text(str(data['proprietario'])),
+                text(str(data['tecnico'])),
+                _thousands(data['total_aves']),
+                _thousands(data['total_area']),
+                f"{len(data['aviarios'])}: {str(sorted(data['aviarios']))[1:-1]}",
+                text(", ".join(str(bp) for bp in data['bp_propriedade'])),
+                f"{n_lat}, {n_lon}",
+            ]
+            maps_link = f"https://www.google.com/maps/search/?api=1&query={n_lat},{n_lon}"
+            pdf.table_row(cells, fill=(245, 245, 245) if row % 2 else None, link=maps_link)
+        pdf.table_header = None
+        pdf.ln(4)
+
+    fileobj.write(pdf.output())
+
+
+def generate_pdf_report(classified_data, lat, lon, focus_name):
+    """Gera um relatório em PDF a partir dos dados classificados e retorna os bytes."""
+    print("[INFO] Gerando relatório PDF...")
+    buffer = io.BytesIO()
+    write_pdf_report(buffer, classified_data, lat, lon, focus_name)
+    return buffer.getvalue()
+
+
+# Formato do relatório -> função que o grava em um arquivo binário.
+REPORT_WRITERS = {
+    "pdf": lambda fileobj, data, lat, lon, focus_name: write_pdf_report(fileobj, data, lat, lon, focus_name),
+    "html": lambda fileobj, data, lat, lon, focus_name: write_report_html(fileobj, data, lat, lon),
+}
+
+_batch_state = None
+
+
+def _batch_worker_state(df, report_format, index=None):
+    index = index if index is not None else SpatialIndex(df['lat'].to_numpy(), df['lon'].to_numpy())
+    return df, REPORT_WRITERS[report_format], index
+
+
+def _init_batch_worker(df, report_format):
+    global _batch_state
+    _batch_state = _batch_worker_state(df, report_format)
+
+
+def _render_focus_report(task, state=None):
+    """
+    Classifica um foco e gera o relatório, no processo do pool (ou com o `state` dado, quando
+    gerado no próprio processo); retorna (nome do arquivo, bytes).
+    """
+    file_name, lat, lon, focus_name = task
+    df, writer, index = state or _batch_state
+    frame = zonas.classify_zone_frame(lat, lon, df, index=index)
+    buffer = io.BytesIO()
+    writer(buffer, zonas.zone_frame_to_dict(frame), lat, lon, focus_name)
+    return file_name, buffer.getvalue()
+
+
+def write_report_batch(fileobj, foci, df, index=None, workers=None, report_format="pdf", progress=None):
+    """
+    Grava em `fileobj` um ZIP com um relatório (PDF ou HTML) por foco. `foci` são tuplas
+    (nome do arquivo, lat, lon, nome do foco); os relatórios são gerados por `workers`
+    processos (padrão: núcleos da CPU) e gravados no ZIP na ordem dos focos, à medida que
+    ficam prontos, chamando progress(fração, descrição) a cada um. Retorna o número de relatórios.
+    """
+    tasks = list(foci)
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    # Os PDFs já são comprimidos: o ZIP apenas os armazena.
+    compression = zipfile.ZIP_STORED if report_format == "pdf" else zipfile.ZIP_DEFLATED
+
+    def store(archive, results):
+        for done, (file_name, data) in enumerate(results, start=1):
+            archive.writestr(file_name, data)
+            if progress is not None:
+                progress(done / len(tasks), f"{done}/{len(tasks)} relatórios")
+
+    with zipfile.ZipFile(fileobj, 'w', compression) as archive:
+        if workers == 1:
+            # Sem o estado global: a fila de exportações do aplicativo gera lotes em várias threads.
+            state = _batch_worker_state(df, report_format, index)
+            store(archive, (_render_focus_report(task, state) for task in tasks))
+        else:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            # spawn: o aplicativo chama esta função de uma thread da fila de exportações; um fork
+            # do servidor (com várias threads) herdaria locks presos e poderia travar os processos.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_batch_worker, initargs=(df, report_format)) as pool:
+                store(archive, pool.map(_render_focus_report, tasks, chunksize=chunksize))
+    return len(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera relatórios (PDF ou HTML) das zonas de contingência.")
+    parser.add_argument("coordenadas", nargs="*",
+                        help="foco como 'lat,lon' ou 'lat lon', ou vários 'lat,lon' (padrão: abatedouro)")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV das granjas (padrão: data/coordenadas.csv)")
+    parser.add_argument("--formato", choices=sorted(REPORT_WRITERS), default="pdf", help="formato dos relatórios")
+    parser.add_argument("--saida", default=None,
+                        help="arquivo do relatório, ou ZIP com vários focos ou --por-nucleo (padrão: output/)")
+    parser.add_argument("--nome-foco", default="FOCO", help="nome do foco no relatório")
+    parser.add_argument("--por-nucleo", action="store_true", help="gera um relatório por núcleo, em um ZIP")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: núcleos da CPU)")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # "lat,lon" com latitude negativa não deve ser lido como uma opção pelo argparse.
+    argv = [f" {arg}" if arg.startswith('-') and ',' in arg else arg for arg in argv]
+    args = parser.parse_args(argv)
+
+    try:
+        foci = empacotar_kmz.parse_focus_args(args.coordenadas)
+    except ValueError as e:
+        parser.error(f"Coordenadas inválidas: {e}")
+
+    print(f"Lendo granjas de {args.csv}...")
+    df, _ = base_colunar.load(args.csv)
+    extension = args.formato
+    label = args.formato.upper()
+
+    if args.por_nucleo:
+        tasks = [(f"nucleo_{nucleo}.{extension}", lat, lon, name)
+                 for nucleo, lat, lon, name in empacotar_kmz.nucleus_foci(df)]
+        output_path = args.saida or os.path.join(OUTPUT_DIR, "relatorios_nucleos.zip")
+    elif foci and len(foci) > 1:
+        tasks = [(f"foco_{i}.{extension}", lat, lon, f"{args.nome_foco} {i}") for i, (lat, lon) in enumerate(foci, start=1)]
+        output_path = args.saida or os.path.join(OUTPUT_DIR, "relatorios_focos.zip")
+    else:
+        lat, lon = foci[0] if foci else empacotar_kmz.read_default_focus()
+        output_path = args.saida or os.path.join(OUTPUT_DIR, f"relatorio_contingencia.{extension}")
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        # Um único foco, sem índice: varredura com a projeção local e refinamento exato nos limites.
+        frame = zonas.classify_zone_frame(lat, lon, df, approximate=True)
+        with open(output_path, 'wb') as f:
+            REPORT_WRITERS[args.formato](f, zonas.zone_frame_to_dict(frame), lat, lon, args.nome_foco)
+        print(f"Relatório {label} criado em: {output_path}")
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'wb') as f:
+        count = write_report_batch(f, tasks, df, workers=args.processos, report_format=args.formato)
+    print(f"{count} relatórios {label} gravados em: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
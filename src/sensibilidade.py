@@ -0,0 +1,65 @@
+"""
+Análise de sensibilidade dos raios das zonas: as distâncias das granjas ao foco são calculadas
+e ordenadas uma única vez; com as somas acumuladas de aviários, aves e área, os totais de
+qualquer conjunto de raios saem de uma busca binária (O(log N) por raio).
+"""
+import numpy as np
+import pandas as pd
+
+from src.geo import haversine_array
+from src.zonas import ZONE_RADII, nearest_focus_distances
+
+# Conjuntos de raios (Perifoco, Vigilância, Proteção) em uso no projeto, para comparação.
+RADIUS_PRESETS = {
+    "Aplicativo (3/10/25 km)": ZONE_RADII,
+    "src/gerar_kml.py (3/7/15 km)": (3000, 7000, 15000),
+}
+# Métricas acumuladas: nome -> coluna de peso da tabela (None conta aviários).
+METRICS = {"aviarios": None, "aves": "capacidade", "area": "area"}
+
+
+class RadiusSweep:
+    """
+    Distâncias ordenadas das granjas (com núcleo, como na classificação) ao foco mais
+    próximo, com as somas acumuladas de cada métrica. `foci` é uma sequência de (lat, lon).
+    """
+
+    def __init__(self, foci, df):
+        has_nucleo = df['nucleo'].notna().to_numpy() if not df.empty else np.zeros(0, dtype=bool)
+        farms = df.loc[has_nucleo]
+        lat = farms['lat'].to_numpy(dtype=np.float64)
+        lon = farms['lon'].to_numpy(dtype=np.float64)
+        if len(foci) == 1:
+            distances = haversine_array(foci[0][1], foci[0][0], lon, lat)
+        else:
+            distances, _ = nearest_focus_distances([f[0] for f in foci], [f[1] for f in foci], lat, lon)
+        order = np.argsort(distances, kind='stable')
+        self.distances = distances[order]
+        # cumulative[name][k] = soma da métrica das k granjas mais próximas.
+        self.cumulative = {}
+        for name, column in METRICS.items():
+            weights = np.ones(order.size) if column is None else \
+                np.nan_to_num(farms[column].to_numpy(dtype=np.float64))[order]
+            self.cumulative[name] = np.concatenate(([0.0], np.cumsum(weights)))
+
+    def __len__(self):
+        return self.distances.size
+
+    def totals_within(self, radii_m):
+        """Totais acumulados até cada raio (limite inclusivo, como nas zonas): {métrica: array}."""
+        counts = np.searchsorted(self.distances, np.asarray(radii_m, dtype=np.float64), side='right')
+        return {name: cumulative[counts] for name, cumulative in self.cumulative.items()}
+
+    def zone_totals(self, radii_m):
+        """
+        Totais por zona para um conjunto de raios crescentes (cada granja na zona mais
+        restrita): {métrica: array com um valor por zona}.
+        """
+        within = self.totals_within(radii_m)
+        return {name: np.diff(values, prepend=0.0) for name, values in within.items()}
+
+    def curve(self, max_radius_m=50000, step_m=500):
+        """DataFrame com os totais acumulados em função do raio, para o gráfico."""
+        radii = np.arange(0, max_radius_m + step_m, step_m, dtype=np.float64)
+        totals = self.totals_within(radii)
+        return pd.DataFrame({"raio_km": radii / 1000, **{name: values for name, values in totals.items()}})
@@ -0,0 +1,261 @@
+"""
+Vizinhanças pré-calculadas dos núcleos: para cada ponto de núcleo da base, a lista das granjas
+a até 25 km, ordenada pela distância. Com ela, um foco centrado em um núcleo é classificado
+com uma consulta e um corte, sem recalcular distâncias.
+
+O arquivo (npz) é identificado pelo fingerprint da base e é atualizado de forma incremental:
+apenas os pontos próximos de granjas alteradas são recalculados.
+
+Uso (na raiz do projeto):
+    python -m src.vizinhanca [--csv data/coordenadas.csv] [--processos 4]
+"""
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import base_colunar
+from src.cache import round_focus
+from src.indice_espacial import SpatialIndex
+from src.zonas import ZONE_RADII
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+CSV_PATH = os.path.join(PROJECT_ROOT, "data", "coordenadas.csv")
+SNAPSHOT_RADIUS = max(ZONE_RADII)
+
+# Pontos por tarefa enviada ao pool de processos.
+_POINTS_PER_TASK = 256
+
+
+def snapshot_path(fingerprint, directory=CACHE_DIR):
+    return os.path.join(directory, f"vizinhos_{fingerprint}.npz")
+
+
+def nucleus_points(df):
+    """Coordenadas distintas (arredondadas como o foco) dos aviários que pertencem a um núcleo."""
+    with_nucleo = df.dropna(subset=['nucleo'])
+    points = {round_focus(lat, lon) for lat, lon in zip(with_nucleo['lat'].tolist(), with_nucleo['lon'].tolist())}
+    points = np.array(sorted(points), dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+class NeighbourSnapshot:
+    """
+    Listas de vizinhos por ponto de núcleo em formato CSR: as granjas do ponto i estão em
+    rows[offsets[i]:offsets[i + 1]], com as distâncias correspondentes em ordem crescente.
+    """
+
+    def __init__(self, fingerprint, radius_m, fazendas, farm_lat, farm_lon,
+                 point_lat, point_lon, offsets, rows, distances):
+        self.fingerprint = fingerprint
+        self.radius_m = float(radius_m)
+        self.fazendas = fazendas
+        self.farm_lat = farm_lat
+        self.farm_lon = farm_lon
+        self.point_lat = point_lat
+        self.point_lon = point_lon
+        self.offsets = offsets
+        self.rows = rows
+        self.distances = distances
+        self._points = {(lat, lon): i for i, (lat, lon) in enumerate(zip(point_lat.tolist(), point_lon.tolist()))}
+
+    def __len__(self):
+        return self.point_lat.size
+
+    def lookup(self, lat, lon, radius_m):
+        """
+        Retorna (índices, distâncias) das granjas a até radius_m do ponto, ou None se o ponto
+        não for um núcleo pré-calculado ou o raio for maior que o da vizinhança.
+        """
+        i = self._points.get((lat, lon))
+        if i is None or radius_m > self.radius_m:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        end = start + np.searchsorted(self.distances[start:end], radius_m, side='right')
+        return self.rows[start:end].astype(np.intp), self.distances[start:end]
+
+    def save(self, file_path):
+        """Grava a vizinhança de forma atômica."""
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f, fingerprint=np.array(self.fingerprint), radius_m=np.array(self.radius_m),
+                fazendas=self.fazendas, farm_lat=self.farm_lat, farm_lon=self.farm_lon,
+                point_lat=self.point_lat, point_lon=self.point_lon,
+                offsets=self.offsets, rows=self.rows, distances=self.distances,
+            )
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as data:
+            return cls(str(data['fingerprint']), float(data['radius_m']),
+                       *(data[name] for name in ('fazendas', 'farm_lat', 'farm_lon', 'point_lat', 'point_lon',
+                                                 'offsets', 'rows', 'distances')))
+
+
+_worker_index = None
+
+
+def _init_worker(farm_lat, farm_lon):
+    global _worker_index
+    _worker_index = SpatialIndex(farm_lat, farm_lon)
+
+
+def _neighbours(task):
+    """Vizinhos (ordenados por distância) de um bloco de pontos, no processo do pool."""
+    point_lat, point_lon, radius_m = task
+    result = []
+    for lat, lon in zip(point_lat.tolist(), point_lon.tolist()):
+        rows, distances = _worker_index.query_radius(lat, lon, radius_m)
+        order = np.argsort(distances, kind='stable')
+        result.append((rows[order].astype(np.int32), distances[order]))
+    return result
+
+
+def compute_neighbours(farm_lat, farm_lon, point_lat, point_lon, radius_m=SNAPSHOT_RADIUS, workers=None):
+    """Calcula as listas de vizinhos dos pontos, em paralelo quando `workers` > 1."""
+    tasks = [(point_lat[i:i + _POINTS_PER_TASK], point_lon[i:i + _POINTS_PER_TASK], radius_m)
+             for i in range(0, point_lat.size, _POINTS_PER_TASK)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(farm_lat, farm_lon)
+        return [item for task in tasks for item in _neighbours(task)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(farm_lat, farm_lon)) as pool:
+        return [item for chunk in pool.map(_neighbours, tasks) for item in chunk]
+
+
+def _to_csr(neighbours):
+    offsets = np.zeros(len(neighbours) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([rows.size for rows, _ in neighbours])
+    rows = np.concatenate([r for r, _ in neighbours]) if neighbours else np.empty(0, dtype=np.int32)
+    distances = np.concatenate([d for _, d in neighbours]) if neighbours else np.empty(0, dtype=np.float64)
+    return offsets, rows.astype(np.int32), distances.astype(np.float64)
+
+
+def build_snapshot(df, fingerprint, radius_m=SNAPSHOT_RADIUS, workers=None, previous=None):
+    """
+    Monta a vizinhança da base. Com `previous` (vizinhança de uma versão anterior), só são
+    recalculados os pontos novos e os pontos a até radius_m de uma granja incluída, removida
+    ou com coordenadas alteradas; os demais apenas têm os índices remapeados.
+    """
+    fazendas = df['fazenda'].to_numpy(dtype=np.int64)
+    farm_lat = df['lat'].to_numpy(dtype=np.float64)
+    farm_lon = df['lon'].to_numpy(dtype=np.float64)
+    point_lat, point_lon = nucleus_points(df)
+
+    reused = {}
+    if previous is not None and previous.radius_m == radius_m and np.unique(fazendas).size == fazendas.size:
+        reused = _reusable_neighbours(previous, fazendas, farm_lat, farm_lon, radius_m)
+
+    neighbours = [reused.get(point) for point in zip(point_lat.tolist(), point_lon.tolist())]
+    missing = [i for i, item in enumerate(neighbours) if item is None]
+    print(f"[INFO] Vizinhança: {len(missing)} de {len(neighbours)} pontos de núcleo a calcular...")
+    if missing:
+        missing = np.array(missing, dtype=np.intp)
+        for i, item in zip(missing, compute_neighbours(farm_lat, farm_lon, point_lat[missing],
+                                                       point_lon[missing], radius_m, workers)):
+            neighbours[i] = item
+
+    offsets, rows, distances = _to_csr(neighbours)
+    return NeighbourSnapshot(fingerprint, radius_m, fazendas, farm_lat, farm_lon,
+                             point_lat, point_lon, offsets, rows, distances)
+
+
+def _reusable_neighbours(previous, fazendas, farm_lat, farm_lon, radius_m):
+    """
+    Listas da versão anterior que continuam válidas, já com os índices da nova tabela.
+    Uma lista é descartada se o ponto estiver a até radius_m da posição antiga ou nova de
+    alguma granja alterada.
+    """
+    old_position = {fazenda: i for i, fazenda in enumerate(previous.fazendas.tolist())}
+    remap = np.full(previous.fazendas.size, -1, dtype=np.int64)
+    changed_lat, changed_lon = [], []
+    for new_i, fazenda in enumerate(fazendas.tolist()):
+        old_i = old_position.pop(fazenda, None)
+        if old_i is not None and previous.farm_lat[old_i] == farm_lat[new_i] \
+                and previous.farm_lon[old_i] == farm_lon[new_i]:
+            remap[old_i] = new_i
+            continue
+        changed_lat.append(farm_lat[new_i])
+        changed_lon.append(farm_lon[new_i])
+        if old_i is not None:
+            changed_lat.append(previous.farm_lat[old_i])
+            changed_lon.append(previous.farm_lon[old_i])
+    for old_i in old_position.values():  # granjas removidas
+        changed_lat.append(previous.farm_lat[old_i])
+        changed_lon.append(previous.farm_lon[old_i])
+
+    dirty = np.zeros(len(previous), dtype=bool)
+    if changed_lat:
+        point_index = SpatialIndex(previous.point_lat, previous.point_lon)
+        for lat, lon in zip(changed_lat, changed_lon):
+            # Pequena folga: a distância granja -> ponto pode diferir no último bit da ponto -> granja.
+            dirty[point_index.query_radius(lat, lon, radius_m * (1 + 1e-9) + 1e-6)[0]] = True
+
+    reused = {}
+    for i, point in enumerate(zip(previous.point_lat.tolist(), previous.point_lon.tolist())):
+        if dirty[i]:
+            continue
+        start, end = previous.offsets[i], previous.offsets[i + 1]
+        reused[point] = (remap[previous.rows[start:end]].astype(np.int32), previous.distances[start:end])
+    return reused
+
+
+def latest_snapshot(directory=CACHE_DIR, exclude=None):
+    """Caminho da vizinhança gravada mais recentemente, ou None."""
+    paths = [p for p in glob.glob(os.path.join(directory, "vizinhos_*.npz")) if p != exclude]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def load_snapshot(fingerprint, directory=CACHE_DIR):
+    """Carrega a vizinhança da versão `fingerprint` da base, se já tiver sido gerada."""
+    file_path = snapshot_path(fingerprint, directory)
+    if not os.path.exists(file_path):
+        return None
+    snapshot = NeighbourSnapshot.load(file_path)
+    return snapshot if snapshot.fingerprint == fingerprint else None
+
+
+def update_snapshot(df, fingerprint, directory=CACHE_DIR, workers=None):
+    """
+    Gera (ou atualiza a partir da última versão gravada) a vizinhança da base e a grava
+    em `directory`. As versões anteriores são removidas.
+    """
+    file_path = snapshot_path(fingerprint, directory)
+    existing = load_snapshot(fingerprint, directory)
+    if existing is not None:
+        return existing
+    previous_path = latest_snapshot(directory, exclude=file_path)
+    previous = NeighbourSnapshot.load(previous_path) if previous_path else None
+    snapshot = build_snapshot(df, fingerprint, workers=workers, previous=previous)
+    snapshot.save(file_path)
+    for old_path in glob.glob(os.path.join(directory, "vizinhos_*.npz")):
+        if old_path != file_path:
+            os.remove(old_path)
+    return snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula a vizinhança (até 25 km) de cada núcleo.")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV das granjas (padrão: data/coordenadas.csv)")
+    parser.add_argument("--diretorio", default=CACHE_DIR, help="onde gravar a vizinhança (padrão: cache/)")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: núcleos da CPU)")
+    args = parser.parse_args(argv)
+
+    df, fingerprint = base_colunar.load(args.csv)
+    snapshot = update_snapshot(df, fingerprint, args.diretorio, args.processos)
+    print(f"Vizinhança de {len(snapshot)} pontos de núcleo ({snapshot.rows.size} pares) em: "
+          f"{snapshot_path(fingerprint, args.diretorio)}")
+
+
+if __name__ == "__main__":
+    main()
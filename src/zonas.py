@@ -0,0 +1,228 @@
+"""Definição das zonas de contingência e motor de classificação das granjas."""
+import numpy as np
+import pandas as pd
+
+from src.geo import EARTH_RADIUS_M, haversine_array
+
+# Zonas da mais restrita para a menos restrita, com o raio externo em metros.
+ZONE_NAMES = ["Perifoco (0-3km)", "Vigilância (3-10km)", "Proteção (10-25km)"]
+ZONE_RADII = (3000, 10000, 25000)
+
+# Número máximo de células (granjas × focos) da matriz de distâncias calculada de uma vez.
+DISTANCE_CHUNK_CELLS = 1 << 22
+
+# Colunas do DataFrame de classificação: uma linha por (zona, núcleo).
+ZONE_FRAME_COLUMNS = ['zona', 'nucleo', 'proprietario', 'tecnico', 'aviarios', 'bp_propriedade',
+                      'total_aves', 'total_area', 'latitude', 'longitude']
+
+# Acima desta latitude do foco a projeção local perde precisão e só a haversine é usada.
+APPROXIMATE_MAX_LATITUDE = 70.0
+
+
+def zone_indices(distances, radii=ZONE_RADII):
+    """
+    Retorna o índice da zona mais restrita de cada distância (limite externo inclusivo).
+    Distâncias além do último raio recebem o índice len(radii).
+    """
+    return np.searchsorted(np.asarray(radii, dtype=np.float64), distances, side='left')
+
+
+def equirectangular_distance(lon_foco, lat_foco, lon, lat):
+    """
+    Distância aproximada (metros) em uma projeção equirretangular local centrada no foco:
+    sem funções trigonométricas por ponto.
+    """
+    dlon = np.asarray(lon, dtype=np.float64) - lon_foco
+    if dlon.size and np.abs(dlon).max() > 180:
+        dlon = np.remainder(dlon + 180, 360) - 180
+    # Metros por grau: x escalado pelo cosseno da latitude do foco. Operações in-place
+    # evitam arrays temporários.
+    meters_per_degree = np.radians(EARTH_RADIUS_M)
+    dx = dlon * (meters_per_degree * np.cos(np.radians(lat_foco)))
+    dy = np.asarray(lat, dtype=np.float64) - lat_foco
+    dy *= meters_per_degree
+    dx *= dx
+    dy *= dy
+    dx += dy
+    return np.sqrt(dx, out=dx)
+
+
+def boundary_tolerance(lat_foco, radius_m):
+    """
+    Meia largura (metros) da faixa ao redor de um raio em que a distância aproximada não
+    decide a zona. O erro relativo da projeção é limitado por (d/R)·|tan(lat)| + (d/R)²;
+    a faixa usa o dobro desse limite, avaliado a 110% do raio.
+    """
+    d = 1.1 * radius_m / EARTH_RADIUS_M
+    return 2 * (d * abs(np.tan(np.radians(lat_foco))) + d * d + 1e-9) * 1.1 * radius_m
+
+
+def refined_distances(lat_foco, lon_foco, lat, lon, radii=ZONE_RADII):
+    """
+    Distâncias que produzem exatamente as mesmas zonas da haversine: a projeção local é
+    usada para todos os pontos e a haversine é recalculada só para os que ficam na faixa
+    de tolerância de algum raio. Fora das faixas os valores são aproximados.
+    """
+    if abs(lat_foco) > APPROXIMATE_MAX_LATITUDE:
+        return haversine_array(lon_foco, lat_foco, lon, lat)
+    distances = equirectangular_distance(lon_foco, lat_foco, lon, lat)
+    near_boundary = np.zeros(distances.size, dtype=bool)
+    for radius in radii:
+        tolerance = boundary_tolerance(lat_foco, radius)
+        near_boundary |= (distances >= radius - tolerance) & (distances <= radius + tolerance)
+    refine = np.flatnonzero(near_boundary)
+    distances[refine] = haversine_array(lon_foco, lat_foco, lon[refine], lat[refine])
+    return distances
+
+
+def classify_zone_frame(lat_foco, lon_foco, df, radii=ZONE_RADII, zone_names=ZONE_NAMES, index=None,
+                        snapshot=None, approximate=False):
+    """
+    Classifica as granjas nas zonas de contingência e agrega os dados por núcleo.
+
+    Calcula todas as distâncias em uma única passagem vetorizada, rotula as zonas com
+    np.searchsorted e agrega por (zona, núcleo) sem iterar linha a linha. Com um
+    SpatialIndex da mesma tabela, apenas as granjas dentro do maior raio são avaliadas.
+    Com a vizinhança pré-calculada (src.vizinhanca) da mesma base, um foco sobre um
+    núcleo é respondido por consulta e corte, sem calcular distâncias. Sem índice, com
+    approximate=True a varredura usa a projeção local com refinamento exato perto dos
+    limites (refined_distances), com as mesmas zonas e menos aritmética.
+    Retorna o DataFrame de aggregate_zone_frame (uma linha por zona e núcleo).
+    """
+    print("[INFO] Classificando produtores e agregando por núcleo...")
+    if df.empty:
+        return pd.DataFrame(columns=ZONE_FRAME_COLUMNS)
+
+    lat = df['lat'].to_numpy(dtype=np.float64)
+    lon = df['lon'].to_numpy(dtype=np.float64)
+    neighbours = snapshot.lookup(lat_foco, lon_foco, max(radii)) if snapshot is not None else None
+    if neighbours is not None:
+        rows, distances = neighbours
+    elif index is not None:
+        rows, distances = index.query_radius(lat_foco, lon_foco, max(radii))
+    else:
+        rows = np.arange(len(df))
+        if approximate:
+            distances = refined_distances(lat_foco, lon_foco, lat, lon, radii)
+        else:
+            distances = haversine_array(lon_foco, lat_foco, lon, lat)
+    return aggregate_zone_frame(df, rows, distances, radii, zone_names)
+
+
+def classify_farms_by_zone(lat_foco, lon_foco, df, radii=ZONE_RADII, zone_names=ZONE_NAMES, **kwargs):
+    """Como classify_zone_frame, no formato {zona: {nucleo_id: {...}}} consumido pelo aplicativo."""
+    return zone_frame_to_dict(classify_zone_frame(lat_foco, lon_foco, df, radii, zone_names, **kwargs), zone_names)
+
+
+def nearest_focus_distances(lat_foci, lon_foci, lat, lon, max_cells=DISTANCE_CHUNK_CELLS):
+    """
+    Distância de cada granja ao foco mais próximo e o índice desse foco.
+
+    A matriz granjas × focos é calculada em blocos de linhas de no máximo `max_cells`
+    células, de modo que a memória não cresce com o produto das duas dimensões.
+    """
+    lat_foci = np.asarray(lat_foci, dtype=np.float64)[np.newaxis, :]
+    lon_foci = np.asarray(lon_foci, dtype=np.float64)[np.newaxis, :]
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    distances = np.empty(lat.size, dtype=np.float64)
+    nearest = np.empty(lat.size, dtype=np.intp)
+    rows_per_chunk = max(1, max_cells // max(lat_foci.size, 1))
+    for start in range(0, lat.size, rows_per_chunk):
+        stop = min(start + rows_per_chunk, lat.size)
+        block = haversine_array(lon_foci, lat_foci, lon[start:stop, np.newaxis], lat[start:stop, np.newaxis])
+        nearest[start:stop] = block.argmin(axis=1)
+        distances[start:stop] = block[np.arange(stop - start), nearest[start:stop]]
+    return distances, nearest
+
+
+def classify_multi_focus_frame(foci, df, radii=ZONE_RADII, zone_names=ZONE_NAMES, index=None):
+    """
+    Classifica as granjas considerando vários focos: cada granja fica na zona mais restrita
+    entre todos eles, isto é, na zona da menor distância a qualquer foco. `foci` é uma
+    sequência de (lat, lon). Com um SpatialIndex, só as granjas dentro do maior raio de
+    algum foco entram na matriz de distâncias. Retorna o mesmo DataFrame de
+    classify_zone_frame.
+    """
+    print(f"[INFO] Classificando produtores para {len(foci)} focos e agregando por núcleo...")
+    if df.empty or not foci:
+        return pd.DataFrame(columns=ZONE_FRAME_COLUMNS)
+
+    lat_foci, lon_foci = (np.array(values, dtype=np.float64) for values in zip(*foci))
+    if index is not None:
+        rows = np.unique(np.concatenate([
+            index.query_radius(lat_f, lon_f, max(radii))[0] for lat_f, lon_f in zip(lat_foci, lon_foci)
+        ]))
+    else:
+        rows = np.arange(len(df))
+    lat = df['lat'].to_numpy(dtype=np.float64)[rows]
+    lon = df['lon'].to_numpy(dtype=np.float64)[rows]
+    distances, _ = nearest_focus_distances(lat_foci, lon_foci, lat, lon)
+    return aggregate_zone_frame(df, rows, distances, radii, zone_names)
+
+
+def classify_farms_multi_focus(foci, df, radii=ZONE_RADII, zone_names=ZONE_NAMES, index=None):
+    """Como classify_multi_focus_frame, no formato {zona: {nucleo_id: {...}}}."""
+    return zone_frame_to_dict(classify_multi_focus_frame(foci, df, radii, zone_names, index), zone_names)
+
+
+def aggregate_zone_frame(df, rows, distances, radii=ZONE_RADII, zone_names=ZONE_NAMES):
+    """
+    Rotula as linhas `rows` pela zona da distância e agrega por (zona, núcleo) em uma única
+    passagem colunar. Retorna um DataFrame com uma linha por grupo (ZONE_FRAME_COLUMNS),
+    ordenado pela zona (da mais restrita) e pelo núcleo; dentro de cada grupo os aviários
+    seguem a ordem do arquivo. Espera as colunas numéricas já convertidas no carregamento.
+
+    Os grupos saem de uma ordenação (np.lexsort) e as somas de np.add.reduceat: medido
+    em 300 mil granjas, é cerca de 4x mais rápido que DataFrame.groupby com agregações
+    de lista e conjunto.
+    """
+    zones = zone_indices(distances, radii)
+    nucleos = df['nucleo'].to_numpy(dtype=np.float64)[rows]
+    keep = (zones < len(radii)) & ~np.isnan(nucleos)
+    if not keep.any():
+        return pd.DataFrame(columns=ZONE_FRAME_COLUMNS)
+    rows, zones, nucleos = rows[keep], zones[keep], nucleos[keep]
+
+    # Ordena por (zona, núcleo), preservando a ordem original do arquivo dentro de cada grupo.
+    perm = np.lexsort((rows, nucleos, zones))
+    order = rows[perm]
+    starts = np.flatnonzero(np.r_[True, (np.diff(zones[perm]) != 0) | (np.diff(nucleos[perm]) != 0)])
+    first = order[starts]
+    missing = pd.Series('N/A', index=df.index)
+
+    return pd.DataFrame({
+        'zona': np.asarray(zone_names, dtype=object)[zones[perm][starts]],
+        'nucleo': nucleos[perm][starts].astype(np.int64),
+        'proprietario': df.get('proprietario', missing).to_numpy()[first],
+        'tecnico': df.get('tecnico', missing).to_numpy()[first],
+        'aviarios': [group.tolist() for group in np.split(df['fazenda'].to_numpy()[order], starts[1:])],
+        'bp_propriedade': [set(group.tolist()) for group in np.split(df['bp_propriedade'].to_numpy()[order], starts[1:])],
+        'total_aves': np.add.reduceat(np.nan_to_num(df['capacidade'].to_numpy(dtype=np.float64)[order]), starts),
+        'total_area': np.add.reduceat(np.nan_to_num(df['area'].to_numpy(dtype=np.float64)[order]), starts),
+        'latitude': df['lat'].to_numpy(dtype=np.float64)[first],
+        'longitude': df['lon'].to_numpy(dtype=np.float64)[first],
+    }, columns=ZONE_FRAME_COLUMNS)
+
+
+def zone_frame_to_dict(frame, zone_names=ZONE_NAMES):
+    """
+    Adaptador para os consumidores que usam dicionários (listas, relatórios HTML e PDF):
+    retorna {zona: {nucleo_id: {...}}} a partir do DataFrame de aggregate_zone_frame.
+    """
+    results = {zone_name: {} for zone_name in zone_names}
+    columns = ['zona', 'nucleo', 'aviarios', 'tecnico', 'proprietario', 'bp_propriedade', 'total_aves',
+               'total_area', 'latitude', 'longitude']
+    for zona, nucleo, aviarios, tecnico, proprietario, bps, aves, area, lat, lon in zip(
+            *(frame[column].tolist() for column in columns)):
+        results[zona][nucleo] = {
+            'aviarios': aviarios,
+            'tecnico': tecnico,
+            'proprietario': proprietario,
+            'bp_propriedade': bps,
+            'total_aves': aves,
+            'total_area': area,
+            'latitude': lat,
+            'longitude': lon
+        }
+    return results
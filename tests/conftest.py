@@ -0,0 +1,7 @@
+"""Configuração dos testes: a raiz do projeto no sys.path, para importar o pacote src."""
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
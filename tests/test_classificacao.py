@@ -0,0 +1,127 @@
+"""A classificação vetorizada deve reproduzir a classificação linha a linha original do aplicativo."""
+import os
+from math import asin, cos, radians, sin, sqrt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import dados, zonas
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'coordenadas.csv')
+
+
+def haversine_distance(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * asin(sqrt(a)) * 6371000
+
+
+def classify_by_row(lat_foco, lon_foco, df):
+    """Classificação original (iterrows sobre o CSV bruto), antes da versão vetorizada."""
+    results = {zone_name: {} for zone_name in zonas.ZONE_NAMES}
+    for _, row in df.iterrows():
+        try:
+            coords = row['coordenadas'].split(',')
+            lat_granja = float(coords[0].strip())
+            lon_granja = float(coords[1].strip())
+        except (ValueError, IndexError, AttributeError):
+            continue
+        distance = haversine_distance(lon_foco, lat_foco, lon_granja, lat_granja)
+        if distance <= 3000:
+            zone_name = zonas.ZONE_NAMES[0]
+        elif distance <= 10000:
+            zone_name = zonas.ZONE_NAMES[1]
+        elif distance <= 25000:
+            zone_name = zonas.ZONE_NAMES[2]
+        else:
+            continue
+        if pd.isna(row.get('nucleo')):
+            continue
+
+        nucleo_id = int(row['nucleo'])
+        if nucleo_id not in results[zone_name]:
+            results[zone_name][nucleo_id] = {
+                'aviarios': [],
+                'tecnico': row.get('tecnico', 'N/A'),
+                'proprietario': row.get('proprietario', 'N/A'),
+                'bp_propriedade': set(),
+                'total_aves': 0,
+                'total_area': 0,
+                'latitude': lat_granja,
+                'longitude': lon_granja
+            }
+        agg_nucleo = results[zone_name][nucleo_id]
+        agg_nucleo['aviarios'].append(row.get('fazenda'))
+        agg_nucleo['bp_propriedade'].add(row.get('bp_propriedade'))
+        agg_nucleo['total_aves'] += pd.to_numeric(row.get('capacidade'), errors='coerce') or 0
+        agg_nucleo['total_area'] += pd.to_numeric(row.get('area'), errors='coerce') or 0
+    return results
+
+
+def text(value):
+    """Textos comparados sem os espaços nas pontas (o carregamento tipado os remove)."""
+    return 'N/A' if pd.isna(value) else str(value).strip()
+
+
+def identifiers(values):
+    """Conjunto de identificadores inteiros, ignorando os ausentes."""
+    return {int(value) for value in values if not pd.isna(value)}
+
+
+@pytest.fixture(scope="module")
+def raw_farms():
+    # Mesma limpeza do carregamento original.
+    df = pd.read_csv(CSV_PATH, sep=';')
+    df = df.dropna(subset=['coordenadas'])
+    return df[df['coordenadas'].str.contains(',', na=False)]
+
+
+@pytest.fixture(scope="module")
+def farms():
+    return dados.load_farm_table(CSV_PATH)
+
+
+def focus_points(farms):
+    """Focos sobre núcleos (os mais povoados e uma amostra) e fora de qualquer granja."""
+    rng = np.random.default_rng(0)
+    busiest = farms['nucleo'].value_counts().index[:3]
+    rows = [farms.index[farms['nucleo'] == nucleo][0] for nucleo in busiest]
+    rows += rng.choice(len(farms), 4, replace=False).tolist()
+    points = [(farms.at[row, 'lat'], farms.at[row, 'lon']) for row in rows]
+    return points + [(farms['lat'].mean(), farms['lon'].mean()), (0.0, 0.0)]
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_vectorized_classification_matches_row_by_row(raw_farms, farms, approximate):
+    for lat_foco, lon_foco in focus_points(farms):
+        expected = classify_by_row(lat_foco, lon_foco, raw_farms)
+        result = zonas.classify_farms_by_zone(lat_foco, lon_foco, farms, approximate=approximate)
+        assert list(result) == list(expected)
+        for zone_name in zonas.ZONE_NAMES:
+            # Contagens por zona: núcleos e aviários.
+            assert sorted(result[zone_name]) == sorted(expected[zone_name]), (lat_foco, lon_foco, zone_name)
+            assert sum(len(agg['aviarios']) for agg in result[zone_name].values()) \
+                == sum(len(agg['aviarios']) for agg in expected[zone_name].values())
+            for nucleo_id, old in expected[zone_name].items():
+                new = result[zone_name][nucleo_id]
+                context = (lat_foco, lon_foco, zone_name, nucleo_id)
+                assert new['aviarios'] == old['aviarios'], context
+                assert identifiers(new['bp_propriedade']) == identifiers(old['bp_propriedade']), context
+                assert new['total_aves'] == old['total_aves'], context
+                assert new['total_area'] == old['total_area'], context
+                assert text(new['proprietario']) == text(old['proprietario']), context
+                assert text(new['tecnico']) == text(old['tecnico']), context
+                assert (new['latitude'], new['longitude']) == (old['latitude'], old['longitude']), context
+
+
+def test_zone_frame_matches_row_by_row_totals(raw_farms, farms):
+    lat_foco, lon_foco = focus_points(farms)[0]
+    expected = classify_by_row(lat_foco, lon_foco, raw_farms)
+    frame = zonas.classify_zone_frame(lat_foco, lon_foco, farms)
+    assert list(frame.columns) == zonas.ZONE_FRAME_COLUMNS
+    for zone_name in zonas.ZONE_NAMES:
+        zone = frame.loc[frame['zona'] == zone_name]
+        assert len(zone) == len(expected[zone_name])
+        assert zone['total_aves'].sum() == sum(agg['total_aves'] for agg in expected[zone_name].values())
+        assert zone['total_area'].sum() == sum(agg['total_area'] for agg in expected[zone_name].values())
@@ -0,0 +1,40 @@
+"""O ranking de criticidade deve somar, para cada núcleo, o mesmo que a classificação do aplicativo."""
+import os
+
+import numpy as np
+import pytest
+
+from src import criticidade, dados, zonas
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'coordenadas.csv')
+
+
+@pytest.fixture(scope="module")
+def farms():
+    return dados.load_farm_table(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def ranking(farms):
+    return criticidade.rank_nuclei(farms, workers=1)
+
+
+def test_ranking_matches_classification(farms, ranking):
+    # Os mais críticos e uma amostra do restante do ranking.
+    rng = np.random.default_rng(0)
+    rows = np.unique(np.r_[np.arange(5), rng.integers(0, len(ranking), 15)])
+    for row in ranking.iloc[rows].itertuples():
+        frame = zonas.classify_zone_frame(row.lat, row.lon, farms)
+        for zone_name, suffix in zip(zonas.ZONE_NAMES, criticidade.ZONE_SUFFIXES):
+            zone = frame.loc[frame['zona'] == zone_name]
+            assert getattr(row, f"aviarios_{suffix}") == sum(len(a) for a in zone['aviarios']), (row.nucleo, suffix)
+            assert getattr(row, f"aves_{suffix}") == zone['total_aves'].sum(), (row.nucleo, suffix)
+            assert getattr(row, f"area_{suffix}") == zone['total_area'].sum(), (row.nucleo, suffix)
+        assert row.aves_total == frame['total_aves'].sum()
+
+
+def test_ranking_has_one_row_per_nucleus_in_default_order(farms, ranking):
+    assert len(ranking) == farms['nucleo'].dropna().nunique()
+    assert ranking['nucleo'].is_unique
+    keys = ranking[criticidade.DEFAULT_SORT].to_numpy()
+    assert all(tuple(a) >= tuple(b) for a, b in zip(keys[:-1], keys[1:]))
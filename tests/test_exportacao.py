@@ -0,0 +1,122 @@
+"""Fila de exportações e cache de artefatos em disco."""
+import os
+import threading
+
+import pytest
+
+from src.exportacao import ArtifactStore, ExportQueue, TEMP_SUFFIX, artifact_name
+
+TIMEOUT_S = 10
+
+
+def wait_until(condition):
+    event = threading.Event()
+    for _ in range(TIMEOUT_S * 100):
+        if condition():
+            return True
+        event.wait(0.01)
+    return False
+
+
+def writer(data):
+    def build(fileobj, progress):
+        fileobj.write(data)
+    return build
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path), max_bytes=3000)
+
+
+@pytest.fixture
+def queue(store):
+    return ExportQueue(store, workers=2)
+
+
+def test_identical_requests_share_one_job(queue):
+    release = threading.Event()
+    calls = []
+
+    def slow(fileobj, progress):
+        calls.append(1)
+        progress(0.5, "metade")
+        release.wait(TIMEOUT_S)
+        fileobj.write(b"x" * 100)
+
+    key = ("kmz", "v1", -24.3, -53.6, ())
+    jobs = [None] * 8
+    threads = [threading.Thread(target=lambda i=i: jobs.__setitem__(i, queue.submit(key, "KMZ", slow)))
+               for i in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(job is jobs[0] for job in jobs)
+    assert wait_until(lambda: jobs[0].status == "gerando")
+    assert queue.active_jobs() == [jobs[0]]
+
+    release.set()
+    assert wait_until(lambda: queue.ready(key))
+    assert queue.read(key) == b"x" * 100
+    assert queue.job(key) is None
+    # Já pronto: um novo pedido não gera outro trabalho.
+    assert queue.submit(key, "KMZ", slow).status == "pronto"
+    assert len(calls) == 1
+
+
+def test_store_evicts_least_recently_used_by_size(store, tmp_path):
+    keys = [("relatorio_pdf", "v1", float(i), 0.0, ()) for i in range(4)]
+    for key in keys[:3]:
+        path = store.temp_path(key)
+        with open(path, 'wb') as f:
+            f.write(b"y" * 1000)
+        store.commit(key, path)
+    assert store.read(keys[0]) is not None      # keys[1] passa a ser o menos usado
+
+    path = store.temp_path(keys[3])
+    with open(path, 'wb') as f:
+        f.write(b"y" * 1000)
+    store.commit(keys[3], path)
+
+    assert [key in store for key in keys] == [True, False, True, True]
+    assert store.total_bytes() == 3000
+    assert not os.path.exists(tmp_path / artifact_name(keys[1]))
+    # A ordem de uso sobrevive a um reinício (data de modificação dos arquivos).
+    reopened = ArtifactStore(str(tmp_path), max_bytes=2000)
+    assert [key in reopened for key in keys] == [True, False, False, True]
+
+
+def test_failed_job_leaves_no_artifact(queue, store, tmp_path):
+    def failing(fileobj, progress):
+        fileobj.write(b"parcial")
+        raise ValueError("falha simulada")
+
+    key = ("relatorio_pdf", "v1", -24.3, -53.6, ())
+    job = queue.submit(key, "PDF", failing)
+    assert wait_until(lambda: job.status == "erro")
+    assert job.error == "falha simulada"
+    assert not queue.ready(key)
+    assert queue.read(key) is None
+    assert not any(name.endswith(TEMP_SUFFIX) for name in os.listdir(tmp_path))
+    assert len(store) == 0
+    assert queue.job(key) is job and queue.active_jobs() == []
+
+    # Um novo pedido descarta a falha e gera o artefato.
+    retry = queue.submit(key, "PDF", writer(b"ok"))
+    assert retry is not job
+    assert wait_until(lambda: queue.ready(key))
+    assert queue.read(key) == b"ok"
+    assert queue.job(key) is None
+
+
+def test_failures_are_bounded(queue, monkeypatch):
+    monkeypatch.setattr("src.exportacao.MAX_FAILED_JOBS", 3)
+
+    def failing(fileobj, progress):
+        raise RuntimeError("falha")
+
+    jobs = [queue.submit(("pdf", "v1", float(i), 0.0, ()), "PDF", failing) for i in range(6)]
+    # Só as três falhas mais recentes continuam visíveis.
+    assert wait_until(lambda: all(job.status == "erro" for job in jobs)
+                      and sum(queue.job(job.key) is not None for job in jobs) == 3)
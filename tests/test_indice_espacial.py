@@ -0,0 +1,79 @@
+"""O índice espacial (KD-tree) deve dar exatamente as respostas da varredura linear por haversine."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import dados, zonas
+from src.geo import haversine_array
+from src.indice_espacial import SpatialIndex
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'coordenadas.csv')
+RADII_M = (300, 3000, 10000, 25000)
+
+
+@pytest.fixture(scope="module")
+def farms():
+    return dados.load_farm_table(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def index(farms):
+    return SpatialIndex(farms['lat'].to_numpy(), farms['lon'].to_numpy())
+
+
+@pytest.fixture(scope="module")
+def foci(farms):
+    """Focos sobre granjas (deslocados até ~500 m) e pontos aleatórios na área da base."""
+    rng = np.random.default_rng(0)
+    lat, lon = farms['lat'].to_numpy(), farms['lon'].to_numpy()
+    rows = rng.integers(0, lat.size, 60)
+    near = np.column_stack((lat[rows], lon[rows])) + rng.uniform(-0.005, 0.005, (60, 2))
+    spread = np.column_stack((rng.uniform(lat.min() - 0.2, lat.max() + 0.2, 60),
+                              rng.uniform(lon.min() - 0.2, lon.max() + 0.2, 60)))
+    return np.vstack((near, spread))
+
+
+def brute_force(farms, lat, lon, radius_m):
+    distances = haversine_array(lon, lat, farms['lon'].to_numpy(), farms['lat'].to_numpy())
+    rows = np.flatnonzero(distances <= radius_m)
+    return rows, distances[rows]
+
+
+@pytest.mark.parametrize("radius_m", RADII_M)
+def test_query_radius_matches_linear_scan(farms, index, foci, radius_m):
+    for lat, lon in foci:
+        rows, distances = index.query_radius(lat, lon, radius_m)
+        expected_rows, expected_distances = brute_force(farms, lat, lon, radius_m)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_array_equal(distances, expected_distances)
+
+
+@pytest.mark.parametrize("radius_m", RADII_M)
+def test_query_radius_many_matches_linear_scan(farms, index, foci, radius_m):
+    sources, rows, distances = index.query_radius_many(foci[:, 0], foci[:, 1], radius_m)
+    for k, (lat, lon) in enumerate(foci):
+        mine = sources == k
+        order = np.argsort(rows[mine], kind='stable')
+        expected_rows, expected_distances = brute_force(farms, lat, lon, radius_m)
+        np.testing.assert_array_equal(rows[mine][order], expected_rows)
+        np.testing.assert_array_equal(distances[mine][order], expected_distances)
+
+
+def test_nearest_matches_argmin(farms, index, foci):
+    farm_lat, farm_lon = farms['lat'].to_numpy(), farms['lon'].to_numpy()
+    # Também sobre as próprias granjas (distância zero e empates entre aviários no mesmo ponto).
+    targets = np.vstack((foci, np.column_stack((farm_lat[:50], farm_lon[:50]))))
+    for lat, lon in targets:
+        distances = haversine_array(lon, lat, farm_lon, farm_lat)
+        best = int(np.argmin(distances))
+        expected = (best, float(distances[best])) if distances[best] <= 300 else (None, None)
+        assert index.nearest(lat, lon, max_distance_m=300) == expected
+
+
+def test_classification_with_index_matches_full_scan(farms, index, foci):
+    for lat, lon in foci[::4]:
+        with_index = zonas.classify_zone_frame(lat, lon, farms, index=index)
+        without_index = zonas.classify_zone_frame(lat, lon, farms)
+        pd.testing.assert_frame_equal(with_index, without_index)
@@ -0,0 +1,153 @@
+"""Recarga da base: comparação por fazenda, migração dos caches e verificação em duas leituras."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import recarga
+from src.cache import LRUCache, focus_key
+
+
+def farm_table(rows):
+    """Tabela mínima no formato da base carregada: (fazenda, lat, lon, capacidade)."""
+    return pd.DataFrame(rows, columns=['fazenda', 'lat', 'lon', 'capacidade'])
+
+
+OLD = farm_table([(1, -24.30, -53.60, 1000), (2, -24.31, -53.61, 2000), (3, -24.50, -53.90, 3000),
+                  (4, -24.70, -53.20, 4000)])
+
+
+def test_diff_detects_inserted_deleted_updated_and_moved():
+    new = farm_table([(2, -24.31, -53.61, 2500),   # capacidade alterada
+                      (1, -24.30, -53.60, 1000),   # igual, em outra linha
+                      (4, -24.80, -53.20, 4000),   # mudou de posição
+                      (5, -24.00, -53.00, 500)])   # incluída; 3 foi removida
+    diff = recarga.diff_farm_tables(OLD, new)
+    assert diff is not None
+    assert diff.inserted.tolist() == [5]
+    assert diff.deleted.tolist() == [3]
+    assert sorted(diff.updated.tolist()) == [2, 4]
+    # Linha antiga com a mesma fazenda e posição de cada linha nova (a 4 mudou de posição).
+    assert diff.previous_rows.tolist() == [1, 0, -1, -1]
+    # Posições afetadas: a incluída, a removida e as antigas e novas das alteradas.
+    affected = set(zip(diff.lat.tolist(), diff.lon.tolist()))
+    assert {(-24.00, -53.00), (-24.50, -53.90), (-24.70, -53.20), (-24.80, -53.20)} <= affected
+    assert len(diff) == 4
+
+
+def test_diff_of_identical_tables_is_empty():
+    diff = recarga.diff_farm_tables(OLD, OLD.copy())
+    assert len(diff) == 0
+    assert diff.previous_rows.tolist() == [0, 1, 2, 3]
+    assert not diff.touches([(-24.30, -53.60)], 25000)
+
+
+@pytest.mark.parametrize("change", ["nan", "duplicate", "non_integer", "columns", "missing_key"])
+def test_diff_is_unavailable_for_unusable_keys(change):
+    new = OLD.copy()
+    if change == "nan":
+        new['fazenda'] = new['fazenda'].astype(np.float64)
+        new.loc[2, 'fazenda'] = np.nan
+    elif change == "duplicate":
+        new.loc[2, 'fazenda'] = 1
+    elif change == "non_integer":
+        new['fazenda'] = new['fazenda'].astype(np.float64) + 0.5
+    elif change == "columns":
+        new['area'] = 0
+    else:
+        new = new.drop(columns='fazenda')
+    assert recarga.diff_farm_tables(OLD, new) is None
+
+
+def test_migrate_focus_cache_keeps_only_untouched_foci():
+    new = OLD.copy()
+    new.loc[3, 'capacidade'] = 9999   # granja 4, em (-24.70, -53.20)
+    diff = recarga.diff_farm_tables(OLD, new)
+    radii = (3000, 10000, 25000)
+    near = focus_key("classificacao", "v1", -24.72, -53.21, radii)
+    far = focus_key("classificacao", "v1", -24.30, -53.60, radii)
+    # Foco adicional perto da granja alterada: a entrada inteira é afetada.
+    multi = focus_key("classificacao", "v1", -24.30, -53.60, radii, ((-24.69, -53.19),))
+    small_radius = focus_key("classificacao", "v1", -24.72, -53.21, (500,))
+    other_version = focus_key("classificacao", "v0", -24.30, -53.60, radii)
+    unknown_kind = focus_key("desconhecido", "v1", -24.30, -53.60, radii)
+    default_radius = focus_key("mapa", "v1", -24.72, -53.21)
+
+    cache = LRUCache(maxsize=16)
+    for key in (near, far, multi, small_radius, other_version, unknown_kind, default_radius):
+        cache.put(key, key[0])
+    kept = recarga.migrate_focus_cache(cache, "v1", "v2", diff, {"classificacao": 25000, "mapa": 25000})
+
+    assert kept == 2
+    assert ("classificacao", "v2") + far[2:] in cache
+    assert ("classificacao", "v2") + small_radius[2:] in cache
+    assert len(cache) == 2
+
+
+def test_migrate_focus_cache_without_diff_drops_everything():
+    cache = LRUCache(maxsize=4)
+    cache.put(focus_key("classificacao", "v1", -24.30, -53.60, (3000,)), 1)
+    assert recarga.migrate_focus_cache(cache, "v1", "v2", None, {"classificacao": 25000}) == 0
+    assert len(cache) == 0
+
+
+CSV_HEADER = "fazenda;proprietario;coordenadas;nucleo;capacidade;area\n"
+
+
+def write_csv(path, rows, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(CSV_HEADER)
+        for fazenda, lat, lon, capacidade in rows:
+            f.write(f"{fazenda};Produtor {fazenda};{lat},{lon};{fazenda};{capacidade};100\n")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def dataset_files(tmp_path):
+    csv_path = tmp_path / "coordenadas.csv"
+    write_csv(csv_path, [(1, -24.30, -53.60, 1000), (2, -24.50, -53.90, 2000)], 1_000_000_000_000_000_000)
+    return str(csv_path), str(tmp_path / "cache")
+
+
+def test_reload_waits_for_two_identical_checks(dataset_files):
+    csv_path, cache_dir = dataset_files
+    changes = []
+    dataset = recarga.FarmDataset(csv_path, on_change=lambda *args: changes.append(args), cache_dir=cache_dir)
+    first = dataset.version
+    assert not dataset.check()
+
+    write_csv(csv_path, [(1, -24.30, -53.60, 1000), (2, -24.50, -53.90, 2500)], 1_000_000_002_000_000_000)
+    assert not dataset.check()            # primeira leitura da nova assinatura: aguarda
+    assert dataset.version is first
+    # O arquivo ainda está mudando: a assinatura pendente é trocada, sem recarga.
+    write_csv(csv_path, [(1, -24.30, -53.60, 1000), (2, -24.50, -53.90, 3000), (3, -24.0, -53.0, 10)],
+              1_000_000_004_000_000_000)
+    assert not dataset.check()
+    assert dataset.version is first
+    assert dataset.check()                # mesma assinatura em duas verificações: recarrega
+    assert len(dataset.version.df) == 3
+    assert dataset.version.fingerprint != first.fingerprint
+    assert len(changes) == 1
+    previous, version, diff = changes[0]
+    assert previous is first and version is dataset.version
+    assert diff.inserted.tolist() == [3] and diff.updated.tolist() == [2]
+    assert not dataset.check()
+
+
+def test_reload_survives_a_failing_cache_migration(dataset_files):
+    csv_path, cache_dir = dataset_files
+    diffs = []
+
+    def on_change(previous, version, diff):
+        diffs.append(diff)
+        if diff is not None:
+            raise OSError("falha simulada")
+
+    dataset = recarga.FarmDataset(csv_path, on_change=on_change, cache_dir=cache_dir)
+    write_csv(csv_path, [(1, -24.30, -53.60, 1000), (2, -24.50, -53.90, 2500)], 1_000_000_002_000_000_000)
+    dataset.check()
+    assert dataset.check()
+    # A nova versão é usada e os caches são descartados (segunda chamada com diff=None).
+    assert dataset.version.df['capacidade'].tolist() == [1000, 2500]
+    assert len(diffs) == 2 and diffs[1] is None
@@ -0,0 +1,78 @@
+"""A vizinhança atualizada a partir de uma versão anterior deve ser igual à construída do zero."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import dados, vizinhanca
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'coordenadas.csv')
+RADIUS_M = 10000
+
+
+@pytest.fixture(scope="module")
+def farms():
+    return dados.load_farm_table(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def previous(farms):
+    return vizinhanca.build_snapshot(farms, "v1", radius_m=RADIUS_M, workers=1)
+
+
+def edited_base(farms, seed, shuffle=False):
+    """Nova versão da base: granjas removidas, movidas, com outros dados e incluídas."""
+    rng = np.random.default_rng(seed)
+    df = farms.copy()
+    df = df.drop(index=rng.choice(len(df), 20, replace=False)).reset_index(drop=True)
+    moved = rng.choice(len(df), 10, replace=False)
+    df.loc[moved, 'lat'] += rng.uniform(-0.05, 0.05, moved.size)
+    df.loc[moved, 'lon'] += rng.uniform(-0.05, 0.05, moved.size)
+    df.loc[rng.choice(len(df), 10, replace=False), 'capacidade'] = 1
+    new = df.sample(15, random_state=seed).copy()
+    new['fazenda'] = np.arange(15) + df['fazenda'].max() + 1
+    new['lat'] += 0.02
+    df = pd.concat([df, new], ignore_index=True)
+    if shuffle:
+        df = df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+    return df
+
+
+def neighbour_lists(snapshot):
+    """{ponto: [(linha, distância), ...]} sem depender da ordem entre granjas equidistantes."""
+    lists = {}
+    for i, point in enumerate(zip(snapshot.point_lat.tolist(), snapshot.point_lon.tolist())):
+        start, end = snapshot.offsets[i], snapshot.offsets[i + 1]
+        lists[point] = sorted(zip(snapshot.rows[start:end].tolist(), snapshot.distances[start:end].tolist()))
+    return lists
+
+
+@pytest.mark.parametrize("seed, shuffle", [(0, False), (1, False), (2, True)])
+def test_incremental_rebuild_matches_full_build(farms, previous, seed, shuffle):
+    df = edited_base(farms, seed, shuffle)
+    incremental = vizinhanca.build_snapshot(df, "v2", radius_m=RADIUS_M, workers=1, previous=previous)
+    full = vizinhanca.build_snapshot(df, "v2", radius_m=RADIUS_M, workers=1)
+    np.testing.assert_array_equal(incremental.point_lat, full.point_lat)
+    np.testing.assert_array_equal(incremental.point_lon, full.point_lon)
+    np.testing.assert_array_equal(incremental.offsets, full.offsets)
+    assert neighbour_lists(incremental) == neighbour_lists(full)
+    # Distâncias em ordem crescente em cada lista, como lookup exige.
+    for i in range(len(incremental)):
+        start, end = incremental.offsets[i], incremental.offsets[i + 1]
+        assert np.all(np.diff(incremental.distances[start:end]) >= 0)
+
+
+def test_unchanged_points_are_reused(farms, previous, capsys):
+    df = farms.copy()
+    df.loc[0, 'capacidade'] = 1
+    vizinhanca.build_snapshot(df, "v2", radius_m=RADIUS_M, workers=1, previous=previous)
+    assert f"0 de {len(previous)} pontos de núcleo a calcular" in capsys.readouterr().out
+
+
+def test_lookup_cuts_the_list_at_the_radius(previous):
+    lat, lon = previous.point_lat[0], previous.point_lon[0]
+    rows, distances = previous.lookup(lat, lon, 3000)
+    assert rows.size == distances.size == np.count_nonzero(previous.distances[:previous.offsets[1]] <= 3000)
+    assert previous.lookup(lat, lon, RADIUS_M + 1) is None
+    assert previous.lookup(lat + 1.0, lon, 3000) is None
@@ -0,0 +1,73 @@
+"""A distância aproximada com refinamento deve produzir exatamente as zonas da haversine."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import dados, zonas
+from src.geo import EARTH_RADIUS_M, haversine_array
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'coordenadas.csv')
+LATITUDES = (-65.0, -45.0, -24.3, 0.0, 15.0, 40.0, 60.0, 69.9)
+
+
+def destination(lat, lon, distance_m, bearing):
+    """Ponto a distance_m (metros) do foco na direção `bearing` (radianos), sobre a esfera."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    angle = np.asarray(distance_m) / EARTH_RADIUS_M
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angle) + np.cos(lat1) * np.sin(angle) * np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(lat1),
+                             np.cos(angle) - np.sin(lat1) * np.sin(lat2))
+    return np.degrees(lat2), np.degrees(lon2)
+
+
+@pytest.mark.parametrize("lat_foco", LATITUDES)
+def test_refined_zones_match_haversine_near_boundaries(lat_foco):
+    rng = np.random.default_rng(int(abs(lat_foco) * 10))
+    lon_foco = rng.uniform(-180, 180)
+    # Pontos a poucos metros de cada limite, mais pontos espalhados entre 0 e 30 km.
+    near = np.concatenate([radius + rng.uniform(-5, 5, 2000) for radius in zonas.ZONE_RADII])
+    spread = rng.uniform(0, 30000, 2000)
+    distances = np.concatenate((near, spread))
+    lat, lon = destination(lat_foco, lon_foco, distances, rng.uniform(0, 2 * np.pi, distances.size))
+
+    exact = zonas.zone_indices(haversine_array(lon_foco, lat_foco, lon, lat))
+    refined = zonas.zone_indices(zonas.refined_distances(lat_foco, lon_foco, lat, lon))
+    np.testing.assert_array_equal(refined, exact)
+
+
+@pytest.mark.parametrize("lat_foco", LATITUDES)
+def test_approximate_zones_match_haversine_just_outside_tolerance(lat_foco):
+    """
+    Pontos a 1-3 vezes a tolerância de cada limite: ficam fora da faixa de refinamento, e a
+    zona é decidida pela própria distância aproximada.
+    """
+    rng = np.random.default_rng(1000 + int(abs(lat_foco) * 10))
+    lon_foco = rng.uniform(-180, 180)
+    distances = np.concatenate([
+        radius + rng.choice([-1, 1], 2000) * rng.uniform(1, 3, 2000) * zonas.boundary_tolerance(lat_foco, radius)
+        for radius in zonas.ZONE_RADII
+    ])
+    lat, lon = destination(lat_foco, lon_foco, distances, rng.uniform(0, 2 * np.pi, distances.size))
+
+    approximate = zonas.equirectangular_distance(lon_foco, lat_foco, lon, lat)
+    outside_band = np.ones(distances.size, dtype=bool)
+    for radius in zonas.ZONE_RADII:
+        tolerance = zonas.boundary_tolerance(lat_foco, radius)
+        outside_band &= np.abs(approximate - radius) > tolerance
+    # Quase todos os pontos usam a aproximação sem refinamento.
+    assert outside_band.mean() > 0.95
+
+    exact = zonas.zone_indices(haversine_array(lon_foco, lat_foco, lon, lat))
+    np.testing.assert_array_equal(zonas.zone_indices(approximate[outside_band]), exact[outside_band])
+    np.testing.assert_array_equal(zonas.zone_indices(zonas.refined_distances(lat_foco, lon_foco, lat, lon)), exact)
+
+
+def test_approximate_classification_matches_exact():
+    farms = dados.load_farm_table(CSV_PATH)
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, len(farms), 20)
+    for lat, lon in zip(farms['lat'].to_numpy()[rows], farms['lon'].to_numpy()[rows]):
+        pd.testing.assert_frame_equal(zonas.classify_zone_frame(lat, lon, farms, approximate=True),
+                                      zonas.classify_zone_frame(lat, lon, farms))